@@ -90,7 +90,7 @@ class HS_MSSChemStyle(MPLBasemapHorizontalSectionStyle):
         for cont_data, cont_levels, cont_colour, cont_label_colour, cont_style, cont_lw, pe in self.contours:
             cs_pv = ax.contour(lonmesh, latmesh, self.data[cont_data], cont_levels,
                                colors=cont_colour, linestyles=cont_style, linewidths=cont_lw)
-            cs_pv_lab = ax.clabel(cs_pv, colors=cont_label_colour, fmt='%i')
+            cs_pv_lab = self.clabel(cs_pv, colors=cont_label_colour, fmt='%i')
             if pe:
                 plt.setp(cs_pv.collections, path_effects=[patheffects.withStroke(linewidth=cont_lw + 2,
                                                                                  foreground="w")])
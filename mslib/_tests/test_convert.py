@@ -26,6 +26,7 @@
     limitations under the License.
 """
 
+import numpy as np
 import pytest
 from mslib.utils import convert_to
 
@@ -61,3 +62,26 @@ def test_convert_to():
     assert convert_to(10, "ppt", "dimensionless", None) == pytest.approx(10e-12)
     assert convert_to(10, "ppm", "ppt", None) == pytest.approx(10e6)
     assert convert_to(10, "ppb", "ppm", None) == pytest.approx(10e-3)
+
+
+def test_convert_to_arrays():
+    value = np.array([0., 10., 20.])
+    assert convert_to(value, "degC", "K").tolist() == pytest.approx([273.15, 283.15, 293.15])
+    assert value.tolist() == [0., 10., 20.]
+    assert convert_to(value, "m^2s^-2", "m").tolist() == pytest.approx([0., 10. / 9.81, 20. / 9.81])
+    assert convert_to([1, 2], "km", "m").tolist() == [1000., 2000.]
+
+    result = convert_to(value, "hPa", "Pa", copy=False)
+    assert result is value
+    assert value.tolist() == [0., 1000., 2000.]
+
+    value.flags.writeable = False
+    result = convert_to(value, "Pa", "hPa", copy=False)
+    assert result is not value
+    assert result.tolist() == [0., 10., 20.]
+
+    value = np.ma.masked_greater(np.arange(3, dtype=np.int32), 1)
+    result = convert_to(value, "km", "m", copy=False)
+    assert result.dtype.kind == "f"
+    assert result.mask.tolist() == [False, False, True]
+    assert result[:2].tolist() == [0., 1000.]
@@ -30,8 +30,8 @@ import pytest
 import datetime
 from netCDF4 import Dataset
 from mslib.netCDF4tools import (identify_variable, identify_CF_lonlat,
-                                identify_vertical_axis, identify_CF_time, num2date, get_latlon_data
-                                )
+                                identify_vertical_axis, identify_CF_time, num2date, get_latlon_data,
+                                MFDatasetPool)
 
 from mslib._tests.constants import DATA_DIR
 
@@ -131,3 +131,36 @@ class Test_netCDF4tools(object):
     def test_num2date(self):
         date = num2date(0, "hours since 2012-10-17T12:00:00.000Z", calendar='standard')
         assert date == datetime.datetime(2012, 10, 17, 12, 0)
+
+
+class Test_MFDatasetPool(object):
+    def test_reuse(self):
+        pool = MFDatasetPool()
+        dataset = pool.acquire([DATA_FILE_PL])
+        assert pool.acquire([DATA_FILE_PL, DATA_FILE_PL]) is dataset
+        pool.release(dataset)
+        pool.release(dataset)
+        assert pool.acquire([DATA_FILE_PL]) is dataset
+        other = pool.acquire([DATA_FILE_PL], skip_dim_check=["time"])
+        assert other is not dataset
+        assert pool.open_files == 2
+        pool.release(dataset)
+        assert pool.get_mtimes(other) == {DATA_FILE_PL: os.path.getmtime(DATA_FILE_PL)}
+        pool.release(other)
+        pool.clear()
+        assert pool.open_files == 0
+
+    def test_eviction(self):
+        pool = MFDatasetPool(max_open_files=2)
+        dataset_ml = pool.acquire([DATA_FILE_ML])
+        dataset_pl = pool.acquire([DATA_FILE_PL])
+        dataset_tl = pool.acquire([DATA_FILE_TL])
+        # datasets in use are not closed
+        assert pool.open_files == 3
+        pool.release(dataset_ml)
+        assert pool.open_files == 2
+        pool.release(dataset_pl)
+        pool.release(dataset_tl)
+        assert pool.open_files == 2
+        assert pool.acquire([DATA_FILE_TL]) is dataset_tl
+        assert pool.acquire([DATA_FILE_ML]) is not dataset_ml
@@ -27,6 +27,9 @@
 import pytest
 import os
 import datetime
+import numpy as np
+from scipy.interpolate import interp1d
+from scipy.ndimage import map_coordinates
 from mslib import utils
 import multidict
 import werkzeug
@@ -260,6 +263,38 @@ class TestLatLonPoints(object):
         assert(times[1] - times[0] == times[2] - times[1])
 
 
+class TestInterpolateVertsec(object):
+    @staticmethod
+    def reference(data3D, data3D_lats, data3D_lons, lats, lons):
+        # level-by-level interpolation as done by former implementations
+        ind_lats = interp1d(data3D_lats, np.arange(len(data3D_lats)), bounds_error=False)(lats)
+        ind_lons = interp1d(data3D_lons, np.arange(len(data3D_lons)), bounds_error=False)(lons)
+        curtain = np.array([map_coordinates(data3D[ml], np.array([ind_lats, ind_lons]), order=1)
+                            for ml in range(data3D.shape[0])])
+        curtain[:, np.isnan(ind_lats) | np.isnan(ind_lons)] = np.nan
+        return np.ma.masked_invalid(curtain)
+
+    @pytest.mark.parametrize("data3D_lats, data3D_lons", [
+        (np.linspace(30, 70, 41), np.linspace(-50, 49, 100)),
+        (np.linspace(30, 70, 41) ** 1.1, np.linspace(-50, 49, 100) ** 3 / 49 ** 2),
+        (np.linspace(70, 30, 41), np.linspace(-50, 49, 100))])
+    def test_interpolate_vertsec(self, data3D_lats, data3D_lons):
+        data3D = np.random.RandomState(0).rand(20, len(data3D_lats), len(data3D_lons))
+        lons = np.linspace(-60, 49, 101)
+        lats = np.linspace(35.5, np.max(data3D_lats), 101) + 3 * np.sin(lons / 10.)
+        lats = np.append(lats, [data3D_lats[0], data3D_lats[-1], 40.])
+        lons = np.append(lons, [data3D_lons[0], data3D_lons[-1], data3D_lons[-1]])
+        expected = self.reference(data3D, data3D_lats, data3D_lons, lats, lons)
+        result = utils.interpolate_vertsec(data3D, data3D_lats, data3D_lons, lats, lons)
+        assert (result.mask == expected.mask).all()
+        assert np.allclose(result.filled(0), expected.filled(0))
+        assert result.mask.any() and not result.mask.all()
+
+        weights = utils.vertsec_interpolation_weights(data3D_lats, data3D_lons, lats, lons)
+        result2 = utils.interpolate_vertsec(data3D, data3D_lats, data3D_lons, lats, lons, weights=weights)
+        assert np.allclose(result.filled(0), result2.filled(0))
+
+
 def test_pathpoints():
     p1 = [0, 0, datetime.datetime(2012, 7, 1, 10, 30)]
     p2 = [10, 10, datetime.datetime(2012, 7, 1, 10, 40)]
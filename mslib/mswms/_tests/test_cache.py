@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms._tests.test_cache
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    This module provides pytest functions to tests mswms.cache
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from mslib.mswms.cache import CapabilitiesCache, LRUCache, ImageCache, SharedArrayCache, SingleFlight
+
+
+class Test_LRUCache(object):
+    def test_entries(self):
+        cache = LRUCache(max_entries=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        assert cache.get("a") == b"1"
+        cache.put("c", b"3")
+        assert "b" not in cache
+        assert cache.get("a") == b"1"
+        assert cache.get("c") == b"3"
+        assert cache.get("b") is None
+        assert (cache.hits, cache.misses) == (3, 1)
+
+    def test_bytes(self):
+        cache = LRUCache(max_bytes=10)
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        assert cache.nbytes == 10
+        cache.put("c", b"1")
+        assert "a" not in cache
+        assert cache.nbytes == 6
+        cache.put("d", b"12345678901")
+        assert "d" not in cache
+
+    def test_age(self):
+        cache = LRUCache(max_age=0.05)
+        cache.put("a", b"1")
+        assert cache.get("a") == b"1"
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_remove_if(self):
+        cache = LRUCache()
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.remove_if(lambda key, value: value == b"2")
+        assert "a" in cache
+        assert "b" not in cache
+
+
+class Test_ImageCache(object):
+    def test_memory(self):
+        cache = ImageCache()
+        assert cache.get("key") is None
+        cache.put("key", b"image")
+        assert cache.get("key") == b"image"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_disk(self, tmpdir):
+        directory = str(tmpdir.join("images"))
+        cache = ImageCache(directory=directory)
+        cache.put("key", b"image")
+        assert len(os.listdir(directory)) == 1
+        cache = ImageCache(directory=directory)
+        assert cache.get("key") == b"image"
+        cache.clear()
+        assert cache.get("key") is None
+        assert len(os.listdir(directory)) == 0
+
+    def test_disk_size(self, tmpdir):
+        directory = str(tmpdir.join("images"))
+        cache = ImageCache(memory_size=0, directory=directory, disk_size=10)
+        cache.put("a", b"123456")
+        os.utime(cache._filename("a"), (0, 0))
+        cache.put("b", b"123456")
+        assert len(os.listdir(directory)) == 1
+        assert cache.get("b") == b"123456"
+        assert cache.get("a") is None
+
+    def test_disk_overwrite(self, tmpdir):
+        cache = ImageCache(memory_size=0, directory=str(tmpdir.join("images")), disk_size=10)
+        cache.put("a", b"123456")
+        cache.put("a", b"1234")
+        assert cache._disk_usage == 4
+        cache.put("b", b"123456")
+        assert cache.get("a") == b"1234"
+        assert cache.get("b") == b"123456"
+
+
+class Test_SharedArrayCache(object):
+    def test_shared(self, tmpdir):
+        directory = str(tmpdir.join("arrays"))
+        cache = SharedArrayCache(directory)
+        assert cache.get("key") is None
+        value = np.arange(6.).reshape(2, 3)
+        shared = cache.put("key", value)
+        assert isinstance(shared, np.ndarray) and not shared.flags.writeable
+        # another process attaches the same file
+        other = SharedArrayCache(directory)
+        assert np.array_equal(other.get("key"), value)
+        assert (other.hits, other.misses) == (1, 0)
+        cache.clear()
+        assert other.get("key") is None
+        assert np.array_equal(shared, value)
+
+    def test_masked(self, tmpdir):
+        cache = SharedArrayCache(str(tmpdir.join("arrays")))
+        value = np.ma.masked_less(np.arange(6.).reshape(2, 3), 2)
+        cache.put("key", value)
+        result = cache.get("key")
+        assert np.ma.isMaskedArray(result)
+        assert result.mask.tolist() == value.mask.tolist()
+        assert result.compressed().tolist() == value.compressed().tolist()
+
+    def test_size(self, tmpdir):
+        directory = str(tmpdir.join("arrays"))
+        cache = SharedArrayCache(directory, max_bytes=1000)
+        cache.put("a", np.zeros(50))
+        for filename in os.listdir(directory):
+            os.utime(os.path.join(directory, filename), (0, 0))
+        cache.put("b", np.zeros(50))
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+        assert cache.put("c", np.zeros(200)) is None
+
+
+class Test_SingleFlight(object):
+    def _call_concurrently(self, single_flight, function, count=4):
+        """Calls function with the same key in <count> threads, while the
+        leader's call blocks until all followers are waiting.
+        """
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking():
+            started.set()
+            assert release.wait(10)
+            return function()
+
+        results = [None] * count
+
+        def call(i):
+            try:
+                results[i] = single_flight.call("key", blocking)
+            except Exception as ex:
+                results[i] = ex
+
+        threads = [threading.Thread(target=call, args=(0,))]
+        threads[0].start()
+        assert started.wait(10)
+        threads += [threading.Thread(target=call, args=(_i,)) for _i in range(1, count)]
+        for thread in threads[1:]:
+            thread.start()
+        while single_flight.coalesced < count - 1:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesced(self):
+        single_flight = SingleFlight()
+        calls = []
+        results = self._call_concurrently(single_flight, lambda: calls.append(1) or b"image")
+        assert results == [b"image"] * 4
+        assert len(calls) == 1
+        # later calls are not coalesced
+        assert single_flight.call("key", lambda: b"other") == b"other"
+
+    def test_exception(self):
+        def fail():
+            raise ValueError("no data")
+        results = self._call_concurrently(SingleFlight(), fail)
+        assert all(isinstance(_x, ValueError) for _x in results)
+
+    def test_timeout(self):
+        single_flight = SingleFlight(timeout=0.01)
+        release = threading.Event()
+        thread = threading.Thread(target=single_flight.call, args=("key", lambda: release.wait(10)))
+        thread.start()
+        while "key" not in single_flight._calls:
+            time.sleep(0.01)
+        try:
+            with pytest.raises(concurrent.futures.TimeoutError):
+                single_flight.call("key", lambda: None)
+        finally:
+            release.set()
+            thread.join()
+
+
+class Test_CapabilitiesCache(object):
+    def setup(self):
+        self.fingerprint = 1
+        self.builds = 0
+
+    def _build(self, fingerprint):
+        assert fingerprint == self.fingerprint
+        self.builds += 1
+        return self.builds
+
+    def _render(self, inventory, server_url):
+        return "{} {}".format(inventory, server_url).encode("utf-8")
+
+    def test_unchanged(self):
+        cache = CapabilitiesCache(self._build, self._render, lambda: self.fingerprint, check_interval=0)
+        document, etag = cache.get("http://a")
+        assert document == b"1 http://a"
+        assert cache.get("http://a") == (document, etag)
+        assert cache.get("http://b")[0] == b"1 http://b"
+        assert self.builds == 1
+
+    def test_changed(self):
+        cache = CapabilitiesCache(self._build, self._render, lambda: self.fingerprint, check_interval=0)
+        document, etag = cache.get("http://a")
+        self.fingerprint = 2
+        # the outdated document is served while the rebuild runs in the background
+        cache.get("http://a")
+        cache._rebuild_thread.join()
+        document2, etag2 = cache.get("http://a")
+        assert document2 == b"2 http://a"
+        assert etag2 != etag
+        assert self.builds == 2
+
+    def test_fingerprint_in_background(self):
+        threads = []
+
+        def fingerprint():
+            threads.append(threading.current_thread())
+            return self.fingerprint
+
+        cache = CapabilitiesCache(self._build, self._render, fingerprint, check_interval=0)
+        cache.get("http://a")
+        assert len(threads) == 1
+        self.fingerprint = 2
+        cache.get("http://a")
+        cache._rebuild_thread.join()
+        # the fingerprint is determined once per rebuild, not by the request
+        assert threads[1:] == [cache._rebuild_thread]
+        assert cache.get("http://a")[0] == b"2 http://a"
+        assert self.builds == 2
+
+    def test_check_interval(self):
+        cache = CapabilitiesCache(self._build, self._render, lambda: self.fingerprint, check_interval=3600)
+        cache.get("http://a")
+        self.fingerprint = 2
+        assert cache.get("http://a")[0] == b"1 http://a"
+        assert cache._rebuild_thread is None
+        cache.refresh()
+        assert cache.get("http://a")[0] == b"2 http://a"
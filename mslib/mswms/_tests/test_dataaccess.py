@@ -27,9 +27,11 @@
 """
 
 import os
+import threading
 from datetime import datetime
 
 import mock
+import pytest
 
 from mslib.mswms.dataaccess import DefaultDataAccess, CachedDataAccess
 from mslib._tests.constants import DATA_DIR
@@ -63,6 +65,113 @@ class Test_DefaultDataAccess(object):
         all_init_times = self.dut.get_init_times()
         assert all_init_times == [datetime(2012, 10, 17, 12, 0)]
 
+    def test_missing_lookup_cached(self):
+        self.dut._rescan = mock.MagicMock()
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                self.dut.get_filename("air_pressure", "ml", datetime(2000, 1, 1, 12, 0), datetime(2000, 1, 1, 18, 0))
+        assert self.dut._rescan.call_count == 1
+
+    def test_missing_lookup_expires(self):
+        self.dut._rescan = mock.MagicMock()
+        key = ("air_pressure", "ml", datetime(2000, 1, 1, 12, 0), datetime(2000, 1, 1, 18, 0))
+        with pytest.raises(ValueError):
+            self.dut.get_filename(*key)
+        with mock.patch.object(self.dut._missing, "put") as put:
+            with pytest.raises(ValueError):
+                self.dut.get_filename(*key)
+            put.assert_not_called()
+
+    def test_rescan_rate_limited(self):
+        self.dut.update_files = mock.MagicMock()
+        fn = sorted(self.dut._file_mtimes)[0]
+        self.dut._file_mtimes[fn] -= 1
+        self.dut._last_rescan = None
+        self.dut._rescan()
+        self.dut._rescan()
+        self.dut.update_files.assert_called_once_with([fn], [])
+
+    def test_rescan_concurrent(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def update_files(modified, removed):
+            started.set()
+            release.wait(5)
+
+        self.dut.update_files = mock.MagicMock(side_effect=update_files)
+        self.dut._file_mtimes[sorted(self.dut._file_mtimes)[0]] -= 1
+        self.dut._last_rescan = None
+        first = threading.Thread(target=self.dut._rescan)
+        first.start()
+        assert started.wait(5)
+        second = threading.Thread(target=self.dut._rescan)
+        second.start()
+        second.join(0.1)
+        assert second.is_alive()
+        release.set()
+        first.join(5)
+        second.join(5)
+        assert self.dut.update_files.call_count == 1
+
+    def test_update_files(self):
+        args = ("air_pressure", "ml", datetime(2012, 10, 17, 12, 0), datetime(2012, 10, 17, 18, 0))
+        fn = self.dut.get_filename(*args)
+        self.dut.update_files(removed=[fn])
+        assert not self.dut.have_data(*args)
+        assert fn not in self.dut.get_all_datafiles()
+        self.dut.update_files(modified=[fn])
+        assert self.dut.get_filename(*args) == fn
+        assert fn in self.dut.get_all_datafiles()
+
+    def test_update_files_copy(self):
+        args = ("air_pressure", "ml", datetime(2012, 10, 17, 12, 0), datetime(2012, 10, 17, 18, 0))
+        fn = self.dut.get_filename(*args)
+        filetree = self.dut._filetree
+        parse_files = self.dut._parse_files
+
+        def check_parse_files(filenames):
+            # concurrent requests still see the complete previous file tree
+            assert self.dut._filetree is filetree
+            assert self.dut.get_filename(*args) == fn
+            return parse_files(filenames)
+
+        with mock.patch.object(self.dut, "_parse_files", side_effect=check_parse_files) as mocked:
+            self.dut.update_files(modified=[fn])
+        assert mocked.call_count == 1
+        assert self.dut._filetree is not filetree
+        assert self.dut.get_filename(*args) == fn
+
+    def test_update_files_elevations(self):
+        times = (datetime(2012, 10, 17, 12, 0), datetime(2012, 10, 17, 12, 0))
+        content = {"vert_type": "pl", "elevations": {"levels": [100., 200.], "units": "hPa"},
+                   "init_time": times[0], "valid_times": [times[1]], "standard_names": ["air_temperature"]}
+        old_files = sorted(self.dut._elevations["pl"]["files"])
+        fn = "20121017_12_ecmwf_forecast.NEW_LEVELS.EUR_LL015.036.pl.nc"
+        for removed in ([], old_files):
+            with mock.patch("os.path.getmtime", return_value=1.), \
+                    mock.patch.object(self.dut, "_parse_files", return_value=[content]):
+                self.dut.update_files(modified=[fn], removed=removed)
+            # the levels fit only when the files with the old levels are gone
+            assert (fn in self.dut._rejected_files) == (not removed)
+        assert list(self.dut.get_elevations("pl")) == [100., 200.]
+        assert self.dut.get_filename("air_temperature", "pl", *times) == fn
+
+        self.dut.setup()
+        with mock.patch("os.path.getmtime", return_value=1.), \
+                mock.patch.object(self.dut, "_parse_files", return_value=[content]):
+            self.dut.update_files(modified=[fn])
+        # the skipped file is added once the files with the old levels are gone
+        self.dut.update_files(removed=old_files)
+        assert list(self.dut.get_elevations("pl")) == [100., 200.]
+        assert self.dut.get_filename("air_temperature", "pl", *times) == fn
+
+    def test_get_inventory_fingerprint(self):
+        fingerprint = self.dut.get_inventory_fingerprint()
+        assert fingerprint is not None
+        assert [_x[0] for _x in fingerprint] == sorted(os.listdir(DATA_DIR))
+        assert self.dut.get_inventory_fingerprint() == fingerprint
+
     def test_mfDatasetArgs(self):
         mfDatasetArgs = self.dut.mfDatasetArgs()
         assert mfDatasetArgs == {'skip_dim_check': []}
@@ -134,6 +243,62 @@ class Test_CachedDataAccess(Test_DefaultDataAccess):
         assert "nothere" not in self.dut._file_cache
 
 
+class Test_DefaultDataAccessParallel(Test_DefaultDataAccess):
+    """
+    Reuse default testcases with files being opened in parallel
+    """
+
+    def setup(self):
+        self.dut = DefaultDataAccess(DATA_DIR, "EUR_LL015", scan_processes=2)
+        self.dut.setup()
+
+    def test_elevations(self):
+        sequential = DefaultDataAccess(DATA_DIR, "EUR_LL015")
+        sequential.setup()
+        assert self.dut._filetree == sequential._filetree
+        for vert_type in sequential._elevations:
+            assert list(self.dut.get_elevations(vert_type)) == list(sequential.get_elevations(vert_type))
+
+
+class Test_CachedDataAccessInventory(object):
+    def test_inventory(self, tmpdir):
+        inventory = str(tmpdir.join("inventory.sqlite"))
+        dut = CachedDataAccess(DATA_DIR, "EUR_LL015", inventory=inventory)
+        dut.setup()
+        dut2 = CachedDataAccess(DATA_DIR, "EUR_LL015", inventory=inventory)
+        assert sorted(dut2._file_cache) == sorted(dut._file_cache)
+        dut2._parse_file = mock.MagicMock()
+        dut2.setup()
+        assert dut2._parse_file.call_count == 0
+        assert dut2.get_init_times() == dut.get_init_times()
+        dut3 = CachedDataAccess(DATA_DIR, "EUR_LL015", inventory=inventory, uses_init_time=False)
+        assert dut3._file_cache == {}
+
+    def test_statistics(self, tmpdir):
+        inventory = str(tmpdir.join("inventory.sqlite"))
+        dut = CachedDataAccess(DATA_DIR, "EUR_LL015", inventory=inventory, field_statistics=True)
+        dut.setup()
+        filename = dut.get_filename("air_temperature", "pl", datetime(2012, 10, 17, 12), datetime(2012, 10, 17, 12),
+                                    fullpath=True)
+        mtime = os.path.getmtime(filename)
+        # setting up does not read the data fields
+        assert dut.get_field_statistics(filename, mtime, "air_temperature", (0, 0)) is None
+        computed = dut.compute_statistics()
+        assert computed[filename][0] == mtime
+        assert dut.get_field_statistics(filename, mtime, "air_temperature", (0, 0)) is None
+        dut.add_statistics(computed)
+        statistics = dut.get_field_statistics(filename, mtime, "air_temperature", (0, 0))
+        assert statistics["min"] <= statistics["max"]
+        assert dut.get_field_statistics(filename, mtime + 1, "air_temperature", (0, 0)) is None
+        # the statistics are taken from the inventory
+        with mock.patch("mslib.mswms.dataaccess._file_statistics") as compute:
+            dut2 = CachedDataAccess(DATA_DIR, "EUR_LL015", inventory=inventory, field_statistics=True)
+            dut2.setup()
+            dut2.update_statistics()
+            assert compute.call_count == 0
+            assert dut2.get_field_statistics(filename, mtime, "air_temperature", (0, 0)) == statistics
+
+
 class Test_DefaultDataAccessNoInit(object):
     def setup(self):
         self.dut = DefaultDataAccess(DATA_DIR, "EUR_LL015", uses_init_time=False)
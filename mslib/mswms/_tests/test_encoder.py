@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms._tests.test_encoder
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    This module provides pytest functions to tests mswms.encoder
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import io
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from matplotlib.figure import Figure
+import mock
+import numpy as np
+import PIL.Image
+import pytest
+
+from mslib.mswms import encoder
+
+
+class Test_Encoder(object):
+    def _canvas(self, transparent):
+        fig = Figure(figsize=(2, 1), dpi=80, facecolor="white")
+        ax = fig.add_axes([0.0, 0.0, 1.0, 1.0])
+        ax.fill([0, 1, 1], [0, 0, 1], color="red", alpha=0.5)
+        if transparent:
+            fig.patch.set_alpha(0.)
+            ax.patch.set_visible(False)
+        return FigureCanvas(fig)
+
+    def test_encode_png(self):
+        image = PIL.Image.open(io.BytesIO(encoder.encode_canvas(self._canvas(False))))
+        assert image.format == "PNG"
+        assert image.mode == "P"
+        assert image.size == (160, 80)
+        assert "transparency" not in image.info
+
+    def test_encode_transparent_png(self):
+        image = PIL.Image.open(io.BytesIO(encoder.encode_canvas(self._canvas(True), transparent=True)))
+        assert image.mode == "P"
+        alpha = image.convert("RGBA").getchannel("A").histogram()
+        # the background is transparent, the filled area semi-transparent
+        assert alpha[0] > 0
+        assert any(alpha[101:150])
+
+    def test_encode_unquantized(self):
+        with mock.patch("mss_wms_settings.image_quantize", False, create=True):
+            image = PIL.Image.open(io.BytesIO(encoder.encode_canvas(self._canvas(True), transparent=True)))
+            assert image.mode == "RGBA"
+            image = PIL.Image.open(io.BytesIO(encoder.encode_canvas(self._canvas(False))))
+            assert image.mode == "RGB"
+
+    @pytest.mark.skipif("image/webp" not in encoder.image_formats(), reason="Pillow does not support WebP")
+    def test_encode_webp(self):
+        image = PIL.Image.open(io.BytesIO(encoder.encode_canvas(self._canvas(False), "image/webp")))
+        assert image.format == "WEBP"
+        assert image.size == (160, 80)
+
+    def test_unsupported_format(self):
+        with pytest.raises(ValueError):
+            encoder.encode_canvas(self._canvas(False), "image/gif")
+
+    def test_encode_arrays(self):
+        arrays = {
+            "latitude": np.linspace(45, 50, 5),
+            "air_temperature": np.ma.masked_greater(np.arange(15, dtype=np.float32).reshape(3, 5), 12),
+            "flags": np.arange(3, dtype=">i2")}
+        attributes, decoded = encoder.decode_arrays(encoder.encode_arrays(arrays, {"title": "test"}))
+        assert attributes == {"title": "test"}
+        assert decoded["latitude"].tolist() == arrays["latitude"].tolist()
+        assert decoded["air_temperature"].dtype == np.float32
+        assert np.isnan(decoded["air_temperature"][2, 3:]).all()
+        assert np.array_equal(decoded["air_temperature"][:2], arrays["air_temperature"][:2])
+        assert decoded["flags"].tolist() == [0, 1, 2]
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms._tests.test_inventory
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    This module provides pytest functions to tests mswms.inventory
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from mslib.mswms.inventory import FileInventory
+
+
+class Test_FileInventory(object):
+    def test_update(self, tmpdir):
+        filename = str(tmpdir.join("inventory.sqlite"))
+        content = {"vert_type": "pl", "elevations": {"levels": np.array([100., 200.]), "units": "hPa"},
+                   "init_time": datetime(2012, 10, 17, 12), "valid_times": [datetime(2012, 10, 17, 12)],
+                   "standard_names": ["air_temperature"]}
+        inventory = FileInventory(filename)
+        assert inventory.load("a") == {}
+        inventory.update("a", {"file1.nc": (1.5, 10, content), "file2.nc": (2.5, 20, content)})
+        inventory.update("b", {"file1.nc": (3.5, 30, content)})
+
+        entries = FileInventory(filename).load("a")
+        assert sorted(entries) == ["file1.nc", "file2.nc"]
+        mtime, size, loaded = entries["file1.nc"]
+        assert (mtime, size) == (1.5, 10)
+        assert loaded["init_time"] == content["init_time"]
+        assert np.allclose(loaded["elevations"]["levels"], content["elevations"]["levels"])
+
+        inventory.update("a", {}, removed=["file1.nc"])
+        assert sorted(inventory.load("a")) == ["file2.nc"]
+        assert sorted(inventory.load("b")) == ["file1.nc"]
+
+    def test_version(self, tmpdir):
+        filename = str(tmpdir.join("inventory.sqlite"))
+        inventory = FileInventory(filename)
+        inventory.update("a", {"file1.nc": (1.5, 10, {})})
+        FileInventory.VERSION += 1
+        try:
+            assert FileInventory(filename).load("a") == {}
+        finally:
+            FileInventory.VERSION -= 1
+
+    def test_statistics(self, tmpdir):
+        filename = str(tmpdir.join("inventory.sqlite"))
+        statistics = {("air_temperature", (0, 1)): {"min": 1., "max": 2., "percentiles": {50: 1.5},
+                                                    "nan_fraction": 0.}}
+        inventory = FileInventory(filename)
+        assert inventory.load_statistics("/data/file1.nc", 1.5) is None
+        inventory.store_statistics("/data/file1.nc", 1.5, statistics)
+        inventory = FileInventory(filename)
+        assert inventory.load_statistics("/data/file1.nc", 1.5) == statistics
+        assert inventory.load_statistics("/data/file1.nc", 2.5) is None
+        inventory.remove_statistics(["/data/file1.nc"])
+        assert inventory.load_statistics("/data/file1.nc", 1.5) is None
@@ -28,10 +28,19 @@
 """
 
 from datetime import datetime
+import matplotlib.collections
+import matplotlib.contour
+import mock
+import numpy as np
 import pytest
+from mslib import utils
+from mslib.mswms import encoder, mss_plot_driver
+from mslib.mswms.dataaccess import DefaultDataAccess
 from mslib.mswms.mss_plot_driver import VerticalSectionDriver, HorizontalSectionDriver
+from mslib._tests.constants import DATA_DIR
 import mss_wms_settings
 import mslib.mswms.mpl_vsec_styles as mpl_vsec_styles
+import mslib.mswms.mpl_hsec as mpl_hsec
 import mslib.mswms.mpl_hsec_styles as mpl_hsec_styles
 
 
@@ -87,6 +96,82 @@ class Test_VSec(object):
         img = self.plot(mpl_vsec_styles.VS_GenericStyle_TL_mole_fraction_of_ozone_in_air(driver=self.vsec))
         assert img is not None
 
+    def test_derived_datafields(self):
+        mss_plot_driver.SLAB_CACHE.clear()
+        temperature = mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec)
+        clouds = mpl_vsec_styles.VS_CloudsStyle_01(driver=self.vsec)
+        assert self.plot(temperature) is not None
+        assert self.plot(clouds) is not None
+        # potential temperature is derived only once for the same data
+        assert clouds.data["air_potential_temperature"] is temperature.data["air_potential_temperature"]
+        self.path = [[45.00, 8.], [50.00, 12.]]
+        assert self.plot(temperature) is not None
+        assert clouds.data["air_potential_temperature"] is not temperature.data["air_potential_temperature"]
+
+    def test_binary_data(self):
+        plot_object = mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec)
+        self.vsec.set_plot_parameters(plot_object=plot_object, bbox=self.bbox, vsec_path=self.path,
+                                      vsec_numpoints=101, vsec_path_connection='greatcircle',
+                                      init_time=self.init_time, valid_time=self.valid_time,
+                                      return_format=encoder.ARRAYS_FORMAT)
+        attributes, arrays = encoder.decode_arrays(self.vsec.plot())
+        assert attributes["valid_time"] == "2012-10-17T12:00:00Z"
+        assert len(arrays["latitude"]) == len(arrays["longitude"]) == 101
+        for name, _, _ in plot_object.required_datafields:
+            assert arrays[name].shape == (len(arrays["vertical_coordinate"]), 101)
+            assert name in attributes["units"]
+
+    def test_binary_data_without_init_time(self):
+        data = DefaultDataAccess(DATA_DIR, "EUR_LL015", uses_init_time=False)
+        data.setup()
+        self.vsec = VerticalSectionDriver(data)
+        plot_object = mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec)
+        self.vsec.set_plot_parameters(plot_object=plot_object, bbox=self.bbox, vsec_path=self.path,
+                                      vsec_numpoints=101, vsec_path_connection='greatcircle',
+                                      init_time=None, valid_time=self.valid_time,
+                                      return_format=encoder.ARRAYS_FORMAT)
+        attributes, arrays = encoder.decode_arrays(self.vsec.plot())
+        assert attributes["init_time"] is None
+        assert attributes["valid_time"] == "2012-10-17T12:00:00Z"
+        assert len(arrays["latitude"]) == 101
+
+    def load_curtains(self, plot_object):
+        self.vsec.set_plot_parameters(plot_object=plot_object, bbox=self.bbox, vsec_path=self.path,
+                                      vsec_numpoints=101, vsec_path_connection='greatcircle',
+                                      init_time=self.init_time, valid_time=self.valid_time)
+        data = self.vsec._load_interpolate_timestep()
+        timestep = self.vsec.times.searchsorted(self.valid_time)
+        expected = {}
+        for name, var in self.vsec.data_vars.items():
+            if len(var.shape) == 4:
+                var_data = var[timestep, ::-self.vsec.vert_order, ::self.vsec.lat_order, :]
+            else:
+                var_data = var[:][timestep, np.newaxis, ::self.vsec.lat_order, :]
+            expected[name] = utils.interpolate_vertsec(
+                var_data, self.vsec.lat_data, self.vsec.lon_data, self.vsec.lats, self.vsec.lons)
+        return data, expected
+
+    def test_corridor(self):
+        data, expected = self.load_curtains(mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec))
+        for name in expected:
+            assert data[name].shape == expected[name].shape
+            assert np.allclose(data[name], expected[name])
+
+    def test_restrict_vertical_range(self):
+        self.vsec.restrict_vertical_range = True
+        self.bbox = [3, 500, 3, 200]
+        data, expected = self.load_curtains(
+            mpl_vsec_styles.VS_GenericStyle_PL_mole_fraction_of_ozone_in_air(driver=self.vsec))
+        pressures = self.vsec.vert_data[::-self.vsec.vert_order]
+        read = (pressures >= 200) & (pressures <= 500)
+        assert read.any() and not read.all()
+        for name in expected:
+            assert data[name].shape == expected[name].shape
+            assert np.allclose(data[name][read], expected[name][read])
+            assert data[name][(pressures < 100) | (pressures > 700)].mask.all()
+        img = self.plot(mpl_vsec_styles.VS_GenericStyle_PL_mole_fraction_of_ozone_in_air(driver=self.vsec))
+        assert img is not None
+
     def test_VS_CloudsStyle_01(self):
         img = self.plot(mpl_vsec_styles.VS_CloudsStyle_01(driver=self.vsec))
         assert img is not None
@@ -162,6 +247,120 @@ class Test_HSec(object):
         img = self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec), crs=crs, bbox=bbox_meter)
         assert img is not None
 
+    @pytest.mark.parametrize("transparent", [False, True])
+    def test_basemap_raster_cache(self, transparent):
+        plot_object = mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec)
+        mpl_hsec.BASEMAP_RASTER_CACHE.clear()
+        with mock.patch.object(mss_wms_settings, "basemap_use_raster_cache", True, create=True):
+            images = []
+            for _ in range(2):
+                self.hsec.set_plot_parameters(plot_object=plot_object, bbox=self.bbox, crs="EPSG:4326",
+                                              init_time=self.init_time, valid_time=self.valid_time, noframe=True,
+                                              transparent=transparent)
+                images.append(self.hsec.plot())
+        assert len(mpl_hsec.BASEMAP_RASTER_CACHE) == 1
+        assert images[0] == images[1]
+        self.hsec.set_plot_parameters(plot_object=plot_object, bbox=self.bbox, crs="EPSG:4326",
+                                      init_time=self.init_time, valid_time=self.valid_time, noframe=True,
+                                      transparent=transparent)
+        assert self.hsec.plot() is not None
+
+    def test_projected_grid_cache(self):
+        mpl_hsec.PROJECTED_GRID_CACHE.clear()
+        hits = mpl_hsec.PROJECTED_GRID_CACHE.hits
+        assert self.plot(mpl_hsec_styles.HS_TemperatureStyle_PL_01(driver=self.hsec), level=800) is not None
+        # masking and plotting share the projected grid
+        assert mpl_hsec.PROJECTED_GRID_CACHE.hits == hits + 1
+        assert len(mpl_hsec.PROJECTED_GRID_CACHE) == 1
+        assert self.plot(mpl_hsec_styles.HS_GeopotentialWindStyle_PL(driver=self.hsec), level=300) is not None
+        assert len(mpl_hsec.PROJECTED_GRID_CACHE) == 1
+        assert self.plot(mpl_hsec_styles.HS_TemperatureStyle_PL_01(driver=self.hsec), level=800,
+                         crs="EPSG:3857", bbox=[-1e6, 4e6, 2e6, 7e6]) is not None
+        assert len(mpl_hsec.PROJECTED_GRID_CACHE) == 2
+
+    @pytest.mark.parametrize("decimation", ["mean", "subsample"])
+    def test_decimate_data(self, decimation):
+        plot_object = mpl_hsec_styles.HS_TemperatureStyle_PL_01(driver=self.hsec)
+        shapes = []
+        for plot_object.decimation in [None, decimation]:
+            with mock.patch.object(mss_wms_settings, "decimate_data", True, create=True):
+                self.hsec.set_plot_parameters(plot_object=plot_object, bbox=self.bbox, level=800, crs="EPSG:4326",
+                                              init_time=self.init_time, valid_time=self.valid_time, noframe=True,
+                                              figsize=(40, 20))
+                assert self.hsec.plot() is not None
+            shapes.append(plot_object.data["air_temperature"].shape)
+            assert shapes[-1] == (len(plot_object.lats), len(plot_object.lons))
+        assert shapes[1][0] < shapes[0][0] and shapes[1][1] < shapes[0][1]
+        assert np.all(np.diff(plot_object.lons) > 0) and np.all(np.diff(plot_object.lats) > 0)
+
+    def test_modified_files(self):
+        plot_object = mpl_hsec_styles.HS_TemperatureStyle_PL_01(driver=self.hsec)
+        assert self.plot(plot_object, level=800) is not None
+        with mock.patch.object(mss_plot_driver.DATASET_POOL, "acquire",
+                               wraps=mss_plot_driver.DATASET_POOL.acquire) as acquire:
+            assert self.plot(plot_object, level=300) is not None
+            assert acquire.call_count == 0
+            # pretend the files were rewritten since the dataset was opened
+            self.hsec.data_file_mtimes = dict((_x, _y - 1) for _x, _y in self.hsec.data_file_mtimes.items())
+            assert self.plot(plot_object, level=300) is not None
+            assert acquire.call_count == 1
+
+    def test_slab_cache(self):
+        mss_plot_driver.SLAB_CACHE.clear()
+        hits = mss_plot_driver.SLAB_CACHE.hits
+        assert self.plot(mpl_hsec_styles.HS_TemperatureStyle_PL_01(driver=self.hsec), level=800) is not None
+        assert len(mss_plot_driver.SLAB_CACHE) == 2
+        # air_temperature and geopotential_height are not read again
+        with mock.patch("mslib.mswms.mss_plot_driver._read_hyperslab",
+                        wraps=mss_plot_driver._read_hyperslab) as read:
+            assert self.plot(mpl_hsec_styles.HS_RelativeHumidityStyle_PL_01(driver=self.hsec), level=800) is not None
+            assert read.call_count == 1
+        assert mss_plot_driver.SLAB_CACHE.hits == hits + 2
+        assert len(mss_plot_driver.SLAB_CACHE) == 3
+        assert self.plot(mpl_hsec_styles.HS_TemperatureStyle_PL_01(driver=self.hsec), level=300) is not None
+        assert len(mss_plot_driver.SLAB_CACHE) == 5
+
+    def test_crop_margin(self):
+        plot_object = mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec)
+        margin = (64, 64, 0, 64)
+        self.hsec.set_plot_parameters(plot_object=plot_object, bbox=self.bbox, crs="EPSG:4326",
+                                      init_time=self.init_time, valid_time=self.valid_time, noframe=True,
+                                      figsize=(576, 448), crop_margin=margin)
+        img = self.hsec.plot()
+        assert img is not None
+        renderer = plot_object.fig.canvas.get_renderer()
+        for text in plot_object.fig.findobj(lambda _x: hasattr(_x, "get_text") and _x.get_visible() and _x.get_text()):
+            extent = text.get_window_extent(renderer)
+            assert (extent.x0 >= 64 and extent.x1 <= 576 and extent.y0 >= 64 and extent.y1 <= 384) or \
+                extent.x1 <= 64 or extent.y1 <= 64 or extent.y0 >= 384
+
+    def test_crop_margin_contour_lines(self):
+        def contour_paths(cs):
+            if isinstance(cs, matplotlib.collections.Collection):
+                return [_x.vertices.copy() for _x in cs.get_paths()]
+            return [_x.vertices.copy() for _y in cs.collections for _x in _y.get_paths()]
+
+        labelled = []
+        clabel = matplotlib.contour.ContourSet.clabel
+
+        def check_clabel(cs, *args, **kwargs):
+            before = contour_paths(cs)
+            result = clabel(cs, *args, **kwargs)
+            labelled.append((before, contour_paths(cs)))
+            return result
+
+        plot_object = mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec)
+        with mock.patch.object(matplotlib.contour.ContourSet, "clabel", check_clabel):
+            self.hsec.set_plot_parameters(plot_object=plot_object, bbox=self.bbox, crs="EPSG:4326",
+                                          init_time=self.init_time, valid_time=self.valid_time, noframe=True,
+                                          figsize=(576, 448), crop_margin=(64, 64, 0, 64))
+            assert self.hsec.plot() is not None
+        assert len(labelled) > 0
+        # the labels are not cut into the contour lines, also not at the crop border
+        for before, after in labelled:
+            assert len(before) == len(after)
+            assert all(np.array_equal(_x, _y) for _x, _y in zip(before, after))
+
     @pytest.mark.parametrize("crs", ["EPSG:12345678", "FNORD", "MSS:lagranto"])
     def test_invalid_crs_codes(self, crs):
         with pytest.raises(ValueError):
@@ -217,6 +416,24 @@ class Test_HSec(object):
             level=300, style=style)
         assert img is not None
 
+    def test_field_statistics(self):
+        plot_object = mpl_hsec_styles.HS_GenericStyle_PL_mole_fraction_of_ozone_in_air(driver=self.hsec)
+        assert self.plot(plot_object, level=300, style="auto") is not None
+        assert self.hsec.get_field_statistics("mole_fraction_of_ozone_in_air") is None
+
+        data = DefaultDataAccess(DATA_DIR, "EUR_LL015", field_statistics=True)
+        data.setup()
+        data.update_statistics()
+        self.hsec = HorizontalSectionDriver(data)
+        plot_object = mpl_hsec_styles.HS_GenericStyle_PL_mole_fraction_of_ozone_in_air(driver=self.hsec)
+        with mock.patch("mslib.mswms.mss_plot_driver._read_hyperslab",
+                        wraps=mss_plot_driver._read_hyperslab) as read:
+            assert self.plot(plot_object, level=300, style="auto", bbox=[0, 40, 20, 50]) is not None
+            # only the window of the plot is read at render time
+            assert all(_x[0][2] != slice(None) for _x in read.call_args_list)
+        statistics = self.hsec.get_field_statistics("mole_fraction_of_ozone_in_air")
+        assert statistics["min"] <= statistics["percentiles"][50] <= statistics["max"]
+
     def test_HS_GenericStyle_other(self):
         img = self.plot(mpl_hsec_styles.HS_GenericStyle_TL_mole_fraction_of_ozone_in_air(driver=self.hsec), level=300)
         assert img is not None
@@ -277,3 +494,30 @@ class Test_HSec(object):
     def test_HS_Meteosat_BT108_01(self):
         img = self.plot(mpl_hsec_styles.HS_Meteosat_BT108_01(driver=self.hsec))
         assert img is not None
+
+    def set_window_parameters(self, bbox, crs="EPSG:4326"):
+        self.hsec.set_plot_parameters(plot_object=mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec),
+                                      bbox=bbox, crs=crs, init_time=self.init_time, valid_time=self.valid_time)
+
+    def test_window(self):
+        self.set_window_parameters([-10, 40, 10, 50])
+        window = self.hsec._get_window()
+        assert window is not None
+        lat_slice, lon_slices = window
+        lats = self.hsec.lat_data[lat_slice]
+        lons = self.hsec.lon_data[lon_slices[0]]
+        assert len(lon_slices) == 1
+        assert lats[0] <= 40 - 3 and lats[-1] >= 50 + 3
+        assert lons[0] <= -10 - 4 and lons[-1] >= 10 + 4
+        assert len(lats) < len(self.hsec.lat_data) and len(lons) < len(self.hsec.lon_data)
+        full = self.hsec._load_timestep()
+        part = self.hsec._load_timestep(window)
+        for name in full:
+            assert (full[name][lat_slice, lon_slices[0]] == part[name]).all()
+
+        self.set_window_parameters([170, 40, 200, 50])
+        lat_slice, lon_slices = self.hsec._get_window()
+        assert lon_slices == [slice(None)]
+
+        self.set_window_parameters([-1e6, -1e6, 1e6, 1e6], crs="EPSG:3857")
+        assert self.hsec._get_window() is None
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms._tests.test_seed
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    This module provides pytest functions to tests mswms.seed
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from mslib.mswms import wms
+from mslib.mswms.cache import ImageCache
+from mslib.mswms.seed import Seeder
+
+
+class Test_Seeder(object):
+    def setup(self):
+        wms.server.image_cache = ImageCache()
+
+    def teardown(self):
+        wms.server.image_cache = None
+
+    def _seeder(self, **kwargs):
+        return Seeder(
+            wms.server, layers=["ecmwf_EUR_LL015.PLDiv01", "ecmwf_EUR_LL015.VS_HV01"],
+            valid_times=[datetime(2012, 10, 17, 12, 0)], levels=[200],
+            hsec_sections=[{"crs": "EPSG:4326", "bbox": [-50, 20, 20, 75], "width": 479, "height": 376}],
+            vsec_paths=[{"path": [[52.78, -8.93], [48.08, 11.28]], "bbox": [201, 500, 10, 180]}],
+            **kwargs)
+
+    def test_frames(self):
+        seeder = self._seeder()
+        assert seeder.init_time == datetime(2012, 10, 17, 12, 0)
+        frames = list(seeder.frames())
+        assert sorted(_x[0] for _x in frames) == ["getmap", "getvsec"]
+        query = dict(frames)["getmap"]
+        assert query["ELEVATION"] == "200.0"
+        assert query["TIME"] == "2012-10-17T12:00:00Z"
+
+    def test_run(self):
+        total, failed = self._seeder(workers=2).run()
+        assert (total, failed) == (2, 0)
+        assert wms.server.image_cache.misses == 2
+        # resuming does not render the frames again
+        self._seeder().run()
+        assert wms.server.image_cache.hits == 2
+
+    def test_no_cache(self):
+        wms.server.image_cache = None
+        with pytest.raises(RuntimeError):
+            self._seeder().run()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms._tests.test_tiles
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    This module provides pytest functions to tests mswms.tiles
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import io
+
+import pytest
+
+from mslib.mswms import tiles
+
+
+class Test_Tiles(object):
+    def test_get_tile_matrix_set(self):
+        assert tiles.get_tile_matrix_set("EPSG:3857") is tiles.get_tile_matrix_set("WebMercatorQuad")
+        with pytest.raises(ValueError):
+            tiles.get_tile_matrix_set("EPSG:1234")
+
+    def test_tile_bbox(self):
+        tms = tiles.get_tile_matrix_set("EPSG:4326")
+        assert tiles.matrix_size(tms, 0) == (2, 1)
+        assert tiles.tile_bbox(tms, 0, 0, 0) == [-180, -90, 0, 90]
+        assert tiles.tile_bbox(tms, 1, 3, 0) == [90, 0, 180, 90]
+        tms = tiles.get_tile_matrix_set("EPSG:3857")
+        left, bottom, right, top = tiles.tile_bbox(tms, 1, 1, 1)
+        assert left == 0 and top == 0 and right == pytest.approx(20037508.342789244)
+
+    def test_check_tile(self):
+        tms = tiles.get_tile_matrix_set("EPSG:4326")
+        tiles.check_tile(tms, 1, 3, 1)
+        for z, x, y in [(1, 4, 0), (1, 0, 2), (-1, 0, 0), (0, -1, 0)]:
+            with pytest.raises(ValueError):
+                tiles.check_tile(tms, z, x, y)
+        with pytest.raises(ValueError):
+            tiles.check_tile(tms, 5, 0, 0, max_zoom=4)
+
+    def test_meta_tile(self):
+        tms = tiles.get_tile_matrix_set("EPSG:3857")
+        assert tiles.meta_tile(tms, 3, 5, 6, 4) == (4, 4, 4, 4)
+        assert tiles.meta_tile(tms, 1, 1, 0, 4) == (0, 0, 2, 2)
+        assert tiles.block_bbox(tms, 1, 0, 0, 2, 2) == list(tms.extent)
+
+    def test_buffered_block(self):
+        tms = tiles.get_tile_matrix_set("EPSG:4326")
+        bbox, margin = tiles.buffered_block(tms, 2, 0, 0, 4, 4, 256, 64)
+        assert margin == (0, 0, 64, 0)
+        assert bbox == [-180, -90, 11.25, 90]
+        bbox, margin = tiles.buffered_block(tms, 3, 4, 4, 4, 4, 256, 512)
+        assert margin == (512, 512, 512, 0)
+        assert bbox == [-135, -90, 45, 45]
+
+    def test_split_image(self):
+        PIL_Image = pytest.importorskip("PIL.Image")
+        img = PIL_Image.new("P", (8, 4))
+        img.putpixel((5, 1), 1)
+        output = io.BytesIO()
+        img.save(output, format="PNG", transparency=0)
+        result = tiles.split_image(output.getvalue(), 2, 1, 4)
+        assert sorted(result) == [(0, 0), (1, 0)]
+        tile = PIL_Image.open(io.BytesIO(result[(1, 0)]))
+        assert tile.size == (4, 4)
+        assert tile.getpixel((1, 1)) == 1
+        assert tile.info["transparency"] == 0
+        result = tiles.split_image(output.getvalue(), 1, 1, 2, offset=(5, 1))
+        assert PIL_Image.open(io.BytesIO(result[(0, 0)])).getpixel((0, 0)) == 1
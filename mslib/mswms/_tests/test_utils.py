@@ -1,4 +1,7 @@
-from mslib.mswms.utils import Targets
+import numpy as np
+import pytest
+
+from mslib.mswms.utils import Targets, field_statistics, transform_statistics, get_style_parameters
 
 
 def test_targets():
@@ -9,3 +12,26 @@ def test_targets():
         Targets.get_range(standard_name)
         Targets.UNITS[standard_name]
         Targets.TITLES[standard_name]
+
+
+def test_field_statistics():
+    data = np.ma.masked_less(np.arange(101, dtype=float).reshape(1, 101), 1)
+    data[0, -1] = np.nan
+    statistics = field_statistics(data)
+    assert (statistics["min"], statistics["max"]) == (1., 99.)
+    assert statistics["percentiles"][50] == 50.
+    assert statistics["nan_fraction"] == pytest.approx(2. / 101)
+    assert field_statistics(np.full(3, np.nan))["min"] is None
+
+    converted = transform_statistics(statistics, lambda x: -x)
+    assert (converted["min"], converted["max"]) == (-99., -1.)
+    assert converted["percentiles"][1] == -statistics["percentiles"][99]
+
+
+def test_get_style_parameters_statistics():
+    data = np.linspace(10., 20., 11)
+    statistics = field_statistics(np.linspace(0., 100., 11))
+    cmin, cmax = get_style_parameters("air_temperature", "auto", None, None, data)[:2]
+    assert (cmin, cmax) == (10., 20.)
+    cmin, cmax = get_style_parameters("air_temperature", "auto", None, None, data, statistics=statistics)[:2]
+    assert (cmin, cmax) == (0., 100.)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms._tests.test_watcher
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    This module provides pytest functions to tests mswms.watcher
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import os
+import queue
+
+import pytest
+
+from mslib.mswms.watcher import DirectoryWatcher
+
+
+class Test_DirectoryWatcher(object):
+    @pytest.mark.parametrize("use_inotify", [True, False])
+    def test_changes(self, tmpdir, use_inotify):
+        directory = str(tmpdir)
+        with open(os.path.join(directory, "old.nc"), "w") as outfile:
+            outfile.write("old")
+        changes = queue.Queue()
+        watcher = DirectoryWatcher(
+            directory, lambda modified, removed: changes.put((modified, removed)),
+            poll_interval=0.1, settle_time=0.2, use_inotify=use_inotify).start()
+        try:
+            with open(os.path.join(directory, "new.nc"), "w") as outfile:
+                outfile.write("new")
+            os.remove(os.path.join(directory, "old.nc"))
+            assert changes.get(timeout=10) == (["new.nc"], ["old.nc"])
+        finally:
+            watcher.stop()
@@ -26,7 +26,14 @@
     limitations under the License.
 """
 
+import concurrent.futures.process
+
+import mock
+
 import mslib.mswms.mswms as mswms
+from mslib.mswms import wms
+from mslib.mswms.cache import ImageCache
+from mslib.mswms.renderpool import RenderPool
 from mslib._tests.utils import callback_ok_image, callback_ok_xml, callback_307_html
 
 
@@ -96,6 +103,21 @@ class Test_WMS(object):
         callback_ok_xml(result.status, result.headers)
         assert isinstance(result.data, bytes), result
 
+    def test_get_capabilities_etag(self):
+        self.client = mswms.application.test_client()
+        result = self.client.get('/?request=GetCapabilities&service=WMS&version=1.1.1')
+        callback_ok_xml(result.status, result.headers)
+        etag = result.headers["ETag"]
+        result2 = self.client.get('/?request=GetCapabilities&service=WMS&version=1.1.1',
+                                  headers={"If-None-Match": etag})
+        assert result2.status_code == 304
+        assert result2.data == b""
+        wms.server.capabilities_cache.refresh()
+        result3 = self.client.get('/?request=GetCapabilities&service=WMS&version=1.1.1',
+                                  headers={"If-None-Match": '"outdated"'})
+        callback_ok_xml(result3.status, result3.headers)
+        assert result3.data == result.data
+
     def test_produce_hsec_plot(self):
         environ = {
             'wsgi.url_scheme': 'http',
@@ -241,3 +263,121 @@ class Test_WMS(object):
         callback_307_html(result.status, result.headers)
         assert isinstance(result.data, bytes), result
         assert result.data.count(b"") > 0, result
+
+    def test_produce_hsec_plot_cached(self):
+        environ = {
+            'wsgi.url_scheme': 'http',
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': '/', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': 'localhost:8081',
+            'QUERY_STRING':
+                'layers=ecmwf_EUR_LL015.PLDiv01&styles=&elevation=200&srs=EPSG%3A4326&format=image%2Fpng&'
+                'request=GetMap&bgcolor=0xFFFFFF&height=376&dim_init_time=2012-10-17T12%3A00%3A00Z&width=479&'
+                'version=1.1.1&bbox=-50.0%2C20.0%2C20.0%2C75.0&time=2012-10-17T12%3A00%3A00Z&'
+                'exceptions=application%2Fvnd.ogc.se_xml&transparent=FALSE'}
+        wms.server.image_cache = ImageCache()
+        try:
+            self.client = mswms.application.test_client()
+            result = self.client.get('/?{}'.format(environ["QUERY_STRING"]))
+            callback_ok_image(result.status, result.headers)
+            assert wms.server.image_cache.misses == 1
+            result2 = self.client.get('/?{}'.format(environ["QUERY_STRING"].replace("FALSE", "false")))
+            callback_ok_image(result2.status, result2.headers)
+            assert wms.server.image_cache.hits == 1
+            assert result.data == result2.data
+        finally:
+            wms.server.image_cache = None
+
+    def test_produce_hsec_plot_multiple_layers(self):
+        query = {
+            "layers": "ecmwf_EUR_LL015.PLTemp01,ecmwf_EUR_LL015.PLGeopWind", "styles": ",",
+            "elevation": "200", "srs": "EPSG:4326", "format": "image/png", "request": "GetMap",
+            "height": "376", "width": "479", "bbox": "-50.0,20.0,20.0,75.0",
+            "dim_init_time": "2012-10-17T12:00:00Z", "time": "2012-10-17T12:00:00Z"}
+        image, return_format = wms.server.produce_plot(query, "getmap")
+        assert return_format == "image/png"
+        driver = wms.server.hsec_drivers["ecmwf_EUR_LL015"]
+        assert len(driver.overlays) == 1
+        assert set(driver.data_vars) == set(
+            _x[1] for _x in wms.server.hsec_layer_registry["ecmwf_EUR_LL015"]["PLTemp01"].required_datafields +
+            wms.server.hsec_layer_registry["ecmwf_EUR_LL015"]["PLGeopWind"].required_datafields)
+        single, _ = wms.server.produce_plot(dict(query, layers="ecmwf_EUR_LL015.PLTemp01"), "getmap")
+        assert image != single
+
+        query["layers"] = "ecmwf_EUR_LL015.PLTemp01,other.PLGeopWind"
+        _, return_format = wms.server.produce_plot(query, "getmap")
+        assert return_format == "text/xml"
+
+    def test_produce_tile(self):
+        query = "time=2012-10-17T12%3A00%3A00Z&dim_init_time=2012-10-17T12%3A00%3A00Z&elevation=200"
+        wms.server.tile_cache = ImageCache()
+        self.client = mswms.application.test_client()
+        result = self.client.get('/tiles/ecmwf_EUR_LL015.PLDiv01/EPSG:4326/2/4/1.png?{}'.format(query))
+        callback_ok_image(result.status, result.headers)
+        assert wms.server.tile_cache.hits == 0
+        # the other tiles of the meta tile were cached along
+        result2 = self.client.get('/tiles/ecmwf_EUR_LL015.PLDiv01/EPSG:4326/2/5/2.png?{}'.format(query))
+        callback_ok_image(result2.status, result2.headers)
+        assert wms.server.tile_cache.hits == 1
+        result3 = self.client.get('/tiles/ecmwf_EUR_LL015.PLDiv01/EPSG:3857/2/2/1.png?{}'.format(query))
+        callback_ok_image(result3.status, result3.headers)
+        # a meta tile rendered with buffer
+        result4 = self.client.get('/tiles/ecmwf_EUR_LL015.PLDiv01/EPSG:3857/4/8/5.png?{}'.format(query))
+        callback_ok_image(result4.status, result4.headers)
+
+    def test_produce_tile_service_exception(self):
+        self.client = mswms.application.test_client()
+        for url in ['/tiles/ecmwf_EUR_LL015.PLDiv01/EPSG:4326/1/4/0.png',
+                    '/tiles/ecmwf_EUR_LL015.PLDiv01/EPSG:1234/0/0/0.png',
+                    '/tiles/ecmwf_EUR_LL015.nonexisting/EPSG:4326/0/0/0.png',
+                    '/tiles/ecmwf_EUR_LL015.PLDiv01/EPSG:4326/0/0/0.png?time=2012-10-17T12%3A00%3A00Z&'
+                    'dim_init_time=2012-10-17T12%3A00%3A00Z&elevation=abc']:
+            result = self.client.get(url)
+            callback_ok_xml(result.status, result.headers)
+
+    def test_produce_hsec_plot_render_pool(self):
+        environ = {
+            'wsgi.url_scheme': 'http',
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': '/', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': 'localhost:8081',
+            'QUERY_STRING':
+                'layers=ecmwf_EUR_LL015.PLDiv01&styles=&elevation=200&srs=EPSG%3A4326&format=image%2Fpng&'
+                'request=GetMap&bgcolor=0xFFFFFF&height=376&dim_init_time=2012-10-17T12%3A00%3A00Z&width=479&'
+                'version=1.1.1&bbox=-50.0%2C20.0%2C20.0%2C75.0&time=2012-10-17T12%3A00%3A00Z&'
+                'exceptions=application%2Fvnd.ogc.se_xml&transparent=FALSE'}
+        wms.server.render_pool = RenderPool(wms._render_worker, 1)
+        try:
+            self.client = mswms.application.test_client()
+            result = self.client.get('/?{}'.format(environ["QUERY_STRING"]))
+            callback_ok_image(result.status, result.headers)
+            assert isinstance(result.data, bytes), result
+        finally:
+            wms.server.render_pool.shutdown()
+            wms.server.render_pool = None
+
+    def test_produce_plot_broken_render_pool(self):
+        query = ("layers=ecmwf_EUR_LL015.PLDiv01&styles=&elevation=200&srs=EPSG%3A4326&format=image%2Fpng&"
+                 "request=GetMap&height=376&dim_init_time=2012-10-17T12%3A00%3A00Z&width=479&version=1.1.1&"
+                 "bbox=-50.0%2C20.0%2C20.0%2C75.0&time=2012-10-17T12%3A00%3A00Z")
+        tile_query = "time=2012-10-17T12%3A00%3A00Z&dim_init_time=2012-10-17T12%3A00%3A00Z&elevation=200"
+        with mock.patch.object(wms.server, "render", side_effect=concurrent.futures.process.BrokenProcessPool()), \
+                mock.patch.object(wms.server, "image_cache", None), \
+                mock.patch.object(wms.server, "tile_cache", ImageCache()):
+            self.client = mswms.application.test_client()
+            result = self.client.get('/?{}'.format(query))
+            callback_ok_xml(result.status, result.headers)
+            assert b"too busy" in result.data
+            result = self.client.get('/tiles/ecmwf_EUR_LL015.PLDiv01/EPSG:4326/2/4/1.png?{}'.format(tile_query))
+            callback_ok_xml(result.status, result.headers)
+            assert b"too busy" in result.data
+
+    def test_update_data_files_statistics(self):
+        data_access = wms.mss_wms_settings.data["ecmwf_EUR_LL015"]
+
+        def compute_statistics(filenames=None):
+            # the data fields are read without blocking the rendering
+            assert not wms.server._render_lock.locked()
+            return {"path": (0, {})}
+
+        with mock.patch.object(data_access, "compute_statistics", side_effect=compute_statistics) as compute, \
+                mock.patch.object(data_access, "add_statistics") as add:
+            wms.server.update_data_files(["ecmwf_EUR_LL015"], None, [])
+            compute.assert_called_once_with(None)
+            add.assert_called_once_with({"path": (0, {})})
@@ -0,0 +1,536 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms.cache
+    ~~~~~~~~~~~~~~~~~
+
+    Caches used by the MSS WMS server to avoid re-producing identical results.
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import collections
+import concurrent.futures
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+
+def _sizeof(value):
+    """Returns the size of a cached value in bytes, if it can be determined.
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    try:
+        return len(value)
+    except TypeError:
+        return 0
+
+
+def _write_file(filename, write):
+    """Writes a file by calling write(file object) on a temporary file, which
+    is then renamed to <filename>, so that other threads and processes never
+    see a partially written file. Returns the size of the replaced file (0 if
+    there was none).
+    """
+    tmpname = "{}.{}.{}.tmp".format(filename, os.getpid(), threading.get_ident())
+    try:
+        with open(tmpname, "wb") as cache_file:
+            write(cache_file)
+        try:
+            old_size = os.path.getsize(filename)
+        except OSError:
+            old_size = 0
+        os.replace(tmpname, filename)
+    except (IOError, OSError):
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+        raise
+    return old_size
+
+
+def _evict_files(filenames, max_bytes):
+    """Removes the least recently modified of the files <filenames> until
+    their total size does not exceed <max_bytes>. Returns the total size of
+    the remaining files.
+    """
+    files = []
+    for filename in filenames:
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, filename))
+    files.sort()
+    usage = sum(_x[1] for _x in files)
+    for _, size, filename in files:
+        if usage <= max_bytes:
+            break
+        try:
+            os.remove(filename)
+        except OSError:
+            continue
+        usage -= size
+    return usage
+
+
+class LRUCache(object):
+    """Thread-safe in-memory cache discarding the least recently used entries.
+
+    The cache may be bounded by the number of entries, by the accumulated size
+    of the stored values (as determined by <sizeof>) and by the age of the
+    entries in seconds. Hits and misses are counted.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, max_age=None, sizeof=_sizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._sizeof = sizeof
+        self._entries = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries and not self._expired(self._entries[key][1])
+
+    def _expired(self, timestamp):
+        return self.max_age is not None and time.time() - timestamp > self.max_age
+
+    def get(self, key, default=None):
+        """Returns the value stored for <key> and marks it as recently used.
+        """
+        with self._lock:
+            try:
+                value, timestamp, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if self._expired(timestamp):
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Stores <value> for <key>, discarding old entries if necessary.
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                logging.debug("not caching entry of %s bytes exceeding cache size", size)
+                return
+            self._entries[key] = (value, time.time(), size)
+            self.nbytes += size
+            while ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                   (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.nbytes -= size
+
+    def pop(self, key, default=None):
+        """Removes <key> from the cache and returns its value.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key][0]
+            self._remove(key)
+            return value
+
+    def remove_if(self, predicate):
+        """Removes all entries for which predicate(key, value) is True.
+        """
+        with self._lock:
+            for key in [_k for _k, _v in self._entries.items() if predicate(_k, _v[0])]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+class ImageCache(object):
+    """Two-tier cache for produced images.
+
+    Images are kept in an in-memory LRU cache and, if a directory is given,
+    additionally stored on disk so that they survive a restart of the server
+    and can be shared between server processes. Both tiers are bounded in size
+    (bytes) and in the age of the entries (seconds).
+
+    Keys are arbitrary strings; they are hashed to derive the file names of
+    the disk tier.
+    """
+
+    def __init__(self, memory_size=128 * 1024 ** 2, directory=None, disk_size=1024 ** 3, max_age=None):
+        self._memory = LRUCache(max_bytes=memory_size, max_age=max_age)
+        self._directory = directory
+        self._disk_size = disk_size
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self._directory is not None:
+            if not os.path.exists(self._directory):
+                os.makedirs(self._directory)
+            self._disk_usage = sum(
+                os.path.getsize(_x) for _x in self._disk_files())
+
+    def _disk_files(self):
+        return [os.path.join(self._directory, _x) for _x in os.listdir(self._directory)
+                if _x.endswith(".img")]
+
+    def _filename(self, key):
+        return os.path.join(self._directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".img")
+
+    def get(self, key):
+        """Returns the cached image for <key> or None.
+        """
+        image = self._memory.get(key)
+        if image is None and self._directory is not None:
+            filename = self._filename(key)
+            try:
+                if self._max_age is not None and time.time() - os.path.getmtime(filename) > self._max_age:
+                    self._remove_file(filename)
+                else:
+                    with open(filename, "rb") as cache_file:
+                        image = cache_file.read()
+                    self._memory.put(key, image)
+            except (IOError, OSError):
+                pass
+        with self._lock:
+            if image is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            logging.debug("image cache: %s hits, %s misses", self.hits, self.misses)
+        return image
+
+    def put(self, key, image):
+        """Stores <image> (bytes or str) for <key> in both tiers.
+        """
+        self._memory.put(key, image)
+        if self._directory is None:
+            return
+        if isinstance(image, str):
+            image = image.encode("utf-8")
+        filename = self._filename(key)
+        try:
+            old_size = _write_file(filename, lambda cache_file: cache_file.write(image))
+        except (IOError, OSError) as ex:
+            logging.error("Could not write image cache file '%s': %s %s", filename, type(ex), ex)
+            return
+        with self._lock:
+            # an overwritten file does not take up space anymore
+            self._disk_usage += len(image) - old_size
+            if self._disk_usage > self._disk_size:
+                self._disk_usage = _evict_files(self._disk_files(), self._disk_size)
+
+    def _remove_file(self, filename):
+        try:
+            size = os.path.getsize(filename)
+            os.remove(filename)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_usage -= size
+
+    def invalidate(self, predicate):
+        """Removes the images whose keys satisfy predicate(key) from the
+        memory tier. Images on disk cannot be selected by their keys and
+        are purged by size and age only.
+        """
+        self._memory.remove_if(lambda key, _: predicate(key))
+
+    def clear(self):
+        """Removes all images from both tiers.
+        """
+        self._memory.clear()
+        if self._directory is not None:
+            for filename in self._disk_files():
+                self._remove_file(filename)
+
+
+class SharedArrayCache(object):
+    """Cache of read-only numpy arrays shared between processes.
+
+    The arrays are stored as .npy files in <directory> (preferably on a
+    memory file system like /dev/shm) and attached by all processes as memory
+    maps, so that each array is held only once in memory. The file system
+    coordinates the processes: files are published atomically by renaming
+    them, and files removed while they are attached stay valid until the last
+    process has dropped its arrays. Masked arrays are stored as data file and
+    mask file.
+
+    The files are bounded in total size (bytes) by removing the least
+    recently used ones. Keys are arbitrary strings; they are hashed to derive
+    the file names.
+    """
+
+    def __init__(self, directory, max_bytes=1024 ** 3):
+        self._directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(self._directory):
+            os.makedirs(self._directory)
+
+    def _files(self):
+        return [os.path.join(self._directory, _x) for _x in os.listdir(self._directory)
+                if _x.endswith(".npy")]
+
+    def _filenames(self, key):
+        """Returns the names of the data file of arrays, of the data file of
+        masked arrays and of the mask file.
+        """
+        base = os.path.join(self._directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+        return base + ".npy", base + ".data.npy", base + ".mask.npy"
+
+    @staticmethod
+    def _attach(filename):
+        value = np.load(filename, mmap_mode="r").view(np.ndarray)
+        # mark the file as recently used
+        os.utime(filename)
+        return value
+
+    def _load(self, key):
+        filename, data_filename, mask_filename = self._filenames(key)
+        try:
+            return self._attach(filename)
+        except (IOError, OSError, ValueError):
+            pass
+        try:
+            return np.ma.masked_array(self._attach(data_filename), mask=self._attach(mask_filename))
+        except (IOError, OSError, ValueError):
+            return None
+
+    def get(self, key):
+        """Returns the array stored for <key> or None.
+        """
+        value = self._load(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @staticmethod
+    def _write(filename, value):
+        _write_file(filename, lambda cache_file: np.save(cache_file, value))
+
+    def put(self, key, value):
+        """Publishes the array <value> for <key>. Returns the attached copy
+        of the array, which should be used instead of <value>, or None, if
+        the array could not be stored.
+        """
+        filename, data_filename, mask_filename = self._filenames(key)
+        mask = np.ma.getmask(value)
+        if value.nbytes + (0 if mask is np.ma.nomask else mask.nbytes) > self.max_bytes:
+            logging.debug("not caching array of %s bytes exceeding cache size", value.nbytes)
+            return None
+        try:
+            if mask is np.ma.nomask:
+                self._write(filename, np.ma.getdata(value))
+            else:
+                # the mask needs to exist as soon as the data file does
+                self._write(mask_filename, mask)
+                self._write(data_filename, np.ma.getdata(value))
+        except (IOError, OSError) as ex:
+            logging.error("Could not write shared array cache file for '%s': %s %s", key, type(ex), ex)
+            return None
+        # attached files are marked as recently used by their modification time
+        _evict_files(self._files(), self.max_bytes)
+        return self._load(key)
+
+    def clear(self):
+        """Removes all arrays.
+        """
+        for filename in self._files():
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+
+class SingleFlight(object):
+    """Coalesces concurrent identical calls.
+
+    The first caller for a key (the leader) calls the function, while callers
+    with the same key arriving before it finished (the followers) wait for
+    its result instead of calling the function again. Exceptions of the
+    leader are raised in the followers, too. Followers raise
+    concurrent.futures.TimeoutError if the result is not available within
+    <timeout> seconds (None waits forever). The number of coalesced calls is
+    counted.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def call(self, key, function, *args, **kwargs):
+        """Returns function(*args, **kwargs), sharing the result with the
+        concurrent calls with the same <key>.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            logging.debug("waiting for the result of an identical request")
+            return future.result(timeout=self.timeout)
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class CapabilitiesCache(object):
+    """Cache for the capabilities documents of the server.
+
+    The documents are rendered by <render>(inventory, server_url) from an
+    inventory of the offered layers that is produced by <build>(fingerprint).
+    The inventory is only rebuilt if the value returned by <fingerprint>()
+    (e.g. the modification times of the data files) changes; this is checked
+    at most every <check_interval> seconds. Once an inventory exists, checks
+    and rebuilds run in a background thread and the previous documents are
+    served until the new inventory is complete.
+
+    Each document is accompanied by an entity tag derived from its content,
+    so that clients may revalidate their copy.
+    """
+
+    def __init__(self, build, render, fingerprint, check_interval=10, max_documents=16):
+        self._build = build
+        self._render = render
+        self._fingerprint = fingerprint
+        self.check_interval = check_interval
+        self._documents = LRUCache(max_entries=max_documents)
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._inventory = None
+        self._inventory_fingerprint = None
+        self._generation = 0
+        self._last_check = None
+        self._rebuild_thread = None
+
+    def refresh(self):
+        """Rebuilds the inventory synchronously and discards all documents.
+        """
+        with self._build_lock:
+            self._refresh()
+
+    def _refresh(self, fingerprint=None):
+        """Requires self._build_lock to be held.
+        """
+        # determine the fingerprint first, so that changes during the
+        # build trigger another rebuild.
+        if fingerprint is None:
+            fingerprint = self._fingerprint()
+        inventory = self._build(fingerprint)
+        with self._lock:
+            self._inventory = inventory
+            self._inventory_fingerprint = fingerprint
+            self._generation += 1
+            self._last_check = time.time()
+        self._documents.clear()
+        logging.debug("capabilities inventory rebuilt (generation %s)", self._generation)
+
+    def invalidate(self):
+        """Rebuilds the inventory in the background on the next request.
+        """
+        with self._lock:
+            self._inventory_fingerprint = object()
+            self._last_check = None
+
+    def _refresh_in_background(self):
+        """Rebuilds the inventory if the fingerprint changed.
+        """
+        try:
+            fingerprint = self._fingerprint()
+            if fingerprint == self._inventory_fingerprint:
+                return
+            logging.info("data inventory changed, rebuilding capabilities in the background")
+            with self._build_lock:
+                self._refresh(fingerprint)
+        except Exception as ex:
+            logging.error("Could not rebuild capabilities inventory: %s %s", type(ex), ex)
+
+    def _check(self):
+        """Starts checking the fingerprint in the background, so that requests
+        do not wait for it, and rebuilding the inventory if it changed.
+        """
+        with self._lock:
+            if self._last_check is not None and time.time() - self._last_check < self.check_interval:
+                return
+            self._last_check = time.time()
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return
+            self._rebuild_thread = threading.Thread(
+                target=self._refresh_in_background, name="capabilities-rebuild", daemon=True)
+            self._rebuild_thread.start()
+
+    def get(self, server_url):
+        """Returns the document for <server_url> and its entity tag.
+        """
+        if self._inventory is None:
+            with self._build_lock:
+                if self._inventory is None:
+                    self._refresh()
+        else:
+            self._check()
+        with self._lock:
+            inventory, generation = self._inventory, self._generation
+        key = (generation, server_url)
+        result = self._documents.get(key)
+        if result is None:
+            document = self._render(inventory, server_url)
+            result = (document, hashlib.sha1(document).hexdigest())
+            self._documents.put(key, result)
+        return result
@@ -27,14 +27,22 @@
 """
 
 from abc import ABCMeta, abstractmethod
+import concurrent.futures
+import copy
 import itertools
+import multiprocessing
 import os
 import logging
+import threading
+import time
 import netCDF4
 import numpy as np
 import pint
 
 from mslib import netCDF4tools
+from mslib.mswms.cache import LRUCache
+from mslib.mswms.inventory import FileInventory
+from mslib.mswms.utils import field_statistics
 from mslib.utils import UR
 
 
@@ -67,6 +75,41 @@ class NWPDataAccess(metaclass=ABCMeta):
         """
         pass
 
+    def update_files(self, modified=(), removed=()):
+        """Updates the class after the files <modified> were created or
+           modified and the files <removed> were removed. Subclasses may
+           implement this more efficiently than a complete setup().
+        """
+        self.setup()
+
+    def compute_statistics(self, filenames=None):
+        """Computes the statistics (see mslib.mswms.utils.field_statistics())
+           of the data fields in the data files <filenames> (default: all) to
+           be passed to add_statistics(). This may take long, but does not
+           modify the class, so that requests are not blocked meanwhile.
+        """
+        return {}
+
+    def add_statistics(self, statistics):
+        """Makes the <statistics> returned by compute_statistics() available
+           to get_field_statistics().
+        """
+        pass
+
+    def update_statistics(self, filenames=None):
+        """Computes and adds the statistics of the data fields in the data
+           files <filenames> (default: all).
+        """
+        self.add_statistics(self.compute_statistics(filenames))
+
+    def get_field_statistics(self, filename, mtime, variable, index):
+        """Returns the precomputed statistics (see
+           mslib.mswms.utils.field_statistics()) of the data field <variable>
+           at <index> (time step and level) in the data file <filename> with
+           modification time <mtime>, or None if they are not known.
+        """
+        return None
+
     def have_data(self, variable, vartype, init_time, valid_time):
         """Checks whether a file with data for the specified variable,
            type and times is known. This does not trigger a search for
@@ -128,6 +171,22 @@ class NWPDataAccess(metaclass=ABCMeta):
         """
         return self._use_valid_time
 
+    def get_inventory_fingerprint(self):
+        """Returns a value that changes whenever files in the data directory
+           are added, removed or modified. In contrast to setup(), the files
+           are not opened, so that this is cheap enough to be called often.
+        """
+        fingerprint = []
+        try:
+            for entry in os.scandir(self._root_path):
+                if entry.is_file():
+                    stat = entry.stat()
+                    fingerprint.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        except OSError as ex:
+            logging.error("Could not scan data directory '%s': %s %s", self._root_path, type(ex), ex)
+            return None
+        return tuple(sorted(fingerprint))
+
     @abstractmethod
     def get_all_datafiles(self):
         """Return a list of all available data files.
@@ -171,6 +230,126 @@ class NWPDataAccess(metaclass=ABCMeta):
         return self._mfDatasetArgsDict
 
 
+def _parse_file(root_path, filename, uses_init_time, uses_valid_time):
+    """Determines the vertical type, elevations, init time, valid times and
+       standard names of the variables contained in the data file <filename>.
+       Raises IOError if the file does not fit the expected structure.
+    """
+    elevations = {"levels": [], "units": None}
+    with netCDF4.Dataset(os.path.join(root_path, filename)) as dataset:
+
+        time_name, time_var = netCDF4tools.identify_CF_time(dataset)
+        init_time = netCDF4tools.num2date(0, time_var.units)
+        if not uses_init_time:
+            init_time = None
+        valid_times = netCDF4tools.num2date(time_var[:], time_var.units)
+        if not uses_valid_time:
+            if len(valid_times) > 0:
+                raise IOError("Skipping file '{}: no support for valid time, but multiple "
+                              "time steps present".format(filename))
+            valid_times = [None]
+        lat_name, lat_var, lon_name, lon_var = netCDF4tools.identify_CF_lonlat(dataset)
+        vert_name, vert_var, _, _, vert_type = netCDF4tools.identify_vertical_axis(dataset)
+
+        if len(time_var.dimensions) != 1 or time_var.dimensions[0] != time_name:
+            raise IOError("Problem with time coordinate variable")
+        if len(lat_var.dimensions) != 1 or lat_var.dimensions[0] != lat_name:
+            raise IOError("Problem with latitude coordinate variable")
+        if len(lon_var.dimensions) != 1 or lon_var.dimensions[0] != lon_name:
+            raise IOError("Problem with longitude coordinate variable")
+
+        if vert_type != "sfc":
+            elevations = {"levels": vert_var[:], "units": vert_var.units}
+
+        standard_names = []
+        for ncvarname, ncvar in dataset.variables.items():
+            if hasattr(ncvar, "standard_name"):
+                if (len(ncvar.dimensions) >= 3 and (
+                        ncvar.dimensions[0] != time_name or
+                        ncvar.dimensions[-2] != lat_name or
+                        ncvar.dimensions[-1] != lon_name)):
+                    logging.error("Skipping variable '%s' in file '%s': Incorrect order of dimensions",
+                                  ncvarname, filename)
+                    continue
+                if not hasattr(ncvar, "units"):
+                    logging.error("Skipping variable '%s' in file '%s': No units attribute",
+                                  ncvarname, filename)
+                    continue
+                if ncvar.standard_name != "time":
+                    try:
+                        UR(ncvar.units)
+                    except (ValueError, pint.UndefinedUnitError):
+                        logging.error("Skipping variable '%s' in file '%s': unparseable units attribute '%s'",
+                                      ncvarname, filename, ncvar.units)
+                        continue
+                if len(ncvar.shape) == 4 and vert_name in ncvar.dimensions:
+                    standard_names.append(ncvar.standard_name)
+                elif len(ncvar.shape) == 3 and vert_type == "sfc":
+                    standard_names.append(ncvar.standard_name)
+    return {
+        "vert_type": vert_type,
+        "elevations": elevations,
+        "init_time": init_time,
+        "valid_times": valid_times,
+        "standard_names": standard_names
+    }
+
+
+def _file_statistics(path):
+    """Computes the statistics (see mslib.mswms.utils.field_statistics()) of
+       the data fields in the data file <path>. Returns a dictionary mapping
+       the standard name and index ((time step,) or (time step, level), as
+       used by the plot drivers) to the statistics.
+    """
+    statistics = {}
+    with netCDF4.Dataset(path) as dataset:
+        time_name, _ = netCDF4tools.identify_CF_time(dataset)
+        for ncvar in dataset.variables.values():
+            if (not hasattr(ncvar, "standard_name") or len(ncvar.shape) not in (3, 4) or
+                    ncvar.dimensions[0] != time_name):
+                continue
+            for timestep in range(ncvar.shape[0]):
+                data = ncvar[timestep]
+                if len(ncvar.shape) == 3:
+                    statistics[(ncvar.standard_name, (timestep,))] = field_statistics(data)
+                    continue
+                for level in range(ncvar.shape[1]):
+                    statistics[(ncvar.standard_name, (timestep, level))] = field_statistics(data[level])
+    return statistics
+
+
+def _file_statistics_safe(path):
+    """Calls _file_statistics (in a worker process), returning None instead
+       of propagating errors.
+    """
+    try:
+        return _file_statistics(path)
+    except (IOError, OSError, RuntimeError, ValueError) as ex:
+        logging.error("Could not compute statistics of '%s': %s %s", path, type(ex), ex)
+        return None
+
+
+def _copy_filetree(filetree):
+    """Returns a copy of <filetree> (vartype -> init time -> variable ->
+       valid time -> filename), whose nested dictionaries may be modified.
+    """
+    return dict(
+        (_vartype, dict(
+            (_init_time, dict((_variable, dict(_leaf)) for _variable, _leaf in _init_leaf.items()))
+            for _init_time, _init_leaf in _vartype_leaf.items()))
+        for _vartype, _vartype_leaf in filetree.items())
+
+
+def _parse_file_safe(*args):
+    """Calls _parse_file in a worker process, returning a raised IOError
+       instead of propagating it.
+    """
+    try:
+        return _parse_file(*args)
+    except IOError as ex:
+        return ex
+
+
 class DefaultDataAccess(NWPDataAccess):
     """
     Subclass to NWPDataAccess for accessing properly constructed NetCDF files
@@ -180,14 +359,37 @@ class DefaultDataAccess(NWPDataAccess):
     # Workaround for the numerical issue concering the lon dimension in
     # NetCDF files produced by netcdf-java 4.3..
 
-    def __init__(self, rootpath, domain_id, skip_dim_check=[], **kwargs):
+    def __init__(self, rootpath, domain_id, skip_dim_check=[], scan_processes=1,
+                 rescan_interval=10, missing_cache_time=60, field_statistics=False, **kwargs):
         """Constructor takes the path of the data directory and determines whether
            this class employs different init_times or valid_times.
+           Up to <scan_processes> data files are opened in parallel by setup().
+
+           If a requested file is unknown, the data directory is searched for
+           new or modified files at most every <rescan_interval> seconds, and
+           the failed lookup is remembered for <missing_cache_time> seconds.
+
+           If <field_statistics> is True, the statistics of all data fields are
+           computed by compute_statistics(), to be used by the auto colour scales.
         """
         NWPDataAccess.__init__(self, rootpath, **kwargs)
         self._domain_id = domain_id
+        self._scan_processes = scan_processes
+        self._rescan_interval = rescan_interval
+        self._last_rescan = None
+        self._missing = LRUCache(max_entries=10000, max_age=missing_cache_time)
+        self._file_mtimes = {}
         self._available_files = None
         self._filetree = None
+        # filename -> parsed content of the files skipped as their vertical
+        # levels do not fit, which are added again once the levels change
+        self._rejected_files = {}
+        self._compute_statistics = field_statistics
+        # path -> (modification time, statistics of the data fields)
+        self._field_statistics = {}
+        # serialises rescans and updates of the file tree, which may be
+        # triggered by request threads as well as by the file watcher
+        self._update_lock = threading.RLock()
         self._mfDatasetArgsDict = {"skip_dim_check": skip_dim_check}
 
     def _determine_filename(self, variable, vartype, init_time, valid_time, reload=True):
@@ -196,90 +398,201 @@ class DefaultDataAccess(NWPDataAccess):
            by <init_time> and <valid_time>.
         """
         assert self._filetree is not None, "filetree is None. Forgot to call setup()?"
+        key = (variable, vartype, init_time, valid_time)
         try:
             return self._filetree[vartype][init_time][variable][valid_time]
         except KeyError:
-            if reload:
-                self.setup()
+            rescanned = reload and key not in self._missing
+            if rescanned:
+                self._rescan()
             try:
                 return self._filetree[vartype][init_time][variable][valid_time]
             except KeyError as ex:
+                # only remember the miss when it was rescanned for, so that it
+                # expires missing_cache_time seconds after the last rescan
+                if rescanned:
+                    self._missing.put(key, True)
                 logging.error("Could not identify filename. %s %s %s %s %s %s",
                               variable, vartype, init_time, valid_time, type(ex), ex)
                 raise ValueError("variable type {} not available for variable {}"
                                  .format(vartype, variable))
 
+    def _rescan(self):
+        """Updates the file tree with new, modified and removed data files,
+           unless this was already done within the last rescan_interval seconds.
+        """
+        with self._update_lock:
+            now = time.time()
+            if self._last_rescan is not None and now - self._last_rescan < self._rescan_interval:
+                logging.debug("Skipping rescan of '%s', last one was %.1f s ago",
+                              self._root_path, now - self._last_rescan)
+                return
+            self._last_rescan = now
+            filenames = [_filename for _filename in sorted(os.listdir(self._root_path)) if self._domain_id in _filename]
+            modified = []
+            for filename in filenames:
+                try:
+                    mtime = os.path.getmtime(os.path.join(self._root_path, filename))
+                except OSError:
+                    continue
+                if self._file_mtimes.get(filename) != mtime:
+                    modified.append(filename)
+            removed = [_filename for _filename in self._file_mtimes if _filename not in filenames]
+            if modified or removed:
+                logging.info("Rescan of '%s' found %s new or modified and %s removed files",
+                             self._root_path, len(modified), len(removed))
+                self.update_files(modified, removed)
+
+    def update_files(self, modified=(), removed=()):
+        """Incrementally updates the file tree with the <modified> (new or
+           changed) and <removed> data files instead of rescanning all files.
+
+           The file tree is read by requests without holding the lock, so it
+           is updated on a copy, which then replaces the current one.
+        """
+        with self._update_lock:
+            for filename in list(removed) + list(modified):
+                self._field_statistics.pop(os.path.join(self._root_path, filename), None)
+            filetree = _copy_filetree(self._filetree)
+            elevations = copy.deepcopy(self._elevations)
+            rejected_files = dict(self._rejected_files)
+            file_mtimes = dict(self._file_mtimes)
+            available_files = list(self._available_files)
+            for filename in [_x for _x in list(removed) + list(modified) if _x in file_mtimes]:
+                self._remove_from_filetree(filetree, filename)
+                self._remove_elevations(elevations, filename)
+                rejected_files.pop(filename, None)
+                del file_mtimes[filename]
+                if filename in available_files:
+                    available_files.remove(filename)
+            self._add_rejected_files(filetree, elevations, rejected_files)
+            modified = sorted(_x for _x in modified if self._domain_id in _x)
+            mtimes = {}
+            for filename in modified:
+                try:
+                    mtimes[filename] = os.path.getmtime(os.path.join(self._root_path, filename))
+                except OSError as ex:
+                    logging.error("Skipping file '%s' (%s: %s)", filename, type(ex), ex)
+            modified = [_x for _x in modified if _x in mtimes]
+            for filename, content in zip(modified, self._parse_files(modified)):
+                file_mtimes[filename] = mtimes[filename]
+                self._add_file(filetree, elevations, rejected_files, filename, content)
+            self._filetree = filetree
+            self._elevations = elevations
+            self._rejected_files = rejected_files
+            self._file_mtimes = file_mtimes
+            self._available_files = sorted(set(available_files) | set(modified))
+            self._missing.clear()
+
+    def _add_file(self, filetree, elevations, rejected_files, filename, content):
+        """Adds the parsed <content> of a file to <filetree>, if its vertical
+           levels fit <elevations>, or else to <rejected_files>.
+        """
+        if isinstance(content, IOError):
+            logging.error("Skipping file '%s' (%s: %s)", filename, type(content), content)
+            return
+        try:
+            self._check_elevations(elevations, filename, content)
+        except IOError as ex:
+            logging.error("Skipping file '%s' (%s: %s)", filename, type(ex), ex)
+            rejected_files[filename] = content
+            return
+        self._add_to_filetree(filetree, filename, content)
+
+    def _add_rejected_files(self, filetree, elevations, rejected_files):
+        """Adds the files skipped due to their vertical levels, which fit now
+           after the files they were checked against were removed.
+        """
+        for filename in sorted(rejected_files):
+            content = rejected_files[filename]
+            try:
+                self._check_elevations(elevations, filename, content)
+            except IOError:
+                continue
+            logging.info("Adding previously skipped file '%s'", filename)
+            del rejected_files[filename]
+            self._add_to_filetree(filetree, filename, content)
+
+    def _remove_from_filetree(self, filetree, filename):
+        """Removes all entries referring to <filename> from <filetree>.
+        """
+        for vartype in list(filetree):
+            for init_time in list(filetree[vartype]):
+                init_leaf = filetree[vartype][init_time]
+                for variable in list(init_leaf):
+                    var_leaf = init_leaf[variable]
+                    for valid_time in [_x for _x, _y in var_leaf.items() if _y == filename]:
+                        del var_leaf[valid_time]
+                    if not var_leaf:
+                        del init_leaf[variable]
+                if not init_leaf:
+                    del filetree[vartype][init_time]
+            if not filetree[vartype]:
+                del filetree[vartype]
+
     def _parse_file(self, filename):
-        elevations = {"levels": [], "units": None}
-        with netCDF4.Dataset(os.path.join(self._root_path, filename)) as dataset:
-
-            time_name, time_var = netCDF4tools.identify_CF_time(dataset)
-            init_time = netCDF4tools.num2date(0, time_var.units)
-            if not self.uses_inittime_dimension():
-                init_time = None
-            valid_times = netCDF4tools.num2date(time_var[:], time_var.units)
-            if not self.uses_validtime_dimension():
-                if len(valid_times) > 0:
-                    raise IOError("Skipping file '{}: no support for valid time, but multiple "
-                                  "time steps present".format(filename))
-                valid_times = [None]
-            lat_name, lat_var, lon_name, lon_var = netCDF4tools.identify_CF_lonlat(dataset)
-            vert_name, vert_var, _, _, vert_type = netCDF4tools.identify_vertical_axis(dataset)
-
-            if len(time_var.dimensions) != 1 or time_var.dimensions[0] != time_name:
-                raise IOError("Problem with time coordinate variable")
-            if len(lat_var.dimensions) != 1 or lat_var.dimensions[0] != lat_name:
-                raise IOError("Problem with latitude coordinate variable")
-            if len(lon_var.dimensions) != 1 or lon_var.dimensions[0] != lon_name:
-                raise IOError("Problem with longitude coordinate variable")
-
-            if vert_type != "sfc":
-                elevations = {"levels": vert_var[:], "units": vert_var.units}
-                if vert_type in self._elevations:
-                    if len(vert_var[:]) != len(self._elevations[vert_type]["levels"]):
-                        raise IOError("Number of vertical levels does not fit to levels of "
-                                      "previous file '{}'.".format(self._elevations[vert_type]["filename"]))
-                    if not np.allclose(vert_var[:], self._elevations[vert_type]["levels"]):
-                        raise IOError("vertical levels do not fit to levels of previous "
-                                      "file '{}'.".format(self._elevations[vert_type]["filename"]))
-                    if elevations["units"] != self._elevations[vert_type]["units"]:
-                        raise IOError("vertical level units do not match previous file '{}'".format(
-                            self._elevations[vert_type]["filename"]))
-
-            standard_names = []
-            for ncvarname, ncvar in dataset.variables.items():
-                if hasattr(ncvar, "standard_name"):
-                    if (len(ncvar.dimensions) >= 3 and (
-                            ncvar.dimensions[0] != time_name or
-                            ncvar.dimensions[-2] != lat_name or
-                            ncvar.dimensions[-1] != lon_name)):
-                        logging.error("Skipping variable '%s' in file '%s': Incorrect order of dimensions",
-                                      ncvarname, filename)
-                        continue
-                    if not hasattr(ncvar, "units"):
-                        logging.error("Skipping variable '%s' in file '%s': No units attribute",
-                                      ncvarname, filename)
-                        continue
-                    if ncvar.standard_name != "time":
-                        try:
-                            UR(ncvar.units)
-                        except (ValueError, pint.UndefinedUnitError):
-                            logging.error("Skipping variable '%s' in file '%s': unparseable units attribute '%s'",
-                                          ncvarname, filename, ncvar.units)
-                            continue
-                    if len(ncvar.shape) == 4 and vert_name in ncvar.dimensions:
-                        standard_names.append(ncvar.standard_name)
-                    elif len(ncvar.shape) == 3 and vert_type == "sfc":
-                        standard_names.append(ncvar.standard_name)
-        return {
-            "vert_type": vert_type,
-            "elevations": elevations,
-            "init_time": init_time,
-            "valid_times": valid_times,
-            "standard_names": standard_names
-        }
-
-    def _add_to_filetree(self, filename, content):
+        return _parse_file(self._root_path, filename, self.uses_inittime_dimension(), self.uses_validtime_dimension())
+
+    def _parse_files(self, filenames):
+        """Parses the data files <filenames> and returns a list of their
+           contents or of the IOError raised while parsing, in the order of
+           <filenames>. Files are parsed in parallel if scan_processes > 1.
+        """
+        if self._scan_processes <= 1 or len(filenames) <= 1:
+            result = []
+            for filename in filenames:
+                logging.info("Opening candidate '%s'", filename)
+                try:
+                    result.append(self._parse_file(filename))
+                except IOError as ex:
+                    result.append(ex)
+            return result
+        logging.info("Opening %s candidates with %s processes", len(filenames), self._scan_processes)
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(self._scan_processes, len(filenames)),
+                mp_context=multiprocessing.get_context("spawn")) as executor:
+            return list(executor.map(
+                _parse_file_safe, itertools.repeat(self._root_path), filenames,
+                itertools.repeat(self.uses_inittime_dimension()), itertools.repeat(self.uses_validtime_dimension()),
+                chunksize=max(1, len(filenames) // (4 * self._scan_processes))))
+
+    def _check_elevations(self, elevations, filename, content):
+        """Checks that the vertical levels of a file fit those of the files
+           added before to <elevations> and registers them for new vertical
+           types.
+        """
+        vert_type = content["vert_type"]
+        if vert_type == "sfc":
+            return
+        if vert_type not in elevations:
+            elevations[vert_type] = dict(content["elevations"], filename=filename, files={filename})
+            return
+        entry = elevations[vert_type]
+        if len(content["elevations"]["levels"]) != len(entry["levels"]):
+            raise IOError("Number of vertical levels does not fit to levels of "
+                          "previous file '{}'.".format(entry.get("filename")))
+        if not np.allclose(content["elevations"]["levels"], entry["levels"]):
+            raise IOError("vertical levels do not fit to levels of previous "
+                          "file '{}'.".format(entry.get("filename")))
+        if content["elevations"]["units"] != entry.get("units"):
+            raise IOError("vertical level units do not match previous file '{}'".format(
+                entry.get("filename")))
+        entry["files"].add(filename)
+
+    def _remove_elevations(self, elevations, filename):
+        """Removes <filename> from the files defining the vertical levels.
+           The levels of a vertical type are dropped with its last file.
+        """
+        for vert_type in [_x for _x in elevations if _x != "sfc"]:
+            entry = elevations[vert_type]
+            entry["files"].discard(filename)
+            if not entry["files"]:
+                logging.info("Last file of vertical type '%s' removed", vert_type)
+                del elevations[vert_type]
+            elif entry["filename"] == filename:
+                entry["filename"] = min(entry["files"])
+
+    def _add_to_filetree(self, filetree, filename, content):
         logging.info("File '%s' identified as '%s' type", filename, content["vert_type"])
         logging.info("Found init time '%s', %s valid_times and %s standard_names",
                      content["init_time"], len(content["valid_times"]), len(content["standard_names"]))
@@ -290,7 +603,7 @@ class DefaultDataAccess(NWPDataAccess):
         else:
             logging.debug("valid_times='%s' standard_names='%s'",
                           content["valid_times"], content["standard_names"])
-        leaf = self._filetree.setdefault(content["vert_type"], {}).setdefault(content["init_time"], {})
+        leaf = filetree.setdefault(content["vert_type"], {}).setdefault(content["init_time"], {})
         for standard_name in content["standard_names"]:
             var_leaf = leaf.setdefault(standard_name, {})
             for valid_time in content["valid_times"]:
@@ -304,32 +617,94 @@ class DefaultDataAccess(NWPDataAccess):
                     var_leaf[valid_time] = filename
 
     def setup(self):
-        # Get a list of the available data files.
-        self._available_files = [
-            _filename for _filename in sorted(os.listdir(self._root_path)) if self._domain_id in _filename]
-        logging.info("Files identified for domain '%s': %s",
-                     self._domain_id, self._available_files)
-
-        self._filetree = {}
-        self._elevations = {"sfc": {"filename": None, "levels": [], "units": None}}
-
-        # Build the tree structure.
-        for filename in self._available_files:
-            logging.info("Opening candidate '%s'", filename)
+        with self._update_lock:
+            # Get a list of the available data files.
+            available_files = [
+                _filename for _filename in sorted(os.listdir(self._root_path)) if self._domain_id in _filename]
+            logging.info("Files identified for domain '%s': %s",
+                         self._domain_id, available_files)
+
+            filetree = {}
+            elevations = {"sfc": {"filename": None, "levels": [], "units": None}}
+            rejected_files = {}
+            available_paths = set(os.path.join(self._root_path, _x) for _x in available_files)
+            self._field_statistics = dict(
+                (_x, _y) for _x, _y in self._field_statistics.items() if _x in available_paths)
+
+            # Build the tree structure, which replaces the current one when done.
+            file_mtimes = dict(
+                (_x, os.path.getmtime(os.path.join(self._root_path, _x))) for _x in available_files)
+            for filename, content in zip(available_files, self._parse_files(available_files)):
+                self._add_file(filetree, elevations, rejected_files, filename, content)
+            self._filetree = filetree
+            self._elevations = elevations
+            self._rejected_files = rejected_files
+            self._file_mtimes = file_mtimes
+            self._available_files = available_files
+            self._last_rescan = time.time()
+            self._missing.clear()
+
+    def compute_statistics(self, filenames=None):
+        """Computes the statistics of the data fields in the data files
+           <filenames> (default: all files of the domain in the data directory),
+           unless they are already known for the current version of the files.
+           Returns a dictionary mapping the path to the modification time and
+           the statistics. Files are processed in parallel if scan_processes > 1.
+        """
+        if not self._compute_statistics:
+            return {}
+        if filenames is None:
+            filenames = sorted(os.listdir(self._root_path))
+        candidates = []
+        for filename in [_x for _x in filenames if self._domain_id in _x]:
+            path = os.path.join(self._root_path, filename)
             try:
-                content = self._parse_file(filename)
-            except IOError as ex:
-                logging.error("Skipping file '%s' (%s: %s)", filename, type(ex), ex)
+                mtime = os.path.getmtime(path)
+            except OSError:
                 continue
-            if content["vert_type"] not in self._elevations:
-                self._elevations[content["vert_type"]] = content["elevations"]
-            self._add_to_filetree(filename, content)
+            if self._load_statistics(path, mtime) is None:
+                candidates.append((path, mtime))
+        if not candidates:
+            return {}
+        paths = [_x[0] for _x in candidates]
+        logging.info("Computing statistics of %s files", len(paths))
+        if self._scan_processes <= 1 or len(paths) <= 1:
+            results = [_file_statistics_safe(_x) for _x in paths]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(self._scan_processes, len(paths)),
+                    mp_context=multiprocessing.get_context("spawn")) as executor:
+                results = list(executor.map(_file_statistics_safe, paths))
+        return dict((_path, (_mtime, _statistics))
+                    for (_path, _mtime), _statistics in zip(candidates, results) if _statistics is not None)
+
+    def add_statistics(self, statistics):
+        with self._update_lock:
+            field_statistics = dict(self._field_statistics)
+            field_statistics.update(statistics)
+            self._field_statistics = field_statistics
+
+    def _load_statistics(self, path, mtime):
+        """Returns the statistics of the data fields in the data file <path>
+           with modification time <mtime>, or None if not known.
+        """
+        entry = self._field_statistics.get(path)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        return None
+
+    def get_field_statistics(self, filename, mtime, variable, index):
+        statistics = self._load_statistics(filename, mtime)
+        if statistics is None:
+            return None
+        return statistics.get((variable, index))
 
     def get_init_times(self):
         """Returns a list of available forecast init times (base times).
         """
+        filetree = self._filetree
         init_times = set(itertools.chain.from_iterable(
-            self._filetree[_x].keys() for _x in self._filetree))
+            filetree[_x].keys() for _x in filetree))
         return sorted(init_times)
 
     def get_valid_times(self, variable, vartype, init_time):
@@ -359,11 +734,12 @@ class DefaultDataAccess(NWPDataAccess):
            of all available init times.
         """
         all_valid_times = []
-        if vartype not in self._filetree:
+        filetree = self._filetree
+        if vartype not in filetree:
             return []
-        for init_time in self._filetree[vartype]:
-            if variable in self._filetree[vartype][init_time]:
-                all_valid_times.extend(list(self._filetree[vartype][init_time][variable]))
+        for init_time in filetree[vartype]:
+            if variable in filetree[vartype][init_time]:
+                all_valid_times.extend(list(filetree[vartype][init_time][variable]))
         return sorted(set(all_valid_times))
 
     def get_all_datafiles(self):
@@ -379,52 +755,92 @@ class CachedDataAccess(DefaultDataAccess):
 
     Uses file name and modification date to reduce setup time by caching directory
     content in a dictionary.
+
+    If <inventory> is given, the cached directory content is additionally stored
+    in a persistent FileInventory at this path and loaded from it at startup.
     """
 
-    def __init__(self, rootpath, domain_id, **kwargs):
+    def __init__(self, rootpath, domain_id, inventory=None, **kwargs):
         """Constructor takes the path of the data directory and determines whether
            this class employs different init_times or valid_times.
         """
         DefaultDataAccess.__init__(self, rootpath, domain_id, **kwargs)
         self._file_cache = {}
+        self.inventory = None
+        if inventory is not None:
+            self.inventory = FileInventory(inventory)
+            self._file_cache = {
+                _filename: (_mtime, _content)
+                for _filename, (_mtime, _, _content) in self.inventory.load(self._inventory_key()).items()}
+
+    def _inventory_key(self):
+        """Identifies the entries of this data access in the inventory, as
+           the parsed content depends on the time dimension settings.
+        """
+        return repr((os.path.abspath(self._root_path), self._domain_id,
+                     self._use_init_time, self._use_valid_time))
 
     def setup(self):
-        # Get a list of the available data files.
-        self._available_files = [
-            _filename for _filename in os.listdir(self._root_path) if self._domain_id in _filename]
-        logging.info("Files identified for domain '%s': %s",
-                     self._domain_id, self._available_files)
-
-        for filename in list(self._file_cache):
-            if filename not in self._available_files:
-                del self._file_cache[filename]
-
-        self._filetree = {}
-        self._elevations = {"sfc": {"filename": None, "levels": []}}
-
-        # Build the tree structure.
-        for filename in self._available_files:
-            mtime = os.path.getmtime(os.path.join(self._root_path, filename))
-            if filename in self._file_cache and mtime == self._file_cache[filename][0]:
-                logging.info("Using cached candidate '%s'", filename)
-                content = self._file_cache[filename][1]
-                if content["vert_type"] != "sfc":
-                    if content["vert_type"] not in self._elevations:
-                        self._elevations[content["vert_type"]] = content["elevations"]
-                    elif not np.allclose(
-                            self._elevations[content["vert_type"]]["levels"],
-                            content["elevations"]["levels"]):
-                        logging.error("Skipping file '%s' due to elevation mismatch", filename)
-                        continue
+        with self._update_lock:
+            available_files = set(_x for _x in os.listdir(self._root_path) if self._domain_id in _x)
+            self._uncache([_filename for _filename in self._file_cache if _filename not in available_files])
+            DefaultDataAccess.setup(self)
+
+    def update_files(self, modified=(), removed=()):
+        with self._update_lock:
+            self._uncache(removed)
+            DefaultDataAccess.update_files(self, modified, removed)
+
+    def _uncache(self, filenames):
+        """Removes <filenames> from the cache (and the inventory).
+        """
+        filenames = [_filename for _filename in filenames if _filename in self._file_cache]
+        for filename in filenames:
+            del self._file_cache[filename]
+        if self.inventory is not None and filenames:
+            self.inventory.update(self._inventory_key(), {}, filenames)
+            self.inventory.remove_statistics([os.path.join(self._root_path, _x) for _x in filenames])
+
+    def _load_statistics(self, path, mtime):
+        """Additionally looks up the statistics in the inventory, if given.
+        """
+        statistics = DefaultDataAccess._load_statistics(self, path, mtime)
+        if statistics is None and self.inventory is not None:
+            statistics = self.inventory.load_statistics(path, mtime)
+            if statistics is not None:
+                self._field_statistics[path] = (mtime, statistics)
+        return statistics
+
+    def add_statistics(self, statistics):
+        """Additionally stores the statistics in the inventory, if given.
+        """
+        DefaultDataAccess.add_statistics(self, statistics)
+        if self.inventory is not None:
+            for path, (mtime, field_statistics) in sorted(statistics.items()):
+                self.inventory.store_statistics(path, mtime, field_statistics)
 
+    def _parse_files(self, filenames):
+        """Returns the cached contents of unmodified files and parses the others.
+        """
+        stats, result, candidates = {}, {}, []
+        for filename in filenames:
+            stats[filename] = os.stat(os.path.join(self._root_path, filename))
+            if filename in self._file_cache and stats[filename].st_mtime == self._file_cache[filename][0]:
+                logging.info("Using cached candidate '%s'", filename)
+                result[filename] = self._file_cache[filename][1]
             else:
-                if filename in self._file_cache:
-                    del self._file_cache[filename]
-                logging.info("Opening candidate '%s'", filename)
-                try:
-                    content = self._parse_file(filename)
-                except IOError as ex:
-                    logging.error("Skipping file '%s' (%s: %s)", filename, type(ex), ex)
-                    continue
+                candidates.append(filename)
+
+        updated, removed = {}, []
+        for filename, content in zip(candidates, DefaultDataAccess._parse_files(self, candidates)):
+            result[filename] = content
+            if isinstance(content, IOError):
+                if self._file_cache.pop(filename, None) is not None:
+                    removed.append(filename)
+            else:
+                mtime = stats[filename].st_mtime
                 self._file_cache[filename] = (mtime, content)
-            self._add_to_filetree(filename, content)
+                updated[filename] = (mtime, stats[filename].st_size, content)
+        if self.inventory is not None:
+            self.inventory.update(self._inventory_key(), updated, removed)
+        return [result[_filename] for _filename in filenames]
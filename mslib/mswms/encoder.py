@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms.encoder
+    ~~~~~~~~~~~~~~~~~~~
+
+    Encodes the images rendered by the section styles and the data of
+    vertical sections.
+
+    The RGBA buffer of the Agg canvas is wrapped without copying it, reduced
+    to an 8bit palette image (keeping the alpha values of transparent images)
+    and encoded once in the requested format.
+
+    Data arrays are encoded in a compact binary container (ARRAYS_FORMAT):
+    the length of the header as 4 byte little endian unsigned integer, the
+    UTF-8 encoded JSON header and the raw little endian data of the arrays,
+    each starting at a multiple of 8 bytes after the header. The header holds
+    the attributes and, in "arrays", the name, dtype, shape and offset (from
+    the end of the header) of each array. Masked values are stored as NaN.
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import io
+import json
+import logging
+import struct
+
+import mss_wms_settings
+import numpy as np
+import PIL.features
+import PIL.Image
+
+
+ARRAYS_FORMAT = "application/x-mss-arrays"
+
+
+def image_formats():
+    """Returns the image formats (MIME types) that can be encoded.
+    """
+    formats = ["image/png"]
+    if PIL.features.check("webp"):
+        formats.append("image/webp")
+    return formats
+
+
+def canvas_image(canvas):
+    """Returns the RGBA image drawn on the (already drawn) Agg <canvas>.
+
+    The image shares the memory of the canvas buffer, i.e. it is only valid
+    as long as the canvas is not drawn again.
+    """
+    return PIL.Image.frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+
+
+def quantize(image, transparent=False):
+    """Converts the RGBA <image> to an image with an adaptive palette of 256
+    colours (~factor 4 smaller than RGBA). Transparent images are quantized
+    including their alpha values, opaque ones only by their colours.
+    """
+    if transparent:
+        return image.quantize(colors=256, method=PIL.Image.FASTOCTREE)
+    return image.convert("RGB").quantize(colors=256, method=PIL.Image.MEDIANCUT)
+
+
+def encode_image(image, return_format="image/png", transparent=False):
+    """Encodes the RGBA <image> in <return_format> and returns the bytes.
+
+    The encoding is configured by the settings image_quantize,
+    image_png_compress_level, image_webp_lossless and image_webp_quality.
+    """
+    output = io.BytesIO()
+    if return_format == "image/png":
+        if getattr(mss_wms_settings, "image_quantize", True):
+            logging.debug("converting image to indexed palette.")
+            image = quantize(image, transparent)
+        elif not transparent:
+            image = image.convert("RGB")
+        image.save(output, format="PNG", compress_level=getattr(mss_wms_settings, "image_png_compress_level", 6))
+    elif return_format == "image/webp":
+        if not transparent:
+            image = image.convert("RGB")
+        image.save(output, format="WEBP", lossless=getattr(mss_wms_settings, "image_webp_lossless", False),
+                   quality=getattr(mss_wms_settings, "image_webp_quality", 80))
+    else:
+        raise ValueError("unsupported image format '{}'".format(return_format))
+    return output.getvalue()
+
+
+def encode_canvas(canvas, return_format="image/png", transparent=False):
+    """Draws the Agg <canvas> and encodes its image in <return_format>.
+    """
+    canvas.draw()
+    return encode_image(canvas_image(canvas), return_format, transparent)
+
+
+def encode_arrays(arrays, attributes=None):
+    """Encodes the dictionary of numpy <arrays> and the JSON serializable
+    dictionary <attributes> in ARRAYS_FORMAT and returns the bytes.
+    """
+    header = dict(attributes or {}, arrays=[])
+    buffers = []
+    offset = 0
+    for name, value in arrays.items():
+        value = np.asanyarray(value)
+        if np.ma.isMaskedArray(value):
+            if value.dtype.kind != "f":
+                value = value.astype(np.float64)
+            value = value.filled(np.nan)
+        value = np.ascontiguousarray(value, dtype=value.dtype.newbyteorder("<"))
+        header["arrays"].append(
+            {"name": name, "dtype": value.dtype.str, "shape": list(value.shape), "offset": offset})
+        padding = -value.nbytes % 8
+        buffers.extend([value.tobytes(), b"\0" * padding])
+        offset += value.nbytes + padding
+    header = json.dumps(header).encode("utf-8")
+    return b"".join([struct.pack("<I", len(header)), header] + buffers)
+
+
+def decode_arrays(data):
+    """Decodes <data> in ARRAYS_FORMAT. Returns the attributes and the
+    dictionary of (read-only) arrays.
+    """
+    length, = struct.unpack_from("<I", data)
+    header = json.loads(bytes(data[4:4 + length]).decode("utf-8"))
+    start = 4 + length
+    arrays = {}
+    for item in header.pop("arrays"):
+        dtype = np.dtype(item["dtype"])
+        count = int(np.prod(item["shape"]))
+        arrays[item["name"]] = np.frombuffer(
+            data, dtype=dtype, count=count, offset=start + item["offset"]).reshape(item["shape"])
+    return header, arrays
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms.inventory
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Persistent inventory of the metadata of data files.
+
+    The inventory is a SQLite database storing for each data file its
+    modification time and size together with the metadata determined by
+    DefaultDataAccess._parse_file (vertical type, elevations, init and valid
+    times, standard names), so that data files need not be opened again after
+    a restart of the server. The inventories of all data sets configured in
+    mss_wms_settings can be built or refreshed offline with mswms_inventory.
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import pickle
+import sqlite3
+import sys
+
+from mslib import __version__
+
+
+class FileInventory(object):
+    """SQLite database storing the parsed metadata of data files.
+
+    Entries are grouped by a <key> describing the data access using them
+    (e.g. domain id and time dimension settings), as the parsed metadata
+    depends on those settings. Several processes may use the same inventory.
+
+    Additionally, the statistics of the data fields (see
+    mslib.mswms.utils.field_statistics()) are stored per data file (by
+    absolute path).
+    """
+
+    # increase if the layout of the stored metadata changes
+    VERSION = 3
+
+    def __init__(self, filename):
+        self.filename = filename
+        directory = os.path.dirname(os.path.abspath(filename))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._connect() as connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != self.VERSION:
+                if version != 0:
+                    logging.info("Discarding inventory '%s' of outdated version %s", filename, version)
+                connection.execute("DROP TABLE IF EXISTS files")
+                connection.execute("DROP TABLE IF EXISTS statistics")
+                connection.execute("PRAGMA user_version = {:d}".format(self.VERSION))
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "key TEXT, filename TEXT, mtime REAL, size INTEGER, content BLOB, "
+                "PRIMARY KEY (key, filename))")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS statistics ("
+                "filename TEXT PRIMARY KEY, mtime REAL, content BLOB)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.filename, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def load(self, key):
+        """Returns a dictionary mapping the filenames stored for <key> to
+        tuples of modification time, size and metadata.
+        """
+        result = {}
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT filename, mtime, size, content FROM files WHERE key = ?", (key,)).fetchall()
+        for filename, mtime, size, content in rows:
+            try:
+                result[filename] = (mtime, size, pickle.loads(content))
+            except Exception as ex:
+                logging.error("Ignoring unreadable inventory entry '%s': %s %s", filename, type(ex), ex)
+        logging.debug("Loaded %s entries for '%s' from inventory '%s'", len(result), key, self.filename)
+        return result
+
+    def update(self, key, entries, removed=()):
+        """Stores <entries>, a dictionary mapping filenames to tuples of
+        modification time, size and metadata, and removes the <removed>
+        filenames for <key> in a single transaction.
+        """
+        if not entries and not removed:
+            return
+        with self._connect() as connection:
+            connection.executemany(
+                "DELETE FROM files WHERE key = ? AND filename = ?",
+                [(key, _filename) for _filename in removed])
+            connection.executemany(
+                "INSERT OR REPLACE INTO files (key, filename, mtime, size, content) VALUES (?, ?, ?, ?, ?)",
+                [(key, _filename, _mtime, _size, pickle.dumps(_content, protocol=pickle.HIGHEST_PROTOCOL))
+                 for _filename, (_mtime, _size, _content) in entries.items()])
+
+    def load_statistics(self, filename, mtime):
+        """Returns the statistics of the data fields in the data file
+        <filename> with modification time <mtime>, or None if not stored.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT content FROM statistics WHERE filename = ? AND mtime = ?", (filename, mtime)).fetchone()
+        if row is None:
+            return None
+        try:
+            return pickle.loads(row[0])
+        except Exception as ex:
+            logging.error("Ignoring unreadable statistics of '%s': %s %s", filename, type(ex), ex)
+            return None
+
+    def store_statistics(self, filename, mtime, statistics):
+        """Stores the <statistics> of the data fields in the data file
+        <filename> with modification time <mtime>.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO statistics (filename, mtime, content) VALUES (?, ?, ?)",
+                (filename, mtime, pickle.dumps(statistics, protocol=pickle.HIGHEST_PROTOCOL)))
+
+    def remove_statistics(self, filenames):
+        """Removes the statistics stored for the data files <filenames>.
+        """
+        if not filenames:
+            return
+        with self._connect() as connection:
+            connection.executemany("DELETE FROM statistics WHERE filename = ?", [(_x,) for _x in filenames])
+
+
+def main():
+    """
+    builds or refreshes the file inventories of the data sets configured in mss_wms_settings
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--version", help="show version", action="store_true", default=False)
+    parser.add_argument("datasets", nargs="*", help="data sets to update (default: all with an inventory)")
+    args = parser.parse_args()
+    if args.version:
+        print("***********************************************************************")
+        print("\n            Mission Support System (mss)\n")
+        print("***********************************************************************")
+        print("Documentation: http://mss.rtfd.io")
+        print("Version:", __version__)
+        sys.exit()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    import mss_wms_settings
+    for name, data_access in mss_wms_settings.data.items():
+        if args.datasets and name not in args.datasets:
+            continue
+        if getattr(data_access, "inventory", None) is None:
+            logging.info("Skipping data set '%s' without inventory", name)
+            continue
+        logging.info("Updating inventory of data set '%s'", name)
+        data_access.setup()
+        data_access.update_statistics()
+
+
+if __name__ == '__main__':
+    main()
@@ -29,7 +29,7 @@
 # style definitions should be put in mpl_hsec_styles.py
 
 
-import io
+import hashlib
 import logging
 from abc import abstractmethod
 import mss_wms_settings
@@ -40,12 +40,22 @@ import mpl_toolkits.basemap as basemap
 import numpy as np
 import PIL.Image
 
-from mslib.mswms import mss_2D_sections
+from mslib.mswms import encoder, mss_2D_sections
+from mslib.mswms.utils import transform_statistics
+from mslib.mswms.cache import LRUCache
 from mslib.utils import get_projection_params, convert_to
 
 
 BASEMAP_CACHE = {}
 BASEMAP_REQUESTS = []
+# map projection coordinates and domain masks of data grids
+PROJECTED_GRID_CACHE = LRUCache(
+    max_bytes=getattr(mss_wms_settings, "projected_grid_cache_size", 128 * 1024 ** 2),
+    sizeof=lambda value: sum(_x.nbytes for _x in value))
+# rendered map features (below and above the data) by map geometry and image size
+BASEMAP_RASTER_CACHE = LRUCache(
+    max_bytes=getattr(mss_wms_settings, "basemap_raster_cache_size", 64 * 1024 ** 2),
+    sizeof=lambda value: sum(_x.nbytes for _x in value))
 
 
 class AbstractHorizontalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
@@ -68,12 +78,31 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
     """
     name = "BASEMAP"
     title = "Matplotlib basemap"
+    # Method used to coarsen the data grid to the resolution of the map, if
+    # enabled by decimate_data in mss_wms_settings: "mean" (block average),
+    # "subsample" or None to always plot the full grid.
+    decimation = "mean"
+    # (left, top, right, bottom) pixels cut off the image after plotting,
+    # see plot_hsection()
+    crop_margin = None
 
     def _plot_style(self):
         """Overwrite this method to plot style-specific data on the map.
         """
         pass
 
+    def clabel(self, cs, *args, **kwargs):
+        """Labels the contour lines of <cs>, see ContourSet.clabel(). Styles
+        should use this method instead of calling clabel() directly.
+
+        If the image is cropped afterwards, the labels are not cut into the
+        contour lines (inline), as labels crossing the crop border are hidden
+        and would leave a gap in the lines at the border.
+        """
+        if self.crop_margin is not None:
+            kwargs["inline"] = False
+        return cs.clabel(*args, **kwargs)
+
     def supported_epsg_codes(self):
         return list(mss_wms_settings.epsg_to_mpl_basemap_table.keys())
 
@@ -202,9 +231,18 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
                       proj_params=None,
                       valid_time=None, init_time=None, style=None,
                       resolution=-1, noframe=False, show=False,
-                      transparent=False):
+                      transparent=False, crop_margin=None, overlays=(), return_format="image/png"):
         """
         EPSG overrides proj_params!
+
+        overlays -- list of (style instance, style) drawn on top of this style
+                    into the same figure and map, using the same data fields.
+
+        crop_margin -- (left, top, right, bottom) pixels of the image that will
+                       be cut off by the caller (e.g. the buffer of meta tiles).
+                       Texts crossing the border of the remaining image are not
+                       drawn, as they would be cut in half; contour labels are
+                       not cut into the lines, see clabel().
         """
         if proj_params is None:
             proj_params = {"projection": "cyl"}
@@ -214,46 +252,15 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
             proj_params, bbox_units = [get_projection_params(crs)[_x] for _x in ("basemap", "bbox")]
 
         logging.debug("plotting data..")
-
-        # Check if required data is available.
-        self.data_units = self.driver.data_units.copy()
-        for datatype, dataitem, dataunit in self.required_datafields:
-            if dataitem not in data:
-                raise KeyError("required data field '{}' not found".format(dataitem))
-            origunit = self.driver.data_units[dataitem]
-            if dataunit is not None:
-                data[dataitem] = convert_to(data[dataitem], origunit, dataunit)
-                self.data_units[dataitem] = dataunit
-            else:
-                logging.debug("Please add units to plot variables")
-
-        # Copy parameters to properties.
-        self.data = data
-        self.lats = lats
-        self.lons = lons
-        self.level = level
-        self.valid_time = valid_time
-        self.init_time = init_time
-        self.style = style
-        self.resolution = resolution
-        self.noframe = noframe
-        self.crs = crs
-
-        # Derive additional data fields and make the plot.
-        logging.debug("preparing additional data fields..")
-        self._prepare_datafields()
+        self._set_data(data, lats, lons, level, valid_time, init_time, style, resolution, noframe, crs)
+        for overlay, overlay_style in overlays:
+            overlay._set_data(data, lats, lons, level, valid_time, init_time, overlay_style, resolution, noframe, crs)
 
         logging.debug("creating figure..")
-        dpi = 80
-        figsize = (figsize[0] / dpi), (figsize[1] / dpi)
         facecolor = "white"
-        fig = mpl.figure.Figure(figsize=figsize, dpi=dpi, facecolor=facecolor)
+        fig, ax = self._create_figure(figsize, noframe, facecolor)
         logging.debug("\twith frame and legends" if not noframe else
                       "\twithout frame")
-        if noframe:
-            ax = fig.add_axes([0.0, 0.0, 1.0, 1.0])
-        else:
-            ax = fig.add_axes([0.05, 0.05, 0.9, 0.88])
 
         # The basemap instance is created with a fixed aspect ratio for framed
         # plots; the aspect ratio is not fixed for frameless plots (standard
@@ -272,12 +279,8 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
         # NOTE: While the MSUI always requests image sizes that match the aspect
         # ratio, for instance the Metview 4 client does not (mr, 2011Dec16).
 
-        # Some additional code to store the last 20 coastlines in memory for quicker
-        # access.
+        # key of the map geometry for the basemap caches
         key = repr((proj_params, bbox, bbox_units))
-        basemap_use_cache = getattr(mss_wms_settings, "basemap_use_cache", False)
-        basemap_request_size = getattr(mss_wms_settings, "basemap_request_size ", 200)
-        basemap_cache_size = getattr(mss_wms_settings, "basemap_cache_size", 20)
         bm_params = {"area_thresh": 1000., "ax": ax, "fix_aspect": (not noframe)}
         bm_params.update(proj_params)
         if bbox_units == "degree":
@@ -299,6 +302,88 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
             pass
         else:
             raise ValueError("bbox_units '{}' not known.".format(bbox_units))
+        background = None
+        if noframe and getattr(mss_wms_settings, "basemap_use_raster_cache", False):
+            # The map features are rendered once for each map geometry and
+            # image size; the figure itself only contains the data drawn by
+            # the style. Framed plots are excluded, as their colorbars move
+            # the map axes.
+            raster_key = repr((key, tuple(figsize), transparent))
+            background = BASEMAP_RASTER_CACHE.get(raster_key)
+            if background is None:
+                background = self._render_background(key, bm_params, figsize, noframe, transparent)
+                BASEMAP_RASTER_CACHE.put(raster_key, background)
+            else:
+                logging.debug("Loaded '%s' from basemap raster cache", raster_key)
+            bm = basemap.Basemap(resolution=None, **bm_params)
+            bm.set_axes_limits(ax=ax)
+            fig.patch.set_alpha(0.)
+            ax.patch.set_visible(False)
+        else:
+            bm = self._create_basemap(key, bm_params)
+            # Set up the map appearance.
+            self._draw_background(bm)
+            self._draw_foreground(bm)
+
+        if noframe:
+            ax.axis('off')
+
+        self.bm = bm  # !! BETTER PASS EVERYTHING AS PARAMETERS?
+        self.fig = fig
+        self.crop_margin = crop_margin
+        self.shift_data()
+        self.decimate_data()
+        self.mask_data()
+        self._plot_style()
+        for overlay, _ in overlays:
+            overlay.bm = bm
+            overlay.fig = fig
+            overlay.crop_margin = crop_margin
+            overlay.shift_data()
+            overlay.decimate_data()
+            overlay.mask_data()
+            overlay._plot_style()
+
+        # Set transparency for the output image.
+        if transparent:
+            fig.patch.set_alpha(0.)
+
+        # Return the image encoded in the requested format.
+        canvas = FigureCanvas(fig)
+        if crop_margin is not None:
+            self._hide_cut_texts(canvas, crop_margin)
+        canvas.draw()
+        image = encoder.canvas_image(canvas)
+        if background is not None:
+            image = PIL.Image.alpha_composite(PIL.Image.fromarray(background[0]), image)
+            image = PIL.Image.alpha_composite(image, PIL.Image.fromarray(background[1]))
+
+        if show:
+            logging.debug("saving figure to mpl_hsec.png ..")
+            image.save("mpl_hsec.png", format="PNG")
+
+        output = encoder.encode_image(image, return_format, transparent)
+        logging.debug("returning figure..")
+        return output
+
+    def _create_figure(self, figsize, noframe, facecolor="white"):
+        """Returns a figure of <figsize> pixels and its axes for the map.
+        """
+        dpi = 80
+        fig = mpl.figure.Figure(figsize=(figsize[0] / dpi, figsize[1] / dpi), dpi=dpi, facecolor=facecolor)
+        if noframe:
+            ax = fig.add_axes([0.0, 0.0, 1.0, 1.0])
+        else:
+            ax = fig.add_axes([0.05, 0.05, 0.9, 0.88])
+        return fig, ax
+
+    def _create_basemap(self, key, bm_params):
+        """Returns a Basemap instance including coastlines and countries,
+        which are reused from the basemap cache, if enabled.
+        """
+        basemap_use_cache = getattr(mss_wms_settings, "basemap_use_cache", False)
+        basemap_request_size = getattr(mss_wms_settings, "basemap_request_size ", 200)
+        basemap_cache_size = getattr(mss_wms_settings, "basemap_cache_size", 20)
         if basemap_use_cache and key in BASEMAP_CACHE:
             bm = basemap.Basemap(resolution=None, **bm_params)
             (bm.resolution, bm.coastsegs, bm.coastpolygontypes, bm.coastpolygons,
@@ -323,10 +408,11 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
                 for _, key in least_useful:
                     del BASEMAP_CACHE[key]
                     BASEMAP_REQUESTS[:] = [_x for _x in BASEMAP_REQUESTS if key != _x]
+        return bm
 
-        # Set up the map appearance.
-        bm.drawcoastlines(color='0.25')
-        bm.drawcountries(color='0.5')
+    def _draw_background(self, bm):
+        """Draws the map features below the data.
+        """
         bm.drawmapboundary(fill_color='white')
 
         # zorder = 0 is necessary to paint over the filled continents with
@@ -334,70 +420,105 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
         # Curiously, plot() works fine without this setting, but scatter()
         # doesn't.
         bm.fillcontinents(color='0.98', lake_color='white', zorder=0)
-        self._draw_auto_graticule(bm)
-
-        if noframe:
-            ax.axis('off')
 
-        self.bm = bm  # !! BETTER PASS EVERYTHING AS PARAMETERS?
-        self.fig = fig
-        self.shift_data()
-        self.mask_data()
-        self._plot_style()
+    def _draw_foreground(self, bm):
+        """Draws the map features above the filled data.
+        """
+        bm.drawcoastlines(color='0.25')
+        bm.drawcountries(color='0.5')
+        self._draw_auto_graticule(bm)
 
-        # Set transparency for the output image.
-        if transparent:
-            fig.patch.set_alpha(0.)
+    def _render_background(self, key, bm_params, figsize, noframe, transparent):
+        """Renders the map features below and above the data into two RGBA
+        arrays, between which the data drawn by the style is composited.
+        """
+        layers = []
+        bm = None
+        for draw in (self._draw_background, self._draw_foreground):
+            fig, ax = self._create_figure(figsize, noframe)
+            if bm is None:
+                bm = self._create_basemap(key, dict(bm_params, ax=ax))
+            else:
+                bm.ax = ax
+                fig.patch.set_alpha(0.)
+                ax.patch.set_visible(False)
+            if transparent:
+                fig.patch.set_alpha(0.)
+            draw(bm)
+            if noframe:
+                ax.axis('off')
+            canvas = FigureCanvas(fig)
+            canvas.draw()
+            layers.append(np.array(encoder.canvas_image(canvas)))
+        return tuple(layers)
+
+    def _set_data(self, data, lats, lons, level, valid_time, init_time, style, resolution, noframe, crs):
+        """Picks the required fields from <data>, converts them to the required
+        units, stores the plot parameters and derives additional data fields.
+        <data> itself is not modified, so that it may be shared by overlays.
+        """
+        # Check if required data is available.
+        self.data_units = self.driver.data_units.copy()
+        self.data = {}
+        for datatype, dataitem, dataunit in self.required_datafields:
+            if dataitem not in data:
+                raise KeyError("required data field '{}' not found".format(dataitem))
+            self.data[dataitem] = data[dataitem]
+            origunit = self.driver.data_units[dataitem]
+            if dataunit is not None:
+                self.data[dataitem] = convert_to(data[dataitem], origunit, dataunit)
+                self.data_units[dataitem] = dataunit
+            else:
+                logging.debug("Please add units to plot variables")
 
-        # Return the image as png embedded in a StringIO stream.
-        canvas = FigureCanvas(fig)
-        output = io.BytesIO()
-        canvas.print_png(output)
+        # Copy parameters to properties.
+        self.lats = lats
+        self.lons = lons
+        self.level = level
+        self.valid_time = valid_time
+        self.init_time = init_time
+        self.style = style
+        self.resolution = resolution
+        self.noframe = noframe
+        self.crs = crs
 
-        if show:
-            logging.debug("saving figure to mpl_hsec.png ..")
-            canvas.print_png("mpl_hsec.png")
-
-        # Convert the image to an 8bit palette image with a significantly
-        # smaller file size (~factor 4, from RGBA to one 8bit value, plus the
-        # space to store the palette colours).
-        # NOTE: PIL at the current time can only create an adaptive palette for
-        # RGB images, hence alpha values are lost here. If transparency is
-        # requested, the figure face colour is stored as the "transparent"
-        # colour in the image. This works in most cases, but might lead to
-        # visible artefacts in some cases.
-        logging.debug("converting image to indexed palette.")
-        # Read the above stored png into a PIL image and create an adaptive
-        # colour palette.
-        output.seek(0)  # necessary for PIL.Image.open()
-        palette_img = PIL.Image.open(output).convert(mode="RGB").convert("P", palette=PIL.Image.ADAPTIVE)
-        output = io.BytesIO()
-        if not transparent:
-            logging.debug("saving figure as non-transparent PNG.")
-            palette_img.save(output, format="PNG")  # using optimize=True doesn't change much
-        else:
-            # If the image has a transparent background, we need to find the
-            # index of the background colour in the palette. See the
-            # documentation for PIL's ImagePalette module
-            # (http://www.pythonware.com/library/pil/handbook/imagepalette.htm). The
-            # idea is to create a 256 pixel image with the same colour palette
-            # as the original image and use it as a lookup-table. Converting the
-            # lut image back to RGB gives us a list of all colours in the
-            # palette. (Why doesn't PIL provide a method to directly access the
-            # colours in a palette??)
-            lut = palette_img.resize((256, 1))
-            lut.putdata(list(range(256)))
-            lut = [c[1] for c in lut.convert("RGB").getcolors()]
-            facecolor_rgb = list(mpl.colors.hex2color(mpl.colors.cnames[facecolor]))
-            for i in [0, 1, 2]:
-                facecolor_rgb[i] = int(facecolor_rgb[i] * 255)
-            facecolor_index = lut.index(tuple(facecolor_rgb))
-
-            logging.debug("saving figure as transparent PNG with transparency index %s.", facecolor_index)
-            palette_img.save(output, format="PNG", transparency=facecolor_index)
+        # Derive additional data fields.
+        logging.debug("preparing additional data fields..")
+        self._derive_datafields()
+        self._prepare_datafields()
 
-        logging.debug("returning figure..")
-        return output.getvalue()
+    def _get_field_statistics(self, name):
+        """Returns the statistics of the complete data field <name> (see
+        mslib.mswms.utils.field_statistics()) in the units of self.data, or
+        None if the driver does not provide them.
+        """
+        get_statistics = getattr(self.driver, "get_field_statistics", None)
+        statistics = get_statistics(name) if get_statistics is not None else None
+        if statistics is None:
+            return None
+        origunit, dataunit = self.driver.data_units.get(name), self.data_units.get(name)
+        if origunit is not None and dataunit is not None and origunit != dataunit:
+            statistics = transform_statistics(statistics, lambda x: convert_to(x, origunit, dataunit))
+        return statistics
+
+    def _hide_cut_texts(self, canvas, crop_margin):
+        """Hides the texts (e.g. contour labels) crossing the border of the
+        image remaining after cutting off crop_margin (left, top, right,
+        bottom) pixels.
+        """
+        left, top, right, bottom = crop_margin
+        width, height = self.fig.bbox.width, self.fig.bbox.height
+        renderer = canvas.get_renderer()
+        for text in self.fig.findobj(mpl.text.Text):
+            if not text.get_visible() or not text.get_text():
+                continue
+            extent = text.get_window_extent(renderer)
+            inside = (extent.x0 >= left and extent.x1 <= width - right and
+                      extent.y0 >= bottom and extent.y1 <= height - top)
+            outside = (extent.x1 <= left or extent.x0 >= width - right or
+                       extent.y1 <= bottom or extent.y0 >= height - top)
+            if not inside and not outside:
+                text.set_visible(False)
 
     def shift_data(self):
         """Shift the data fields such that the longitudes are in the range
@@ -425,6 +546,106 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
         for key in self.data:
             self.data[key] = self.data[key][:, self.lon_indices]
 
+    def _decimation_factors(self, points_per_pixel):
+        """Returns the factors by which the grid may be coarsened along the
+        latitudes and the longitudes, so that at least <points_per_pixel> grid
+        points per pixel remain everywhere within the map.
+
+        The grid spacing in pixels is estimated from a sample of grid points.
+        """
+        bm = self.bm
+        num_lats, num_lons = len(self.lats), len(self.lons)
+        if num_lats < 3 or num_lons < 3:
+            return 1, 1
+        lat_indices = np.unique(np.linspace(0, num_lats - 2, min(num_lats - 1, 50)).astype(int))
+        lon_indices = np.unique(np.linspace(0, num_lons - 2, min(num_lons - 1, 50)).astype(int))
+        x, y = bm(*np.meshgrid(self.lons[lon_indices], self.lats[lat_indices]))
+        x_lon, y_lon = bm(*np.meshgrid(self.lons[lon_indices + 1], self.lats[lat_indices]))
+        x_lat, y_lat = bm(*np.meshgrid(self.lons[lon_indices], self.lats[lat_indices + 1]))
+        inside = (x >= bm.xmin) & (x <= bm.xmax) & (y >= bm.ymin) & (y <= bm.ymax)
+        if not inside.any():
+            return 1, 1
+        # pixels per map unit
+        scale_x = bm.ax.bbox.width / (bm.xmax - bm.xmin)
+        scale_y = bm.ax.bbox.height / (bm.ymax - bm.ymin)
+        factors = []
+        for x_next, y_next in ((x_lat, y_lat), (x_lon, y_lon)):
+            step = np.hypot((x_next - x) * scale_x, (y_next - y) * scale_y)[inside].max()
+            if not np.isfinite(step) or step <= 0:
+                factors.append(1)
+            else:
+                factors.append(max(1, int(1. / (points_per_pixel * step))))
+        return tuple(factors)
+
+    def decimate_data(self):
+        """Coarsens the data grid to at most decimate_points_per_pixel grid
+        points per pixel of the map, if decimate_data is enabled in
+        mss_wms_settings, as the cost of contouring scales with the number of
+        grid points. Depending on <decimation>, blocks of grid points are
+        averaged (ignoring masked values) or subsampled. Partial blocks at the
+        end of the grid are dropped to keep the grid regular.
+        """
+        if self.decimation is None or not getattr(mss_wms_settings, "decimate_data", False):
+            return
+        factor_lat, factor_lon = self._decimation_factors(
+            getattr(mss_wms_settings, "decimate_points_per_pixel", 2))
+        if factor_lat == factor_lon == 1:
+            return
+        logging.debug("decimating data grid by %s x %s..", factor_lat, factor_lon)
+        num_lats = (len(self.lats) // factor_lat) * factor_lat
+        num_lons = (len(self.lons) // factor_lon) * factor_lon
+        if self.decimation == "subsample":
+            lat_slice = slice(factor_lat // 2, num_lats, factor_lat)
+            lon_slice = slice(factor_lon // 2, num_lons, factor_lon)
+            self.lats = self.lats[lat_slice]
+            self.lons = self.lons[lon_slice]
+            for key in self.data:
+                self.data[key] = self.data[key][lat_slice, lon_slice]
+        elif self.decimation == "mean":
+            self.lats = self.lats[:num_lats].reshape(-1, factor_lat).mean(axis=1)
+            self.lons = self.lons[:num_lons].reshape(-1, factor_lon).mean(axis=1)
+            for key in self.data:
+                field = np.ma.masked_invalid(self.data[key][:num_lats, :num_lons])
+                self.data[key] = field.reshape(
+                    num_lats // factor_lat, factor_lat, num_lons // factor_lon, factor_lon).mean(axis=(1, 3))
+        else:
+            raise ValueError("unknown decimation '{}'".format(self.decimation))
+
+    def _get_projected_grid(self):
+        """Returns the native map projection coordinates x, y of the lat/lon
+        grid and the mask of the grid points outside the map domain.
+
+        As projecting large grids is expensive, the result is cached for the
+        grid, the projection and the map domain and shared by all styles. The
+        returned arrays must not be modified.
+        """
+        bm = self.bm
+        grid = hashlib.sha1(self.lons.tobytes() + self.lats.tobytes()).hexdigest()
+        key = repr((grid, self.lons.shape, self.lats.shape, str(self.lons.dtype), str(self.lats.dtype),
+                    sorted(bm.projparams.items()), bm.llcrnrx, bm.llcrnry, bm.xmin, bm.xmax, bm.ymin, bm.ymax))
+        result = PROJECTED_GRID_CACHE.get(key)
+        if result is not None:
+            return result
+
+        # compute native map projection coordinates of lat/lon grid.
+        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
+        x, y = bm(lonmesh_, latmesh_)
+        # test which coordinates are outside the map domain.
+
+        add_x = ((bm.xmax - bm.xmin) / 10.)
+        add_y = ((bm.ymax - bm.ymin) / 10.)
+
+        mask1 = x < bm.xmin - add_x
+        mask2 = x > bm.xmax + add_x
+        mask3 = y > bm.ymax + add_y
+        mask4 = y < bm.ymin - add_y
+        mask = mask1 + mask2 + mask3 + mask4
+        result = (np.asarray(x), np.asarray(y), mask)
+        for array in result:
+            array.flags.writeable = False
+        PROJECTED_GRID_CACHE.put(key, result)
+        return result
+
     def mask_data(self):
         """Mask data arrays so that all values outside the map domain
            are masked. This is required for clabel to work correctly.
@@ -435,19 +656,7 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
 
         (mr, 2011-01-18)
         """
-        # compute native map projection coordinates of lat/lon grid.
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        x, y = self.bm(lonmesh_, latmesh_)
-        # test which coordinates are outside the map domain.
-
-        add_x = ((self.bm.xmax - self.bm.xmin) / 10.)
-        add_y = ((self.bm.ymax - self.bm.ymin) / 10.)
-
-        mask1 = x < self.bm.xmin - add_x
-        mask2 = x > self.bm.xmax + add_x
-        mask3 = y > self.bm.ymax + add_y
-        mask4 = y < self.bm.ymin - add_y
-        mask = mask1 + mask2 + mask3 + mask4
+        _, _, mask = self._get_projected_grid()
         # mask data arrays.
         for key in self.data:
             self.data[key] = np.ma.masked_array(
@@ -73,7 +73,7 @@ import mpl_toolkits.basemap
 from matplotlib import patheffects
 
 from mslib.mswms.mpl_hsec import MPLBasemapHorizontalSectionStyle
-from mslib.mswms.utils import Targets, get_style_parameters, get_cbar_label_format
+from mslib.mswms.utils import Targets, get_style_parameters, get_cbar_label_format, transform_statistics
 from mslib import thermolib
 from mslib.utils import convert_to
 
@@ -106,8 +106,7 @@ class HS_CloudsStyle_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         if self.style.lower() == "default":
             self.style = "TOT"
@@ -152,7 +151,7 @@ class HS_CloudsStyle_01(MPLBasemapHorizontalSectionStyle):
         # Colors in python2.6/site-packages/matplotlib/colors.py
         cs = bm.contour(lonmesh, latmesh, data['air_pressure_at_sea_level'],
                         np.arange(950, 1050, 4), colors="burlywood", linewidths=2)
-        ax.clabel(cs, fontsize=8, fmt='%i')
+        self.clabel(cs, fontsize=8, fmt='%i')
 
         titlestring = "Total cloud cover (high, medium, low) (0-1)"
         if self.style == "LOW":
@@ -198,8 +197,7 @@ class HS_MSLPStyle_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         thick_contours = np.arange(952, 1050, 8)
         thin_contours = [c for c in np.arange(952, 1050, 2)
@@ -210,7 +208,7 @@ class HS_MSLPStyle_01(MPLBasemapHorizontalSectionStyle):
         # Colors in python2.6/site-packages/matplotlib/colors.py
         cs = bm.contour(lonmesh, latmesh, mslp,
                         thick_contours, colors="darkblue", linewidths=2)
-        ax.clabel(cs, fontsize=12, fmt='%.0f')
+        self.clabel(cs, fontsize=12, fmt='%.0f')
         cs = bm.contour(lonmesh, latmesh, mslp,
                         thin_contours, colors="darkblue", linewidths=1)
 
@@ -278,8 +276,7 @@ class HS_SEAStyle_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         thick_contours = np.arange(-10, 95, 5)
         thin_contours = [c for c in np.arange(0, 90, 1)
@@ -308,11 +305,11 @@ class HS_SEAStyle_01(MPLBasemapHorizontalSectionStyle):
                    linewidths=3, linestyles="solid")
         cs2 = bm.contour(lonmesh, latmesh, sea,
                          thin_contours, colors="white", linewidths=1)
-        cs2.clabel(cs2.levels, fontsize=14, fmt='%i')
+        self.clabel(cs2, cs2.levels, fontsize=14, fmt='%i')
         cs3 = bm.contour(lonmesh, latmesh, sea,
                          neg_thin_contours, colors="saddlebrown",
                          linewidths=1, linestyles="solid")
-        cs3.clabel(fontsize=14, fmt='%i')
+        self.clabel(cs3, fontsize=14, fmt='%i')
 
         # Plot title.
         titlestring = "Solar Elevation Angle "
@@ -350,8 +347,7 @@ class HS_SeaIceStyle_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         ice = data['sea_ice_area_fraction']
 
@@ -414,8 +410,7 @@ class HS_TemperatureStyle_ML_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         cmin = -72
         cmax = 42
@@ -441,7 +436,7 @@ class HS_TemperatureStyle_ML_01(MPLBasemapHorizontalSectionStyle):
                         [0], colors="red", linewidths=4)
         cs = bm.contour(lonmesh, latmesh, tempC,
                         thick_contours, colors="saddlebrown", linewidths=2)
-        ax.clabel(cs, fontsize=14, fmt='%i')
+        self.clabel(cs, fontsize=14, fmt='%i')
         cs = bm.contour(lonmesh, latmesh, tempC,
                         thin_contours, colors="saddlebrown", linewidths=1)
 
@@ -475,21 +470,26 @@ class HS_GenericStyle(MPLBasemapHorizontalSectionStyle):
         bm = self.bm
         ax = self.bm.ax
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         show_data = np.ma.masked_invalid(self.data[self.dataname]) * self.unit_scale
         # get cmin, cmax, cbar_log and cbar_format for level_key
         cmin, cmax = Targets.get_range(self.dataname, self.level, self.name[-2:])
+        # the range of the complete field keeps the colour scale independent of the bounding box
+        statistics = None
+        if cmin is None or cmax is None or self.style in ("auto", "autolog"):
+            statistics = self._get_field_statistics(self.dataname)
+            if statistics is not None:
+                statistics = transform_statistics(statistics, lambda x: x * self.unit_scale)
         cmin, cmax, clevs, cmap, norm, ticks = get_style_parameters(
-            self.dataname, self.style, cmin, cmax, show_data)
+            self.dataname, self.style, cmin, cmax, show_data, statistics=statistics)
 
         tc = bm.contourf(lonmesh, latmesh, show_data, levels=clevs, cmap=cmap, extend="both", norm=norm)
 
         for cont_data, cont_levels, cont_colour, cont_label_colour, cont_style, cont_lw, pe in self.contours:
             cs_pv = ax.contour(lonmesh, latmesh, self.data[cont_data], cont_levels,
                                colors=cont_colour, linestyles=cont_style, linewidths=cont_lw)
-            cs_pv_lab = ax.clabel(cs_pv, colors=cont_label_colour, fmt='%i')
+            cs_pv_lab = self.clabel(cs_pv, colors=cont_label_colour, fmt='%i')
             if pe:
                 plt.setp(cs_pv.collections, path_effects=[patheffects.withStroke(linewidth=cont_lw + 2,
                                                                                  foreground="w")])
@@ -607,8 +607,7 @@ class HS_TemperatureStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         cmin = -72
         cmax = 42
@@ -635,7 +634,7 @@ class HS_TemperatureStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         cs = bm.contour(lonmesh, latmesh, tempC,
                         thick_contours, colors="saddlebrown",
                         linewidths=2, linestyles="solid")
-        ax.clabel(cs, colors="black", fontsize=14, fmt='%i')
+        self.clabel(cs, colors="black", fontsize=14, fmt='%i')
         cs = bm.contour(lonmesh, latmesh, tempC,
                         thin_contours, colors="white",
                         linewidths=1, linestyles="solid")
@@ -649,7 +648,7 @@ class HS_TemperatureStyle_PL_01(MPLBasemapHorizontalSectionStyle):
             lablevels = cs.levels[::2]
         else:
             lablevels = cs.levels[1::2]
-        ax.clabel(cs, lablevels, fontsize=10, fmt='%i')
+        self.clabel(cs, lablevels, fontsize=10, fmt='%i')
 
         titlestring = "Temperature (degC) and Geopotential Height (m) at " \
             "{:.0f} hPa".format(self.level)
@@ -697,8 +696,7 @@ class HS_GeopotentialWindStyle_PL(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         # Compute wind speed.
         u = data["eastward_wind"]
@@ -755,7 +753,7 @@ class HS_GeopotentialWindStyle_PL(MPLBasemapHorizontalSectionStyle):
             lablevels = cs.levels[::2]
         else:
             lablevels = cs.levels[1::2]
-        ax.clabel(cs, lablevels, fontsize=14, fmt='%i')
+        self.clabel(cs, lablevels, fontsize=14, fmt='%i')
 
         # Plot title.
         titlestring = "Geopotential Height (m) and Horizontal Wind (m/s) " \
@@ -792,11 +790,9 @@ class HS_RelativeHumidityStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         ("pl", "geopotential_height", "m"),
         ("pl", "specific_humidity", "kg/kg")]
 
-    def _prepare_datafields(self):
-        """Computes relative humidity from p, t, q.
-        """
-        self.data["relative_humidity"] = thermolib.rel_hum(
-            self.level * 100., self.data["air_temperature"], self.data["specific_humidity"])
+    derived_datafields = [
+        ("relative_humidity", ("level", "air_temperature", "specific_humidity"),
+         lambda level, t, q: thermolib.rel_hum(level * 100., t, q))]
 
     def _plot_style(self):
         """
@@ -805,8 +801,7 @@ class HS_RelativeHumidityStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         filled_contours = np.arange(70, 140, 15)
         thin_contours = np.arange(10, 140, 15)
@@ -828,7 +823,7 @@ class HS_RelativeHumidityStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         cs = bm.contour(lonmesh, latmesh, rh,
                         thin_contours, colors="grey",
                         linewidths=0.5, linestyles="solid")
-        ax.clabel(cs, colors="grey", fontsize=10, fmt='%i')
+        self.clabel(cs, colors="grey", fontsize=10, fmt='%i')
         cs = bm.contour(lonmesh, latmesh, rh,
                         np.arange(100, 170, 15), colors="yellow", linewidths=1)
 
@@ -842,7 +837,7 @@ class HS_RelativeHumidityStyle_PL_01(MPLBasemapHorizontalSectionStyle):
             lablevels = cs.levels[::2]
         else:
             lablevels = cs.levels[1::2]
-        ax.clabel(cs, lablevels, fontsize=10, fmt='%i')
+        self.clabel(cs, lablevels, fontsize=10, fmt='%i')
 
         titlestring = "Relative Humditiy (%%) and Geopotential Height (m) at " \
             "{:.0f} hPa".format(self.level)
@@ -878,13 +873,9 @@ class HS_EQPTStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         ("pl", "geopotential_height", "m"),
         ("pl", "specific_humidity", "kg/kg")]
 
-    def _prepare_datafields(self):
-        """Computes relative humidity from p, t, q.
-        """
-        self.data["equivalent_potential_temperature"] = thermolib.eqpt_approx(
-            self.level * 100., self.data["air_temperature"], self.data["specific_humidity"])
-        self.data["equivalent_potential_temperature"] = convert_to(
-            self.data["equivalent_potential_temperature"], "K", "degC")
+    derived_datafields = [
+        ("equivalent_potential_temperature", ("level", "air_temperature", "specific_humidity"),
+         lambda level, t, q: convert_to(thermolib.eqpt_approx(level * 100., t, q), "K", "degC"))]
 
     def _plot_style(self):
         """
@@ -893,8 +884,7 @@ class HS_EQPTStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         filled_contours = np.arange(0, 72, 2)
         thin_contours = np.arange(-40, 100, 2)
@@ -919,7 +909,7 @@ class HS_EQPTStyle_PL_01(MPLBasemapHorizontalSectionStyle):
             lablevels = cs.levels[::2]
         else:
             lablevels = cs.levels[1::2]
-        ax.clabel(cs, lablevels, colors="grey", fontsize=10, fmt='%i')
+        self.clabel(cs, lablevels, colors="grey", fontsize=10, fmt='%i')
         # cs = bm.contour(lonmesh, latmesh, eqpt,
         #                np.arange(100, 170, 15), colors="yellow", linewidths=1)
 
@@ -933,7 +923,7 @@ class HS_EQPTStyle_PL_01(MPLBasemapHorizontalSectionStyle):
             lablevels = cs.levels[::2]
         else:
             lablevels = cs.levels[1::2]
-        ax.clabel(cs, lablevels, fontsize=10, fmt='%i')
+        self.clabel(cs, lablevels, fontsize=10, fmt='%i')
 
         titlestring = "Equivalent Potential Temperature (degC) and Geopotential Height (m) at " \
                       "{:.0f} hPa".format(self.level)
@@ -969,13 +959,9 @@ class HS_WStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         ("pl", "air_temperature", "K"),
         ("pl", "geopotential_height", "m")]
 
-    def _prepare_datafields(self):
-        """Computes relative humidity from p, t, q.
-        """
-        self.data["upward_wind"] = thermolib.omega_to_w(
-            self.data["lagrangian_tendency_of_air_pressure"],
-            self.level * 100., self.data["air_temperature"])
-        self.data["upward_wind"] = convert_to(self.data["upward_wind"], "m/s", "cm/s")
+    derived_datafields = [
+        ("upward_wind", ("lagrangian_tendency_of_air_pressure", "level", "air_temperature"),
+         lambda omega, level, t: convert_to(thermolib.omega_to_w(omega, level * 100., t), "m/s", "cm/s"))]
 
     def _plot_style(self):
         """
@@ -984,8 +970,7 @@ class HS_WStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         upward_contours = np.arange(-42, 46, 4)
         w = data["upward_wind"]
@@ -1022,7 +1007,7 @@ class HS_WStyle_PL_01(MPLBasemapHorizontalSectionStyle):
             lablevels = cs.levels[::2]
         else:
             lablevels = cs.levels[1::2]
-        ax.clabel(cs, lablevels, fontsize=10, fmt='%i')
+        self.clabel(cs, lablevels, fontsize=10, fmt='%i')
 
         titlestring = "Vertical Velocity (cm/s) and Geopotential Height (m) at " \
                       "{:.0f} hPa".format(self.level)
@@ -1064,8 +1049,7 @@ class HS_DivStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         pos_contours = np.arange(4, 42, 4)
         neg_contours = np.arange(-40, 0, 4)
@@ -1090,7 +1074,7 @@ class HS_DivStyle_PL_01(MPLBasemapHorizontalSectionStyle):
             lablevels = cs.levels[::2]
         else:
             lablevels = cs.levels[1::2]
-        ax.clabel(cs, lablevels, fontsize=10, fmt='%i')
+        self.clabel(cs, lablevels, fontsize=10, fmt='%i')
 
         titlestring = "Divergence (positive: red, negative: blue) and Geopotential Height (m) at " \
             "{:.0f} hPa".format(self.level)
@@ -1133,8 +1117,7 @@ class HS_EMAC_TracerStyle_ML_01(MPLBasemapHorizontalSectionStyle):
         tracer = data["emac_R12"] * 1.e4
 
         # Shift lat/lon grid for PCOLOR (see comments in HS_EMAC_TracerStyle_SFC_01).
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         tc = bm.pcolormesh(lonmesh, latmesh, tracer,
                            cmap=plt.cm.hot_r,
@@ -1144,7 +1127,7 @@ class HS_EMAC_TracerStyle_ML_01(MPLBasemapHorizontalSectionStyle):
         ac = bm.contour(lonmesh, latmesh, tracer,
                         np.arange(1, 101, 1)[::2],
                         colors="b", linewidths=1)
-        ax.clabel(ac, fontsize=10, fmt='%i')
+        self.clabel(ac, fontsize=10, fmt='%i')
 
         if not self.noframe:
             cbar = self.fig.colorbar(tc, fraction=0.05, pad=0.08, shrink=0.7)
@@ -1202,8 +1185,7 @@ class HS_EMAC_TracerStyle_SFC_01(MPLBasemapHorizontalSectionStyle):
         # NOTE that this assumes a regular grid, which is not fully true for
         # EMAC's latitudes. The error, however, is small, thus we neglect it
         # here.
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         tc = bm.pcolormesh(lonmesh, latmesh, tracer,
                            cmap=plt.cm.hot_r,
@@ -1213,7 +1195,7 @@ class HS_EMAC_TracerStyle_SFC_01(MPLBasemapHorizontalSectionStyle):
         ac = bm.contour(lonmesh, latmesh, tracer,
                         np.arange(0.05, 0.55, 0.05),
                         colors="b", linewidths=1)
-        ax.clabel(ac, fontsize=10, fmt='%.2f')
+        self.clabel(ac, fontsize=10, fmt='%.2f')
 
         if not self.noframe:
             cbar = self.fig.colorbar(tc, fraction=0.05, pad=0.08, shrink=0.7)
@@ -1270,8 +1252,7 @@ class HS_PVTropoStyle_PV_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         # Default style is pressure.
         if self.style.lower() == "default":
@@ -1322,7 +1303,7 @@ class HS_PVTropoStyle_PV_01(MPLBasemapHorizontalSectionStyle):
             lablevels = cs.levels[::2]
         else:
             lablevels = cs.levels[1::2]
-        ax.clabel(cs, lablevels, colors="red", fontsize=11, fmt='%i')
+        self.clabel(cs, lablevels, colors="red", fontsize=11, fmt='%i')
 
         if self.style == "PRES":
             titlestring = "Dynamical Tropopause Pressure (hPa) at " \
@@ -1378,8 +1359,7 @@ class HS_ThermalTropoStyle_SFC_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         # Define colourbars and contour levels for the three styles. For
         # pressure and height, a terrain colourmap is used (bluish colours for
@@ -1434,7 +1414,7 @@ class HS_ThermalTropoStyle_SFC_01(MPLBasemapHorizontalSectionStyle):
             lablevels = cs.levels[::2]
         else:
             lablevels = cs.levels[1::2]
-        ax.clabel(cs, lablevels, colors="red", fontsize=11, fmt='%i')
+        self.clabel(cs, lablevels, colors="red", fontsize=11, fmt='%i')
 
 
 class HS_VIProbWCB_Style_01(MPLBasemapHorizontalSectionStyle):
@@ -1460,8 +1440,7 @@ class HS_VIProbWCB_Style_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         thick_contours = np.arange(952, 1050, 8)
         thin_contours = [c for c in np.arange(952, 1050, 2)
@@ -1473,7 +1452,7 @@ class HS_VIProbWCB_Style_01(MPLBasemapHorizontalSectionStyle):
         # Contour plot of mean sea level pressure.
         cs = bm.contour(lonmesh, latmesh, mslp,
                         thick_contours, colors="darkblue", linewidths=2)
-        ax.clabel(cs, fontsize=12, fmt='%i')
+        self.clabel(cs, fontsize=12, fmt='%i')
         cs = bm.contour(lonmesh, latmesh, mslp,
                         thin_contours, colors="darkblue", linewidths=1)
 
@@ -1527,8 +1506,7 @@ class HS_LagrantoTrajStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         thin_contours = [0.1, 0.5, 1., 2., 3., 4., 5., 6., 7., 8.]
 
@@ -1542,7 +1520,7 @@ class HS_LagrantoTrajStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         # ax.clabel(cs, fontsize=12, fmt='%i')
         cs = bm.contour(lonmesh, latmesh, ninsitu,
                         thin_contours, colors="red", linewidths=1)
-        ax.clabel(cs, fontsize=12, fmt='%.1f')
+        self.clabel(cs, fontsize=12, fmt='%.1f')
 
         # Contour plot of num(MIX).
         # cs = bm.contour(lonmesh, latmesh, nmix,
@@ -1550,7 +1528,7 @@ class HS_LagrantoTrajStyle_PL_01(MPLBasemapHorizontalSectionStyle):
         # ax.clabel(cs, fontsize=12, fmt='%i')
         cs = bm.contour(lonmesh, latmesh, nmix,
                         thin_contours, colors="darkblue", linewidths=1)
-        ax.clabel(cs, fontsize=12, fmt='%.1f')
+        self.clabel(cs, fontsize=12, fmt='%.1f')
 
         # Filled contours of num(WCB).
         contours = bm.contourf(lonmesh, latmesh, nwcb,
@@ -1598,8 +1576,7 @@ class HS_BLH_MSLP_Style_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         thick_contours = np.arange(952, 1050, 8)
         thin_contours = [c for c in np.arange(952, 1050, 2)
@@ -1610,7 +1587,7 @@ class HS_BLH_MSLP_Style_01(MPLBasemapHorizontalSectionStyle):
         # Colors in python2.6/site-packages/matplotlib/colors.py
         cs = bm.contour(lonmesh, latmesh, mslp,
                         thick_contours, colors="darkred", linewidths=2)
-        ax.clabel(cs, fontsize=12, fmt='%i')
+        self.clabel(cs, fontsize=12, fmt='%i')
         cs = bm.contour(lonmesh, latmesh, mslp,
                         thin_contours, colors="darkred", linewidths=1)
 
@@ -1629,7 +1606,7 @@ class HS_BLH_MSLP_Style_01(MPLBasemapHorizontalSectionStyle):
         # Labelled thin grey contours of BLH, interval 500m.
         cs = bm.contour(lonmesh, latmesh, blh,
                         np.arange(0, 3000, 500), colors="grey", linewidths=0.5)
-        ax.clabel(cs, fontsize=12, fmt='%i')
+        self.clabel(cs, fontsize=12, fmt='%i')
 
         # Title
         titlestring = "Boundary layer height (m) and mean sea level pressure (hPa)"
@@ -1668,8 +1645,7 @@ class HS_Meteosat_BT108_01(MPLBasemapHorizontalSectionStyle):
         ax = self.bm.ax
         data = self.data
 
-        lonmesh_, latmesh_ = np.meshgrid(self.lons, self.lats)
-        lonmesh, latmesh = bm(lonmesh_, latmesh_)
+        lonmesh, latmesh, _ = self._get_projected_grid()
 
         cmin = 230
         cmax = 300
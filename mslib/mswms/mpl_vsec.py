@@ -28,8 +28,6 @@
 """
 # style definitions should be put in mpl_vsec_styles.py
 
-import PIL.Image
-import io
 import logging
 import numpy as np
 from abc import abstractmethod
@@ -37,7 +35,7 @@ from xml.dom.minidom import getDOMImplementation
 import matplotlib as mpl
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 
-from mslib.mswms import mss_2D_sections
+from mslib.mswms import encoder, mss_2D_sections
 from mslib.utils import convert_to
 
 mpl.rcParams['xtick.direction'] = 'out'
@@ -144,7 +142,7 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
                 raise KeyError("required data field '{}' not found".format(dataitem))
             origunit = self.driver.data_units[dataitem]
             if dataunit is not None:
-                data[dataitem] = convert_to(data[dataitem], origunit, dataunit)
+                data[dataitem] = convert_to(data[dataitem], origunit, dataunit, copy=False)
                 self.data_units[dataitem] = dataunit
             else:
                 logging.debug("Please add units to plot variables")
@@ -166,11 +164,12 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
         self.orography_color = orography_color
 
         # Derive additional data fields and make the plot.
+        self._derive_datafields()
         self._prepare_datafields()
 
         # Code for producing a png image with Matplotlib.
         # ===============================================
-        if return_format == "image/png":
+        if return_format in encoder.image_formats():
 
             logging.debug("creating figure..")
             dpi = 80
@@ -190,57 +189,18 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
             if transparent:
                 self.fig.patch.set_alpha(0.)
 
-            # Return the image as png embedded in a StringIO stream.
+            # Return the image encoded in the requested format.
             canvas = FigureCanvas(self.fig)
-            output = io.BytesIO()
-            canvas.print_png(output)
+            canvas.draw()
+            image = encoder.canvas_image(canvas)
 
             if show:
                 logging.debug("saving figure to mpl_vsec.png ..")
-                canvas.print_png("mpl_vsec.png")
-
-            # Convert the image to an 8bit palette image with a significantly
-            # smaller file size (~factor 4, from RGBA to one 8bit value, plus the
-            # space to store the palette colours).
-            # NOTE: PIL at the current time can only create an adaptive palette for
-            # RGB images, hence alpha values are lost here. If transparency is
-            # requested, the figure face colour is stored as the "transparent"
-            # colour in the image. This works in most cases, but might lead to
-            # visible artefacts in some cases.
-            logging.debug("converting image to indexed palette.")
-            # Read the above stored png into a PIL image and create an adaptive
-            # colour palette.
-            output.seek(0)  # necessary for PIL.Image.open()
-            palette_img = PIL.Image.open(output).convert(mode="RGB"
-                                                         ).convert("P", palette=PIL.Image.ADAPTIVE)
-            output = io.BytesIO()
-            if not transparent:
-                logging.debug("saving figure as non-transparent PNG.")
-                palette_img.save(output, format="PNG")  # using optimize=True doesn't change much
-            else:
-                # If the image has a transparent background, we need to find the
-                # index of the background colour in the palette. See the
-                # documentation for PIL's ImagePalette module
-                # (http://www.pythonware.com/library/pil/handbook/imagepalette.htm). The
-                # idea is to create a 256 pixel image with the same colour palette
-                # as the original image and use it as a lookup-table. Converting the
-                # lut image back to RGB gives us a list of all colours in the
-                # palette. (Why doesn't PIL provide a method to directly access the
-                # colours in a palette??)
-                lut = palette_img.resize((256, 1))
-                lut.putdata(list(range(256)))
-                lut = [c[1] for c in lut.convert("RGB").getcolors()]
-                facecolor_rgb = list(mpl.colors.hex2color(mpl.colors.cnames[facecolor]))
-                for i in [0, 1, 2]:
-                    facecolor_rgb[i] = int(facecolor_rgb[i] * 255)
-                facecolor_index = lut.index(tuple(facecolor_rgb))
-
-                logging.debug("saving figure as transparent PNG with transparency index %i.",
-                              facecolor_index)
-                palette_img.save(output, format="PNG", transparency=facecolor_index)
+                image.save("mpl_vsec.png", format="PNG")
 
+            output = encoder.encode_image(image, return_format, transparent)
             logging.debug("returning figure..")
-            return output.getvalue()
+            return output
 
         # Code for generating an XML document with the data values in ASCII format.
         # =========================================================================
@@ -310,3 +270,22 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
 
             # Return the XML document as formatted string.
             return xmldoc.toprettyxml(indent="  ")
+
+        # Code for encoding the data values in a binary container.
+        # ========================================================
+        elif return_format == encoder.ARRAYS_FORMAT:
+            arrays = {"latitude": self.lats, "longitude": self.lons}
+            attributes = {
+                "title": self.title,
+                "valid_time": self.valid_time.strftime("%Y-%m-%dT%H:%M:%SZ") if self.valid_time else None,
+                "init_time": self.init_time.strftime("%Y-%m-%dT%H:%M:%SZ") if self.init_time else None,
+                "units": dict(self.data_units),
+            }
+            if self.driver.vert_data is not None:
+                # The curtains are ordered bottom to top like the vertical coordinate.
+                arrays["vertical_coordinate"] = self.driver.vert_data[::-self.driver.vert_order]
+                attributes["vertical_type"] = self.driver.vert_type
+                attributes["vertical_units"] = self.driver.vert_units
+            for var in self.data:
+                arrays[var] = self.data[var]
+            return encoder.encode_arrays(arrays, attributes)
@@ -56,12 +56,8 @@ class VS_TemperatureStyle_01(AbstractVerticalSectionStyle):
         ("ml", "air_pressure", "Pa"),
         ("ml", "air_temperature", "K")]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature if
-        it has not been passed as a data field.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp)]
 
     def _plot_style(self):
         """Make a temperature/potential temperature vertical section.
@@ -333,12 +329,8 @@ class VS_CloudsStyle_01(AbstractVerticalSectionStyle):
         ("ml", "air_temperature", "K"),
         ("ml", "cloud_area_fraction_in_atmosphere_layer", 'dimensionless')]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature if
-        it has not been passed as a data field.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp)]
 
     def _plot_style(self):
         """Make a cloud cover vertical section with temperature/potential
@@ -418,14 +410,9 @@ class VS_CloudsWindStyle_01(AbstractVerticalSectionStyle):
         ("ml", "eastward_wind", "m/s"),
         ("ml", "northward_wind", "m/s")]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature and
-           total horizontal wind speed.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
-        self.data["horizontal_wind"] = np.hypot(
-            self.data["eastward_wind"], self.data["northward_wind"])
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp),
+        ("horizontal_wind", ("eastward_wind", "northward_wind"), np.hypot)]
 
     def _plot_style(self):
         """Make a cloud cover vertical section with wind speed and potential
@@ -497,15 +484,9 @@ class VS_RelativeHumdityStyle_01(AbstractVerticalSectionStyle):
         ("ml", "air_temperature", "K"),
         ("ml", "specific_humidity", "kg/kg")]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature if
-        it has not been passed as a data field. Also computes relative humdity.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
-        self.data["relative_humidity"] = thermolib.rel_hum(
-            self.data['air_pressure'], self.data["air_temperature"],
-            self.data["specific_humidity"])
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp),
+        ("relative_humidity", ("air_pressure", "air_temperature", "specific_humidity"), thermolib.rel_hum)]
 
     def _plot_style(self):
         """Make a relative humidity vertical section with temperature/potential
@@ -598,12 +579,8 @@ class VS_SpecificHumdityStyle_01(AbstractVerticalSectionStyle):
         ("ml", "specific_humidity", "g/kg"),
         ("ml", "northward_wind", "m/s")]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature if
-        it has not been passed as a data field. Also computes relative humdity.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp)]
 
     def _plot_style(self):
         """Make a relative humidity vertical section with temperature/potential
@@ -708,17 +685,10 @@ class VS_VerticalVelocityStyle_01(AbstractVerticalSectionStyle):
         ("ml", "air_temperature", "K"),
         ("ml", "lagrangian_tendency_of_air_pressure", "Pa/s")]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature if
-        it has not been passed as a data field. Also computes vertical
-        velocity in cm/s.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
-        self.data["upward_wind"] = convert_to(
-            thermolib.omega_to_w(self.data["lagrangian_tendency_of_air_pressure"],
-                                 self.data['air_pressure'], self.data["air_temperature"]),
-            "m/s", "cm/s")
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp),
+        ("upward_wind", ("lagrangian_tendency_of_air_pressure", "air_pressure", "air_temperature"),
+         lambda omega, p, t: convert_to(thermolib.omega_to_w(omega, p, t), "m/s", "cm/s"))]
 
     def _plot_style(self):
         """Make a vertical velocity vertical section with temperature/potential
@@ -812,14 +782,9 @@ class VS_HorizontalVelocityStyle_01(AbstractVerticalSectionStyle):
         ("ml", "eastward_wind", "m/s"),
         ("ml", "northward_wind", "m/s")]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature and
-           total horizontal wind speed.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
-        self.data["horizontal_wind"] = np.hypot(
-            self.data["eastward_wind"], self.data["northward_wind"])
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp),
+        ("horizontal_wind", ("eastward_wind", "northward_wind"), np.hypot)]
 
     def _plot_style(self):
         """Make a horizontal velocity vertical section with temperature/potential
@@ -1048,14 +1013,9 @@ class VS_PotentialVorticityStyle_01(AbstractVerticalSectionStyle):
         ("ml", "specific_cloud_ice_water_content", "g/kg"),
         ("ml", "ertel_potential_vorticity", "PVU")]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature and
-           total horizontal wind speed.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
-        self.data["horizontal_wind"] = np.hypot(
-            self.data["eastward_wind"], self.data["northward_wind"])
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp),
+        ("horizontal_wind", ("eastward_wind", "northward_wind"), np.hypot)]
 
     def _plot_style(self):
         """Make a horizontal velocity vertical section with temperature/potential
@@ -1179,14 +1139,9 @@ class VS_ProbabilityOfWCBStyle_01(AbstractVerticalSectionStyle):
         ("ml", "specific_cloud_ice_water_content", "g/kg"),
         ("ml", "probability_of_wcb_occurrence", 'dimensionless')]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature and
-           total horizontal wind speed.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
-        self.data["horizontal_wind"] = np.hypot(
-            self.data["eastward_wind"], self.data["northward_wind"])
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp),
+        ("horizontal_wind", ("eastward_wind", "northward_wind"), np.hypot)]
 
     def _plot_style(self):
         """Make a horizontal velocity vertical section with temperature/potential
@@ -1348,12 +1303,8 @@ class VS_EMACEyja_Style_01(AbstractVerticalSectionStyle):
         ("ml", "air_temperature", "K"),
         ("ml", "emac_R12", 'dimensionless')]
 
-    def _prepare_datafields(self):
-        """Computes potential temperature from pressure and temperature if
-        it has not been passed as a data field.
-        """
-        self.data['air_potential_temperature'] = thermolib.pot_temp(
-            self.data['air_pressure'], self.data['air_temperature'])
+    derived_datafields = [
+        ("air_potential_temperature", ("air_pressure", "air_temperature"), thermolib.pot_temp)]
 
     def _plot_style(self):
         """Make a volcanic ash cloud cover vertical section with temperature/potential
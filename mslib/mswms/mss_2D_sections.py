@@ -49,6 +49,14 @@ class Abstract2DSectionStyle(metaclass=ABCMeta):
     # Define the datafields required by a style with this property.
     required_datafields = []
 
+    # Define datafields derived from the required ones with this property, as
+    # list of (name, inputs, function). function is called with the inputs,
+    # which name data fields (in the units required by the style) or
+    # attributes of the style (e.g. the level of horizontal sections). The
+    # driver caches the results, so that all styles deriving a field in the
+    # same way from the same data share it.
+    derived_datafields = []
+
     def __init__(self, driver=None):
         self.set_driver(driver)
         self.required_datatypes()
@@ -70,6 +78,27 @@ class Abstract2DSectionStyle(metaclass=ABCMeta):
             self._vert_type = None
         return result
 
+    def _derive_datafields(self):
+        """Adds the data fields listed in derived_datafields to self.data,
+           taking them from the cache of the driver if possible.
+
+        Derived fields are identified by their name, function and inputs:
+        the keys of the data fields given by the driver (with their units) or
+        the values of the attributes.
+        """
+        keys = dict(getattr(self.driver, "data_keys", {}))
+        for name, inputs, function in self.derived_datafields:
+            values = [self.data[_x] if _x in self.data else getattr(self, _x) for _x in inputs]
+            input_keys = [(keys.get(_x), self.data_units.get(_x)) if _x in self.data else (_x, _y)
+                          for _x, _y in zip(inputs, values)]
+            keys[name] = None
+            if any(_x is None for _x, _ in input_keys):
+                self.data[name] = function(*values)
+                continue
+            keys[name] = repr(("derived", name, getattr(function, "__module__", None),
+                               getattr(function, "__qualname__", repr(function)), input_keys))
+            self.data[name] = self.driver.derived_datafield(keys[name], function, values)
+
     def _prepare_datafields(self):
         """Optional re-implementation: Use this function to process some
            input data before the plotting starts (e.g. to derive potential
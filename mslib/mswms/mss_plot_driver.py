@@ -36,6 +36,35 @@ import numpy as np
 
 from mslib import netCDF4tools
 from mslib import utils
+from mslib.mswms.cache import LRUCache
+
+# Open datasets shared by all drivers.
+DATASET_POOL = netCDF4tools.MFDatasetPool()
+# Decoded hyperslabs of data fields shared by all drivers (0 bytes disables it).
+SLAB_CACHE = LRUCache(max_bytes=128 * 1024 ** 2)
+# Optional SharedArrayCache publishing the hyperslabs to other processes.
+SHARED_SLAB_CACHE = None
+
+
+def _read_hyperslab(var, index, lat_slice, lon_slices):
+    """Reads var[index + (lat_slice, lon_slice)] for each of the given
+       longitude slices and concatenates the parts along the longitude axis.
+    """
+    parts = [var[index + (lat_slice, _x)] for _x in lon_slices]
+    if len(parts) == 1:
+        return parts[0]
+    if any(isinstance(_x, np.ma.MaskedArray) for _x in parts):
+        return np.ma.concatenate(parts, axis=-1)
+    return np.concatenate(parts, axis=-1)
+
+
+def _file_lat_slice(lat_slice, num_lats, lat_order):
+    """Translates a slice of latitude indices in increasing latitude order
+       into the latitude order of the file.
+    """
+    if lat_order == -1:
+        return slice(num_lats - lat_slice.stop, num_lats - lat_slice.start)
+    return lat_slice
 
 
 class MSSPlotDriver(metaclass=ABCMeta):
@@ -65,12 +94,21 @@ class MSSPlotDriver(metaclass=ABCMeta):
         self.data_access = data_access_object
         self.dataset = None
         self.plot_object = None
+        # keys identifying the data fields loaded last (None if unknown)
+        self.data_keys = {}
+        self._slab_keys = {}
 
     def __del__(self):
-        """Closes the open NetCDF dataset, if existing.
+        """Releases the open NetCDF dataset, if existing.
+        """
+        self._release_dataset()
+
+    def _release_dataset(self):
+        """Gives the open NetCDF dataset back to the pool.
         """
         if self.dataset is not None:
-            self.dataset.close()
+            DATASET_POOL.release(self.dataset)
+            self.dataset = None
 
     def _set_time(self, init_time, fc_time):
         """Open the dataset that corresponds to a forecast field specified
@@ -83,9 +121,9 @@ class MSSPlotDriver(metaclass=ABCMeta):
               if not, closes the dataset and opens the corresponding one
           loads dimension data if required.
         """
-        if len(self.plot_object.required_datafields) == 0:
+        if len(self._required_datafields()) == 0:
             logging.debug("no datasets required.")
-            self.dataset = None
+            self._release_dataset()
             self.init_time = None
             self.fc_time = None
             self.times = np.array([])
@@ -95,15 +133,20 @@ class MSSPlotDriver(metaclass=ABCMeta):
             self.vert_data = None
             self.vert_order = None
             self.vert_units = None
+            self.vert_type = "sfc"
+            self.data_files = {}
+            self.data_file_mtimes = {}
             return
 
-        if fc_time < init_time:
-            msg = "Forecast valid time cannot be earlier than " \
-                  "initialisation time."
-            logging.error(msg)
-            raise ValueError(msg)
-        fc_step = fc_time - init_time
-        fc_step = fc_step.days * 24 + (fc_step.seconds // 3600)
+        fc_step = None
+        if init_time is not None and fc_time is not None:
+            if fc_time < init_time:
+                msg = "Forecast valid time cannot be earlier than " \
+                      "initialisation time."
+                logging.error(msg)
+                raise ValueError(msg)
+            fc_step = fc_time - init_time
+            fc_step = fc_step.days * 24 + (fc_step.seconds // 3600)
         self.fc_time = fc_time
         logging.debug("\trequested initialisation time %s", init_time)
         logging.debug("\trequested forecast valid time %s (step %s hrs)", fc_time, fc_step)
@@ -117,19 +160,22 @@ class MSSPlotDriver(metaclass=ABCMeta):
                 logging.debug("\tinitialisation time ok (%s).", init_time)
                 if fc_time in self.times:
                     logging.debug("\tforecast valid time contained (%s).", fc_time)
-                    return
+                    if self._files_unchanged(init_time, fc_time):
+                        return
+                    logging.debug("\tinput files were replaced or modified.")
             logging.debug("need to re-open input files.")
-            self.dataset.close()
-            self.dataset = None
+            self._release_dataset()
 
         # Determine the input files from the required variables and the
         # requested time:
 
         # Create the names of the files containing the required parameters.
         filenames = []
-        for vartype, var, _ in self.plot_object.required_datafields:
+        data_files = {}
+        for vartype, var, _ in self._required_datafields():
             filename = self.data_access.get_filename(
                 var, vartype, init_time, fc_time, fullpath=True)
+            data_files[var] = filename
             if filename not in filenames:
                 filenames.append(filename)
             logging.debug("\tvariable '%s' requires input file '%s'",
@@ -141,10 +187,11 @@ class MSSPlotDriver(metaclass=ABCMeta):
 
         self.init_time = init_time
 
-        # Open NetCDF files as one dataset with common dimensions.
+        # Open NetCDF files as one dataset with common dimensions (or reuse
+        # an already opened one).
         logging.debug("opening datasets.")
         dsKWargs = self.data_access.mfDatasetArgs()
-        dataset = netCDF4tools.MFDatasetCommonDims(filenames, **dsKWargs)
+        dataset = DATASET_POOL.acquire(filenames, **dsKWargs)
 
         # Load and check time dimension. self.dataset will remain None
         # if an Exception is raised here.
@@ -159,7 +206,7 @@ class MSSPlotDriver(metaclass=ABCMeta):
         if fc_time not in times:
             msg = "Forecast valid time '{}' is not available.".format(fc_time)
             logging.error(msg)
-            dataset.close()
+            DATASET_POOL.release(dataset)
             raise ValueError(msg)
 
         # Load lat/lon dimensions.
@@ -167,15 +214,19 @@ class MSSPlotDriver(metaclass=ABCMeta):
             lat_data, lon_data, lat_order = netCDF4tools.get_latlon_data(dataset)
         except Exception as ex:
             logging.error("ERROR: %s %s", type(ex), ex)
-            dataset.close()
+            DATASET_POOL.release(dataset)
             raise
 
-        _, vert_data, vert_orientation, vert_units, _ = netCDF4tools.identify_vertical_axis(dataset)
+        _, vert_data, vert_orientation, vert_units, vert_type = netCDF4tools.identify_vertical_axis(dataset)
         self.vert_data = vert_data[:] if vert_data is not None else None
         self.vert_order = vert_orientation
         self.vert_units = vert_units
+        self.vert_type = vert_type
 
         self.dataset = dataset
+        self.data_files = data_files
+        # the versions of the files actually read from the dataset
+        self.data_file_mtimes = DATASET_POOL.get_mtimes(dataset)
         self.times = times
         self.lat_data = lat_data
         self.lon_data = lon_data
@@ -185,6 +236,25 @@ class MSSPlotDriver(metaclass=ABCMeta):
         # to the data fields required by the plot object.
         self._find_data_vars()
 
+    def _files_unchanged(self, init_time, fc_time):
+        """Checks whether the open dataset consists of the current versions
+           of the files required for init_time and fc_time.
+        """
+        try:
+            for vartype, var, _ in self._required_datafields():
+                filename = self.data_access.get_filename(var, vartype, init_time, fc_time, fullpath=True)
+                if (self.data_files.get(var) != filename or
+                        os.path.getmtime(filename) != self.data_file_mtimes.get(filename)):
+                    return False
+        except (IOError, OSError, ValueError):
+            return False
+        return True
+
+    def _required_datafields(self):
+        """Returns the data fields to be loaded for the plot.
+        """
+        return self.plot_object.required_datafields
+
     def _find_data_vars(self):
         """Find NetCDF variables of required data fields.
 
@@ -196,12 +266,75 @@ class MSSPlotDriver(metaclass=ABCMeta):
         """
         self.data_vars = {}
         self.data_units = {}
-        for df_type, df_name, _ in self.plot_object.required_datafields:
+        for df_type, df_name, _ in self._required_datafields():
             varname, var = netCDF4tools.identify_variable(self.dataset, df_name, check=True)
             logging.debug("\tidentified variable <%s> for field <%s>", varname, df_name)
             self.data_vars[df_name] = var
             self.data_units[df_name] = getattr(var, "units", None)
 
+    def _read_slab(self, name, var, index, lat_slice, lon_slices):
+        """Reads a hyperslab of the data field <name> (see _read_hyperslab())
+           or takes it from the slab cache.
+
+        Cached slabs are identified by data file, its modification time (when
+        the dataset was opened), data field, index (time step and level) and
+        the lat/lon window. They
+        are shared by all drivers and thus read-only. If SHARED_SLAB_CACHE is
+        set, slabs not in the slab cache of this process are taken from (or
+        published to) the processes sharing it.
+        """
+        self._slab_keys[name] = None
+        filename = self.data_files.get(name)
+        mtime = self.data_file_mtimes.get(filename)
+        if mtime is None or (SLAB_CACHE.max_bytes == 0 and SHARED_SLAB_CACHE is None):
+            return _read_hyperslab(var, index, lat_slice, lon_slices)
+        key = repr((filename, mtime, name, index, lat_slice, lon_slices))
+        self._slab_keys[name] = key
+        slab = SLAB_CACHE.get(key)
+        if slab is not None:
+            logging.debug("\tTaken data field <%s> from slab cache.", name)
+            return slab
+        if SHARED_SLAB_CACHE is not None:
+            slab = SHARED_SLAB_CACHE.get(key)
+            if slab is not None:
+                logging.debug("\tTaken data field <%s> from shared slab cache.", name)
+        if slab is None:
+            slab = _read_hyperslab(var, index, lat_slice, lon_slices)
+            slab.setflags(write=False)
+            if SHARED_SLAB_CACHE is not None:
+                # continue with the shared copy, so that the slab is held only once
+                shared_slab = SHARED_SLAB_CACHE.put(key, slab)
+                if shared_slab is not None:
+                    slab = shared_slab
+        SLAB_CACHE.put(key, slab)
+        return slab
+
+    def _set_data_keys(self, *args):
+        """Sets the keys identifying the loaded data fields from the keys of
+           the slabs read since the last call and <args> describing further
+           processing of the slabs. The key of a data field is None, if its
+           slab is not identifiable.
+        """
+        self.data_keys = dict((_name, repr((_key,) + args) if _key is not None else None)
+                              for _name, _key in self._slab_keys.items())
+        self._slab_keys = {}
+
+    def derived_datafield(self, key, function, inputs):
+        """Returns function(*inputs), a data field derived from the loaded
+           data fields, which is identified by <key> (see
+           Abstract2DSectionStyle._derive_datafields()). The result is cached
+           alongside the slabs and shared by all styles.
+        """
+        value = SLAB_CACHE.get(key)
+        if value is None:
+            value = function(*inputs)
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+                SLAB_CACHE.put(key, value)
+        else:
+            logging.debug("\tTaken derived data field from slab cache.")
+        return value
+
     def have_data(self, plot_object, init_time, valid_time):
         """Checks if this driver has the required data to do the plot
 
@@ -234,9 +367,8 @@ class MSSPlotDriver(metaclass=ABCMeta):
         # (the required variables could have changed).
         if self.plot_object is not None:
             require_reload = require_reload or (self.plot_object != plot_object)
-        if require_reload and self.dataset is not None:
-            self.dataset.close()
-            self.dataset = None
+        if require_reload:
+            self._release_dataset()
 
         self.plot_object = plot_object
         self.figsize = figsize
@@ -337,6 +469,14 @@ class VerticalSectionDriver(MSSPlotDriver):
        to be registered).
     """
 
+    def __init__(self, data_access_object, restrict_vertical_range=False):
+        """If <restrict_vertical_range> is set, only the pressure levels within
+           the pressure range of the requested BBOX are read for data on
+           pressure levels; the curtains are masked above and below.
+        """
+        super(VerticalSectionDriver, self).__init__(data_access_object)
+        self.restrict_vertical_range = restrict_vertical_range
+
     def set_plot_parameters(self, plot_object=None, vsec_path=None,
                             vsec_numpoints=101, vsec_path_connection='linear',
                             vsec_numlabels=10,
@@ -424,6 +564,7 @@ class VerticalSectionDriver(MSSPlotDriver):
         cross section crosses the data longitude boundaries (e.g. data is
         stored on a 0..360 grid, but the path is in the range -10..+20).
         """
+        self.data_keys = {}
         if self.dataset is None:
             return {}
         data = {}
@@ -448,11 +589,32 @@ class VerticalSectionDriver(MSSPlotDriver):
         lon_indices = lon_data.argsort()
         lon_data = lon_data[lon_indices]
 
+        # Only the corridor of grid cells around the path is read. The
+        # longitudes of the corridor may be split into two contiguous parts
+        # in the file (e.g. data on a 0..360 grid and a path crossing 0).
+        lat_slice, lon_slice = self._get_window(lon_data)
+        lat_data = self.lat_data[lat_slice]
+        lon_data = lon_data[lon_slice]
+        lon_indices = lon_indices[lon_slice]
+        file_lon_indices = np.sort(lon_indices)
+        runs = np.split(file_lon_indices, np.nonzero(np.diff(file_lon_indices) > 1)[0] + 1)
+        lon_slices = [slice(_x[0], _x[-1] + 1) for _x in runs]
+        lon_indices = file_lon_indices.searchsorted(lon_indices)
+        lat_slice = _file_lat_slice(lat_slice, len(self.lat_data), self.lat_order)
+        logging.debug("reading corridor of %s x %s grid points.", len(lat_data), len(lon_data))
+
+        # The interpolation weights only depend on grid and path and are
+        # shared by all data fields.
+        weights = utils.vertsec_interpolation_weights(lat_data, lon_data, self.lats, self.lons)
+
+        level_slice = self._get_level_slice()
         for name, var in self.data_vars.items():
             if len(var.shape) == 4:
-                var_data = var[timestep, ::-self.vert_order, ::self.lat_order, :]
+                var_data = self._read_slab(name, var, (timestep, level_slice), lat_slice, lon_slices)
+                var_data = var_data[::-self.vert_order, ::self.lat_order, :]
             else:
-                var_data = var[:][timestep, np.newaxis, ::self.lat_order, :]
+                var_data = self._read_slab(name, var, (timestep,), lat_slice, lon_slices)
+                var_data = var_data[np.newaxis, ::self.lat_order, :]
             logging.debug("\tLoaded %.2f Mbytes from data field <%s> at timestep %s.",
                           var_data.nbytes / 1048576., name, timestep)
             logging.debug("\tVertical dimension direction is %s.",
@@ -460,13 +622,55 @@ class VerticalSectionDriver(MSSPlotDriver):
             logging.debug("\tInterpolating to cross-section path.")
             # Re-arange longitude dimension in the data field.
             var_data = var_data[:, :, lon_indices]
-            data[name] = utils.interpolate_vertsec(var_data, self.lat_data, lon_data,
-                                                   self.lats, self.lons)
+            curtain = utils.interpolate_vertsec(var_data, lat_data, lon_data,
+                                                self.lats, self.lons, weights=weights)
+            if len(var.shape) == 4 and level_slice != slice(None):
+                # Mask the levels that have not been read.
+                num_levels = len(self.vert_data)
+                curtain_slice = level_slice
+                if self.vert_order == 1:
+                    curtain_slice = slice(num_levels - level_slice.stop, num_levels - level_slice.start)
+                full_curtain = np.full((num_levels, curtain.shape[1]), np.nan)
+                full_curtain[curtain_slice] = curtain.filled(np.nan)
+                curtain = np.ma.masked_invalid(full_curtain)
+            data[name] = curtain
             # Free memory.
             del var_data
 
+        self._set_data_keys(self.vsec_path, self.vsec_numpoints, self.vsec_path_connection)
         return data
 
+    def _get_window(self, lon_data):
+        """Determine the part of the lat/lon grid required to interpolate the
+           data to the path, i.e. the grid cells containing the path points plus
+           one additional grid cell in each direction.
+
+        <lon_data> are the shifted and sorted longitudes of the data. Returns
+        slices of the latitude indices (in increasing order) and of the indices
+        of <lon_data>.
+        """
+        lat_slice = slice(max(self.lat_data.searchsorted(self.lats.min(), side="right") - 2, 0),
+                          min(self.lat_data.searchsorted(self.lats.max(), side="left") + 2, len(self.lat_data)))
+        lon_slice = slice(max(lon_data.searchsorted(self.lons.min(), side="right") - 2, 0),
+                          min(lon_data.searchsorted(self.lons.max(), side="left") + 2, len(lon_data)))
+        return lat_slice, lon_slice
+
+    def _get_level_slice(self):
+        """Determine the pressure levels (in file order) covering the pressure
+           range of the BBOX plus one level above and below, if the vertical
+           range shall be restricted. Otherwise, all levels are returned.
+        """
+        if not self.restrict_vertical_range or self.vert_type != "pl" or self.bbox is None or \
+                self.vert_data is None or len(self.vert_data) < 2:
+            return slice(None)
+        pressures = utils.convert_to(np.asarray(self.vert_data, dtype=float), self.vert_units, "hPa",
+                                     default=np.nan)
+        p_bot, p_top = self.bbox[1], self.bbox[3]
+        indices = np.nonzero((pressures >= min(p_bot, p_top)) & (pressures <= max(p_bot, p_top)))[0]
+        if len(indices) == 0:
+            return slice(None)
+        return slice(max(indices.min() - 1, 0), min(indices.max() + 2, len(pressures)))
+
     def shift_data(self):
         """Shift the data fields such that the longitudes are in the range
         left_longitude .. left_longitude+360, where left_longitude is the
@@ -545,24 +749,33 @@ class HorizontalSectionDriver(MSSPlotDriver):
 
     def set_plot_parameters(self, plot_object=None, bbox=None, level=None, crs=None, init_time=None, valid_time=None,
                             style=None, figsize=(800, 600), noframe=False, show=False, transparent=False,
-                            return_format="image/png"):
+                            return_format="image/png", crop_margin=None, overlays=None):
         """
+        overlays -- list of (plot object, style) drawn on top of plot_object
+                    into the same map; their data fields are loaded together.
         """
+        overlays = list(overlays or [])
+        # the opened dataset may lack the data fields of other overlays
+        require_reload = [_x[0] for _x in overlays] != [_x[0] for _x in getattr(self, "overlays", [])]
+        self.overlays = overlays
         MSSPlotDriver.set_plot_parameters(self, plot_object,
                                           init_time=init_time,
                                           valid_time=valid_time,
                                           style=style,
                                           bbox=bbox,
                                           figsize=figsize, noframe=noframe,
+                                          require_reload=require_reload,
                                           transparent=transparent,
                                           return_format=return_format)
         self.level = level
         self.actual_level = None
         self.crs = crs
         self.show = show
+        self.crop_margin = crop_margin
 
     def update_plot_parameters(self, plot_object=None, bbox=None, level=None, crs=None, init_time=None, valid_time=None,
-                               style=None, figsize=None, noframe=None, show=None, transparent=None, return_format=None):
+                               style=None, figsize=None, noframe=None, show=None, transparent=None, return_format=None,
+                               crop_margin=None, overlays=None):
         """
         """
         plot_object = plot_object if plot_object is not None else self.plot_object
@@ -577,14 +790,89 @@ class HorizontalSectionDriver(MSSPlotDriver):
         show = show if show is not None else self.show
         transparent = transparent if transparent is not None else self.transparent
         return_format = return_format if return_format is not None else self.return_format
+        crop_margin = crop_margin if crop_margin is not None else self.crop_margin
+        overlays = overlays if overlays is not None else self.overlays
         self.set_plot_parameters(plot_object=plot_object, bbox=bbox, level=level, crs=crs, init_time=init_time,
                                  valid_time=valid_time, style=style, figsize=figsize, noframe=noframe, show=show,
-                                 transparent=transparent, return_format=return_format)
-
-    def _load_timestep(self):
+                                 transparent=transparent, return_format=return_format, crop_margin=crop_margin,
+                                 overlays=overlays)
+
+    def _required_datafields(self):
+        """Returns the data fields of the plot object and its overlays,
+        each one only once.
+        """
+        fields = list(self.plot_object.required_datafields)
+        for overlay, _ in self.overlays:
+            for field in overlay.required_datafields:
+                if field[:2] not in [_x[:2] for _x in fields]:
+                    fields.append(field)
+        return fields
+
+    def _get_window(self):
+        """Determine the part of the lat/lon grid that covers the requested
+           BBOX, so that only this part needs to be read from the data files.
+
+        The window is extended by a halo of 10% of the BBOX plus two grid
+        cells in each direction, matching the domain that is not masked by
+        the style's mask_data(). Windows are only computed for cylindrical
+        lat/lon projections, for which the BBOX directly limits the grid.
+
+        Returns a slice of latitude indices (in increasing latitude order) and
+        a list of slices of longitude indices (in file order), or None, if the
+        full grid needs to be read.
+        """
+        if len(self.lat_data) < 2 or len(self.lon_data) < 2 or self.bbox is None:
+            return None
+        if self.crs is None:
+            proj_params, bbox_units = {"projection": "cyl"}, "degree"
+        else:
+            proj_params, bbox_units = [utils.get_projection_params(self.crs)[_x] for _x in ("basemap", "bbox")]
+        if bbox_units != "degree" or not (proj_params.get("projection") in ("cyl", "merc") or
+                                          proj_params.get("epsg") in ("4258", "4326")):
+            return None
+        lon0, lat0, lon1, lat1 = self.bbox
+        if lon1 <= lon0 or lat1 <= lat0:
+            return None
+
+        dlat = np.median(np.abs(np.diff(self.lat_data)))
+        halo = 0.1 * (lat1 - lat0) + 2 * dlat
+        lat_slice = slice(self.lat_data.searchsorted(lat0 - halo, side="left"),
+                          self.lat_data.searchsorted(lat1 + halo, side="right"))
+        if lat_slice.stop - lat_slice.start < 2:
+            return None
+
+        # Longitudes are stored in -180..180 (see get_latlon_data). Windows
+        # crossing the dateline read all longitudes, as some styles sort the
+        # longitudes into this range again and would otherwise get a gap.
+        dlon = np.median(np.abs(((np.diff(self.lon_data) + 180) % 360) - 180))
+        halo = 0.1 * (lon1 - lon0) + 2 * dlon
+        lon0, lon1 = lon0 - halo, lon1 + halo
+        if lon1 - lon0 >= 360 or np.floor((lon0 + 180) / 360) != np.floor((lon1 + 180) / 360):
+            lon_slices = [slice(None)]
+        else:
+            shift = 360 * np.floor((lon0 + 180) / 360)
+            indices = np.nonzero((self.lon_data >= lon0 - shift) & (self.lon_data <= lon1 - shift))[0]
+            if len(indices) < 2:
+                return None
+            # data stored in 0..360 may yield two runs split at 0 degree.
+            runs = np.split(indices, np.nonzero(np.diff(indices) > 1)[0] + 1)
+            lon_slices = [slice(_x[0], _x[-1] + 1) for _x in runs]
+            if len(indices) == len(self.lon_data):
+                lon_slices = [slice(None)]
+
+        if lat_slice.stop - lat_slice.start == len(self.lat_data) and lon_slices == [slice(None)]:
+            return None
+        return lat_slice, lon_slices
+
+    def _load_timestep(self, window=None):
         """Load the data fields as required by the horizontal section style
            instance at the current timestep.
+
+        If <window> (as returned by _get_window()) is given, only the
+        corresponding part of the lat/lon grid is read.
         """
+        self.data_keys = {}
+        self.data_indices = {}
         if self.dataset is None:
             return {}
         data = {}
@@ -598,21 +886,41 @@ class HorizontalSectionDriver(MSSPlotDriver):
             self.actual_level = self.vert_data[level]
         logging.debug("loading data for time step %s (%s), level index %s (level %s)",
                       timestep, self.fc_time, level, self.actual_level)
+        lat_slice, lon_slices = slice(None), [slice(None)]
+        if window is not None:
+            lat_slice = _file_lat_slice(window[0], len(self.lat_data), self.lat_order)
+            lon_slices = window[1]
         for name, var in self.data_vars.items():
             if level is None or len(var.shape) == 3:
                 # 2D fields: time, lat, lon.
-                var_data = var[timestep, ::self.lat_order, :]
+                index = (timestep,)
             else:
                 # 3D fields: time, level, lat, lon.
-                var_data = var[timestep, level, ::self.lat_order, :]
+                index = (timestep, level)
+            self.data_indices[name] = tuple(int(_x) for _x in index)
+            var_data = self._read_slab(name, var, index, lat_slice, lon_slices)[::self.lat_order, :]
             logging.debug("\tLoaded %.2f Mbytes from data field <%s>.",
                           var_data.nbytes / 1048576., name)
             data[name] = var_data
             # Free memory.
             del var_data
 
+        self._set_data_keys()
         return data
 
+    def get_field_statistics(self, name):
+        """Returns the statistics (see mslib.mswms.utils.field_statistics())
+           of the complete data field <name> at the time step and level loaded
+           last, as precomputed by the data access object when the data file
+           was added, or None if they are not available.
+        """
+        filename = self.data_files.get(name)
+        mtime = self.data_file_mtimes.get(filename)
+        index = getattr(self, "data_indices", {}).get(name)
+        if mtime is None or index is None:
+            return None
+        return self.data_access.get_field_statistics(filename, mtime, name, index)
+
     def plot(self):
         """
         """
@@ -622,21 +930,27 @@ class HorizontalSectionDriver(MSSPlotDriver):
         # section style instance. <data> is a dictionary containing the
         # horizontal sections of the variables identified through CF
         # standard names as specified by <self.hsec_style_instance>.
-        data = self._load_timestep()
+        window = self._get_window()
+        data = self._load_timestep(window)
+        lat_data, lon_data = self.lat_data, self.lon_data
+        if window is not None:
+            lat_data = lat_data[window[0]]
+            lon_data = np.concatenate([lon_data[_x] for _x in window[1]])
+            logging.debug("Reading window of %s x %s grid points.", len(lat_data), len(lon_data))
 
         d2 = datetime.now()
         logging.debug("Loaded data (required time %s).", (d2 - d1))
         logging.debug("Plotting horizontal section.")
 
-        if len(self.lat_data) > 1:
-            resolution = (self.lat_data[1] - self.lat_data[0])
+        if len(lat_data) > 1:
+            resolution = (lat_data[1] - lat_data[0])
         else:
             resolution = 0
 
         # Call the plotting method of the horizontal section style instance.
         image = self.plot_object.plot_hsection(data,
-                                               self.lat_data,
-                                               self.lon_data,
+                                               lat_data,
+                                               lon_data,
                                                self.bbox,
                                                level=self.actual_level,
                                                valid_time=self.fc_time,
@@ -647,7 +961,10 @@ class HorizontalSectionDriver(MSSPlotDriver):
                                                style=self.style,
                                                noframe=self.noframe,
                                                figsize=self.figsize,
-                                               transparent=self.transparent)
+                                               transparent=self.transparent,
+                                               crop_margin=self.crop_margin,
+                                               overlays=self.overlays,
+                                               return_format=self.return_format)
         # Free memory.
         del data
 
@@ -32,7 +32,9 @@ import sys
 from mslib import __version__
 from mslib.mswms.wms import mss_wms_settings
 from mslib.mswms.wms import app as application
-from mslib.utils import setup_logging
+from mslib.mswms.wms import server
+from mslib.mswms.seed import Seeder
+from mslib.utils import parse_iso_datetime, setup_logging
 
 
 def main():
@@ -45,6 +47,15 @@ def main():
     parser.add_argument("--debug", help="show debugging log messages on console", action="store_true", default=False)
     parser.add_argument("--logfile", help="If set to a name log output goes to that file", dest="logfile",
                         default=None)
+    subparsers = parser.add_subparsers(dest="command")
+    seed_parser = subparsers.add_parser(
+        "seed", help="pre-render the images of a forecast run into the image cache and exit")
+    seed_parser.add_argument("--init-time", help="forecast run to seed, e.g. 2012-10-17T12:00:00Z (default: latest)",
+                             dest="init_time", default=None)
+    seed_parser.add_argument("--layers", help="comma separated dataset.layer names (default: all)", default=None)
+    seed_parser.add_argument("--styles", help="comma separated style names (default: all)", default=None)
+    seed_parser.add_argument("--levels", help="comma separated elevations (default: all)", default=None)
+    seed_parser.add_argument("--workers", help="number of frames rendered concurrently", type=int, default=None)
     args = parser.parse_args()
 
     if args.version:
@@ -59,8 +70,30 @@ def main():
 
     logging.info("Configuration File: '%s'", mss_wms_settings.__file__)
 
+    if args.command == "seed":
+        total, failed = seed(args)
+        sys.exit(1 if failed else 0)
+
     application.run(args.host, args.port)
 
 
+def seed(args):
+    """Seeds the image cache as specified by the command line arguments and
+    the seed_* settings of mss_wms_settings.
+    """
+    def split(value):
+        return value.split(",") if value is not None else None
+
+    seeder = Seeder(
+        server,
+        init_time=parse_iso_datetime(args.init_time) if args.init_time is not None else None,
+        layers=split(args.layers), styles=split(args.styles),
+        levels=[float(_x) for _x in split(args.levels)] if args.levels is not None else None,
+        hsec_sections=getattr(mss_wms_settings, "seed_hsec_sections", []),
+        vsec_paths=getattr(mss_wms_settings, "seed_vsec_paths", []),
+        workers=args.workers if args.workers is not None else max(1, getattr(mss_wms_settings, "render_processes", 0)))
+    return seeder.run()
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms.renderpool
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Pool of worker processes rendering WMS requests in parallel.
+
+    Each worker process imports the WMS server module and thereby owns its own
+    plot drivers and open datasets. The pool only passes the already validated
+    request parameters to the workers and receives the produced images.
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import concurrent.futures
+import concurrent.futures.process
+import logging
+import multiprocessing
+import threading
+
+
+class RenderPoolBusy(Exception):
+    """Raised if a request cannot be queued as too many requests are pending.
+    """
+    pass
+
+
+class RenderPool(object):
+    """Dispatches calls of a (module level) render function to a pool of
+    worker processes.
+
+    processes -- number of worker processes
+    timeout -- seconds to wait for a result before giving up (None waits forever)
+    queue_size -- number of requests that may wait for a free worker in addition
+                  to the ones being processed (None does not limit the queue)
+    start_method -- multiprocessing start method for the worker processes
+    """
+
+    def __init__(self, function, processes, timeout=None, queue_size=None, start_method="spawn"):
+        self._function = function
+        self._processes = processes
+        self._timeout = timeout
+        self._context = multiprocessing.get_context(start_method)
+        self._slots = None
+        if queue_size is not None:
+            self._slots = threading.BoundedSemaphore(processes + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                logging.info("starting %s render worker processes", self._processes)
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self._processes, mp_context=self._context)
+            return self._executor
+
+    def render(self, *args):
+        """Calls the render function with <args> in a worker process and
+        returns its result. Exceptions raised by the render function are
+        propagated to the caller.
+        """
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            raise RenderPoolBusy("too many pending requests")
+        executor = self._get_executor()
+        try:
+            future = executor.submit(self._function, *args)
+        except Exception:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+        if self._slots is not None:
+            # free the slot only once the worker is really done, also if the
+            # caller stops waiting due to the timeout.
+            future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self._timeout)
+        except concurrent.futures.process.BrokenProcessPool:
+            logging.error("render worker process died, restarting render pool")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
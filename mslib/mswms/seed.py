@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms.seed
+    ~~~~~~~~~~~~~~~~
+
+    Pre-renders the images of a forecast run into the image cache of the
+    WMS server, so that the first clients requesting them need not wait.
+
+    The frames seeded are all combinations of the registered layers, their
+    styles, the valid times of the requested forecast run, the elevations and
+    the sections configured by seed_hsec_sections (maps) and seed_vsec_paths
+    (vertical sections) in mss_wms_settings. Frames already in the image cache
+    are not rendered again, so that an interrupted seeding may be resumed by
+    simply starting it again.
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import concurrent.futures
+import logging
+import threading
+import time
+
+
+def format_time(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Seeder(object):
+    """Renders a matrix of frames for one forecast run through the
+    GetMap/GetVSec handler of <server>, storing them in its image cache.
+
+    init_time -- forecast run to seed (default: the latest one)
+    layers -- "dataset.layer" names to seed (default: all registered layers)
+    styles -- style names to seed (default: all styles of each layer)
+    valid_times -- valid times to seed (default: all of the forecast run)
+    levels -- elevations to seed (default: all of each layer)
+    hsec_sections -- list of dictionaries with the crs, bbox, width, height
+                     and optionally transparent and frame parameters of maps
+    vsec_paths -- list of dictionaries with the path ([[lat, lon], ...]),
+                  bbox, width, height and optionally transparent and frame
+                  parameters of vertical sections
+    workers -- number of frames requested concurrently
+    """
+
+    def __init__(self, server, init_time=None, layers=None, styles=None, valid_times=None, levels=None,
+                 hsec_sections=(), vsec_paths=(), workers=1, report_interval=10):
+        self.server = server
+        self.layers = layers
+        self.styles = styles
+        self.valid_times = valid_times
+        self.levels = levels
+        self.hsec_sections = list(hsec_sections)
+        self.vsec_paths = list(vsec_paths)
+        self.workers = workers
+        self.report_interval = report_interval
+        self.init_time = init_time if init_time is not None else self._latest_init_time()
+        self._lock = threading.Lock()
+        self.done = 0
+        self.failed = 0
+
+    def _registered_layers(self):
+        for mode, registry in (("getmap", self.server.hsec_layer_registry),
+                               ("getvsec", self.server.vsec_layer_registry)):
+            for dataset in sorted(registry):
+                for name, layer in sorted(registry[dataset].items()):
+                    if self.layers is None or "{}.{}".format(dataset, name) in self.layers:
+                        yield mode, dataset, layer
+
+    def _latest_init_time(self):
+        init_times = set()
+        for _, _, layer in self._registered_layers():
+            init_times.update(layer.get_init_times())
+        if not init_times:
+            raise ValueError("no forecast runs available")
+        return max(init_times)
+
+    def _layer_valid_times(self, layer):
+        """Returns the valid times available for all data fields of <layer>.
+        """
+        if not layer.uses_validtime_dimension():
+            return [None]
+        valid_times = None
+        for vartype, variable, _ in layer.required_datafields:
+            times = set(layer.driver.get_valid_times(variable, vartype, self.init_time))
+            valid_times = times if valid_times is None else valid_times & times
+        valid_times = sorted(valid_times or [])
+        if self.valid_times is not None:
+            valid_times = [_x for _x in valid_times if _x in self.valid_times]
+        return valid_times
+
+    def _layer_styles(self, layer):
+        if isinstance(layer.styles, list):
+            styles = [_x[0] for _x in layer.styles]
+        else:
+            styles = ["default"]
+        if self.styles is not None:
+            styles = [_x for _x in styles if _x in self.styles]
+        return styles
+
+    def _layer_levels(self, mode, layer):
+        if mode == "getvsec" or not layer.uses_elevation_dimension():
+            return [None]
+        levels = layer.get_elevations()
+        if self.levels is not None:
+            levels = [_x for _x in levels if float(_x) in [float(_y) for _y in self.levels]]
+        return levels
+
+    def frames(self):
+        """Yields the (mode, query) of all frames to be seeded. Frames using
+        the same data files follow each other, so that the opened files are
+        reused.
+        """
+        for mode, dataset, layer in self._registered_layers():
+            if layer.uses_inittime_dimension() and self.init_time not in layer.get_init_times():
+                continue
+            sections = self.hsec_sections if mode == "getmap" else self.vsec_paths
+            for valid_time in self._layer_valid_times(layer):
+                for level in self._layer_levels(mode, layer):
+                    for style in self._layer_styles(layer):
+                        for section in sections:
+                            query = {
+                                "LAYERS": "{}.{}".format(dataset, layer.name),
+                                "STYLES": style,
+                                "BBOX": ",".join(str(_x) for _x in section["bbox"]),
+                                "WIDTH": str(section.get("width", 900)),
+                                "HEIGHT": str(section.get("height", 600)),
+                                "FORMAT": "image/png",
+                                "TRANSPARENT": "TRUE" if section.get("transparent", False) else "FALSE",
+                                "FRAME": "on" if section.get("frame", False) else "off",
+                            }
+                            if layer.uses_inittime_dimension():
+                                query["DIM_INIT_TIME"] = format_time(self.init_time)
+                            if valid_time is not None:
+                                query["TIME"] = format_time(valid_time)
+                            if mode == "getmap":
+                                query["SRS"] = section.get("crs", "EPSG:4326")
+                                if level is not None:
+                                    query["ELEVATION"] = level
+                            else:
+                                query["PATH"] = ",".join(
+                                    "{},{}".format(_lat, _lon) for _lat, _lon in section["path"])
+                            yield mode, query
+
+    def _seed_frame(self, mode, query):
+        try:
+            _, return_format = self.server.produce_plot(query, mode)
+            success = return_format == query["FORMAT"]
+        except Exception as ex:
+            logging.error("Seeding %s failed: %s %s", query, type(ex), ex)
+            success = False
+        if not success:
+            logging.error("Could not seed %s %s", mode, query)
+        with self._lock:
+            self.done += 1
+            if not success:
+                self.failed += 1
+
+    def run(self):
+        """Seeds all frames and returns the number of frames and the number
+        of frames that could not be produced.
+        """
+        if self.server.image_cache is None:
+            raise RuntimeError("seeding requires the image cache to be enabled (image_cache_use)")
+        frames = list(self.frames())
+        logging.info("seeding %s frames of forecast run %s with %s workers",
+                     len(frames), self.init_time, self.workers)
+        hits = self.server.image_cache.hits
+        start = last_report = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._seed_frame, _mode, _query) for _mode, _query in frames]
+            for _ in concurrent.futures.as_completed(futures):
+                if time.time() - last_report >= self.report_interval:
+                    last_report = time.time()
+                    self._report(len(frames), start)
+        self._report(len(frames), start)
+        logging.info("%s frames were already cached", self.server.image_cache.hits - hits)
+        return len(frames), self.failed
+
+    def _report(self, total, start):
+        elapsed = time.time() - start
+        logging.info("seeded %s/%s frames (%s failed) in %.1f s, %.2f frames/s",
+                     self.done, total, self.failed, elapsed, self.done / elapsed if elapsed > 0 else 0)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms.tiles
+    ~~~~~~~~~~~~~~~~~
+
+    Fixed tile grids for serving maps as tiles.
+
+    Tiles are addressed by the tile matrix set, the zoom level z and the column
+    x and row y counted from the upper left corner (as for XYZ/WMTS). Tiles are
+    rendered in blocks of meta tiles, which are then cut into single tiles.
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import collections
+import io
+
+import PIL.Image
+
+
+TileMatrixSet = collections.namedtuple("TileMatrixSet", ["crs", "extent", "matrix_width", "matrix_height"])
+
+# extent is (left, bottom, right, top) in units of the crs; matrix_width and
+# matrix_height give the number of tiles at zoom level 0.
+TILE_MATRIX_SETS = {
+    "epsg:4326": TileMatrixSet("epsg:4326", (-180., -90., 180., 90.), 2, 1),
+    "epsg:3857": TileMatrixSet(
+        "epsg:3857", (-20037508.342789244, -20037508.342789244, 20037508.342789244, 20037508.342789244), 1, 1),
+}
+TILE_MATRIX_SETS["worldcrs84quad"] = TILE_MATRIX_SETS["epsg:4326"]
+TILE_MATRIX_SETS["webmercatorquad"] = TILE_MATRIX_SETS["epsg:3857"]
+
+
+def get_tile_matrix_set(name):
+    """Returns the TileMatrixSet called <name> (case insensitive).
+    """
+    try:
+        return TILE_MATRIX_SETS[name.lower()]
+    except KeyError:
+        raise ValueError("unknown tile matrix set '{}'".format(name))
+
+
+def matrix_size(tms, z):
+    """Returns the number of tile columns and rows at zoom level <z>.
+    """
+    return tms.matrix_width * 2 ** z, tms.matrix_height * 2 ** z
+
+
+def check_tile(tms, z, x, y, max_zoom=None):
+    """Raises ValueError if the tile does not exist.
+    """
+    width, height = matrix_size(tms, z)
+    if z < 0 or (max_zoom is not None and z > max_zoom) or not (0 <= x < width and 0 <= y < height):
+        raise ValueError("tile {}/{}/{} does not exist".format(z, x, y))
+
+
+def block_bbox(tms, z, x0, y0, nx, ny):
+    """Returns the bbox of the block of nx times ny tiles with the upper left
+    tile x0, y0 at zoom level z.
+    """
+    width, height = matrix_size(tms, z)
+    left, bottom, right, top = tms.extent
+    dx, dy = (right - left) / width, (top - bottom) / height
+    return [left + x0 * dx, top - (y0 + ny) * dy, left + (x0 + nx) * dx, top - y0 * dy]
+
+
+def buffered_block(tms, z, x0, y0, nx, ny, tile_size, buffer):
+    """Returns the bbox of the block of nx times ny tiles extended by <buffer>
+    pixels on each side (but not beyond the extent of the tile matrix set)
+    and the margin (left, top, right, bottom) in pixels added to the block.
+    """
+    width, height = matrix_size(tms, z)
+    margin = (min(buffer, x0 * tile_size), min(buffer, y0 * tile_size),
+              min(buffer, (width - x0 - nx) * tile_size), min(buffer, (height - y0 - ny) * tile_size))
+    left, bottom, right, top = block_bbox(tms, z, x0, y0, nx, ny)
+    dx, dy = (right - left) / (nx * tile_size), (top - bottom) / (ny * tile_size)
+    bbox = [left - margin[0] * dx, bottom - margin[3] * dy, right + margin[2] * dx, top + margin[1] * dy]
+    return bbox, margin
+
+
+def tile_bbox(tms, z, x, y):
+    """Returns the bbox of a single tile.
+    """
+    return block_bbox(tms, z, x, y, 1, 1)
+
+
+def meta_tile(tms, z, x, y, size):
+    """Returns the upper left tile and the number of tile columns and rows of
+    the meta tile of (at most) size times size tiles containing tile x, y.
+    """
+    width, height = matrix_size(tms, z)
+    x0, y0 = (x // size) * size, (y // size) * size
+    return x0, y0, min(size, width - x0), min(size, height - y0)
+
+
+def split_image(image, nx, ny, tile_size, offset=(0, 0)):
+    """Cuts the PNG <image> into nx times ny tiles of tile_size pixels,
+    starting <offset> pixels from the upper left corner. Returns a dictionary
+    mapping the tile column and row within the block to the PNG tiles.
+    """
+    img = PIL.Image.open(io.BytesIO(image))
+    img.load()
+    save_args = {}
+    if "transparency" in img.info:
+        save_args["transparency"] = img.info["transparency"]
+    tiles = {}
+    for i in range(nx):
+        for j in range(ny):
+            left, upper = offset[0] + i * tile_size, offset[1] + j * tile_size
+            output = io.BytesIO()
+            img.crop((left, upper, left + tile_size, upper + tile_size)).save(output, format="PNG", **save_args)
+            tiles[(i, j)] = output.getvalue()
+    return tiles
@@ -27,10 +27,13 @@
 
 import numpy as np
 import matplotlib
+import matplotlib.cm
+import matplotlib.colors
 import pint
 
 UR = pint.UnitRegistry()
 N_LEVELS = 16
+STATISTICS_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
 
 
 class Targets(object):
@@ -293,15 +296,70 @@ def get_log_levels(cmin, cmax, levels=N_LEVELS):
     return clev
 
 
-def get_style_parameters(dataname, style, cmin, cmax, data):
+def field_statistics(data):
+    """
+    Computes the statistics of a data field.
+
+    Args:
+        data: (masked) array of the data field
+
+    Returns:
+        dictionary of minimum ("min") and maximum ("max") value (None if there
+        are no valid values), the percentiles STATISTICS_PERCENTILES
+        ("percentiles") and the fraction of masked or NaN values ("nan_fraction")
+    """
+    data = np.ma.masked_invalid(data)
+    values = data.compressed()
+    statistics = {"min": None, "max": None, "percentiles": {},
+                  "nan_fraction": 1. - values.size / data.size if data.size > 0 else 1.}
+    if values.size > 0:
+        statistics["min"], statistics["max"] = float(values.min()), float(values.max())
+        statistics["percentiles"] = dict(zip(
+            STATISTICS_PERCENTILES, np.percentile(values, STATISTICS_PERCENTILES).tolist()))
+    return statistics
+
+
+def transform_statistics(statistics, function):
+    """
+    Transforms the statistics of a data field.
+
+    Args:
+        statistics: statistics as returned by field_statistics
+        function: monotonic function applied to the data field, e.g. a unit conversion
+
+    Returns:
+        statistics of the transformed data field
+    """
+    if statistics["min"] is None:
+        return statistics
+    cmin, cmax = function(statistics["min"]), function(statistics["max"])
+    percentiles = dict((_p, function(_v)) for _p, _v in statistics["percentiles"].items())
+    if cmin > cmax:
+        cmin, cmax = cmax, cmin
+        percentiles = dict((100 - _p, _v) for _p, _v in percentiles.items())
+    return dict(statistics, min=cmin, max=cmax, percentiles=percentiles)
+
+
+def _get_data_range(data, statistics):
+    """
+    Returns minimum and maximum of data, taken from statistics (see field_statistics) if given.
+    """
+    if statistics is None:
+        return data.min(), data.max()
+    if statistics["min"] is None:
+        return np.ma.masked, np.ma.masked
+    return statistics["min"], statistics["max"]
+
+
+def get_style_parameters(dataname, style, cmin, cmax, data, statistics=None):
     if cmin is None or cmax is None:
         try:
-            cmin, cmax = data.min(), data.max()
+            cmin, cmax = _get_data_range(data, statistics)
         except ValueError:
             cmin, cmax = 0, 1
         if 0 < cmin < 0.05 * cmax:
             cmin = 0.
-    cmap = matplotlib.pyplot.cm.rainbow
+    cmap = matplotlib.cm.rainbow
     ticks = None
 
     if any(isinstance(_x, np.ma.core.MaskedConstant) for _x in (cmin, cmax)):
@@ -311,8 +369,7 @@ def get_style_parameters(dataname, style, cmin, cmax, data):
         clev = np.linspace(cmin, cmax, 16)
         norm = matplotlib.colors.BoundaryNorm(clev, cmap.N)
     elif style == "auto":
-        cmin_p = data.min()
-        cmax_p = data.max()
+        cmin_p, cmax_p = _get_data_range(data, statistics)
         if not any([isinstance(_x, np.ma.core.MaskedConstant) for _x in (cmin_p, cmax_p)]):
             cmin, cmax = cmin_p, cmax_p
         if cmin == cmax:
@@ -325,8 +382,7 @@ def get_style_parameters(dataname, style, cmin, cmax, data):
         clev = get_log_levels(cmin, cmax, 16)
         norm = matplotlib.colors.BoundaryNorm(clev, cmap.N)
     elif style == "autolog":
-        cmin_p = data.min()
-        cmax_p = data.max()
+        cmin_p, cmax_p = _get_data_range(data, statistics)
         if not any([isinstance(_x, np.ma.core.MaskedConstant) for _x in (cmin_p, cmax_p)]):
             cmin, cmax = cmin_p, cmax_p
         if cmin == cmax:
@@ -356,10 +412,10 @@ def get_style_parameters(dataname, style, cmin, cmax, data):
             (0.40000000000000002, 0.0, 0.25, 1.0)]
         clev = list(np.arange(0, 4, 0.5)) + list(range(4, 8)) + list(range(8, 18, 2))
         if style[-2:] == "nh":
-            cmap = matplotlib.pyplot.cm.colors.ListedColormap(colors, name="pv_map")
+            cmap = matplotlib.colors.ListedColormap(colors, name="pv_map")
             cmap.set_over((0.8, 0.8, 0.8, 1.0))
         else:
-            cmap = matplotlib.pyplot.cm.colors.ListedColormap(colors[::-1], name="pv_map")
+            cmap = matplotlib.colors.ListedColormap(colors[::-1], name="pv_map")
             cmap.set_under((0.8, 0.8, 0.8, 1.0))
             clev = [-_x for _x in clev[::-1]]
         norm = matplotlib.colors.BoundaryNorm(clev, cmap.N)
@@ -383,18 +439,18 @@ def get_style_parameters(dataname, style, cmin, cmax, data):
             (0.40000000000000002, 0.0, 0.25, 1.0)]
         clev = np.arange(5, 86, 5)
         if style[-2:] == "nh":
-            cmap = matplotlib.pyplot.cm.colors.ListedColormap(colors)
+            cmap = matplotlib.colors.ListedColormap(colors)
         else:
-            cmap = matplotlib.pyplot.cm.colors.ListedColormap(colors[::-1])
+            cmap = matplotlib.colors.ListedColormap(colors[::-1])
             clev = [-_x for _x in clev[::-1]]
         norm = matplotlib.colors.BoundaryNorm(clev, cmap.N)
     elif style == "gravity_wave_temperature_perturbation":
-        cmap = matplotlib.pyplot.cm.Spectral_r
+        cmap = matplotlib.cm.Spectral_r
         clev = [-3, -2.5, -2, -1.5, -1, -0.5, 0.5, 1, 1.5, 2, 2.5, 3]
         norm = matplotlib.colors.BoundaryNorm(clev, cmap.N)
         ticks = -3, -2, -1, 1, 2, 3
     elif style == "square_of_brunt_vaisala_frequency_in_air":
-        cmap = matplotlib.pyplot.cm.colors.ListedColormap(
+        cmap = matplotlib.colors.ListedColormap(
             [(1.0, 0.55000000000000004, 1.0, 1.0),
              (0.82333333333333336, 0.40000000000000002, 1.0, 1.0),
              (0.64666666666666672, 0.25, 1.0, 1.0),
@@ -416,11 +472,11 @@ def get_style_parameters(dataname, style, cmin, cmax, data):
         clev = np.arange(0., 8.5 / 1e4, 0.5 / 1e4)
         norm = matplotlib.colors.BoundaryNorm(clev, cmap.N)
     elif style == "tropopause_altitude":
-        cmap = matplotlib.pyplot.cm.terrain
+        cmap = matplotlib.cm.terrain
         norm = None
         clev = np.arange(5, 18.1, 0.25)
     elif style == "log_ice_cloud":
-        cmap = matplotlib.pyplot.cm.colors.ListedColormap(
+        cmap = matplotlib.colors.ListedColormap(
             [(0.8, 0.8, 0.8, 1.0),
              (1., 1., 1.0, 1.0),
              (0., 0., 1.0, 1.0),
@@ -440,7 +496,7 @@ def get_style_parameters(dataname, style, cmin, cmax, data):
             ticks = np.append(np.array([0.]), get_log_levels(1e-3, 1e3, 7))
         norm = matplotlib.colors.BoundaryNorm(clev, cmap.N)
     elif style == "ice_cloud":
-        cmap = matplotlib.pyplot.cm.colors.ListedColormap(
+        cmap = matplotlib.colors.ListedColormap(
             [(1., 1., 1.0, 1.0),
              (0., 0., 1.0, 1.0),
              (0., 0.949, 0.988, 1.0),
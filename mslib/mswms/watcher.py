@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.mswms.watcher
+    ~~~~~~~~~~~~~~~~~~~
+
+    Watches data directories for new, modified and removed files.
+
+    On Linux, changes are reported by inotify; elsewhere, or if inotify cannot
+    be used, the directories are polled.
+
+    This file is part of mss.
+
+    :copyright: Copyright 2020 by the mss team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+
+class _InotifyBackend(object):
+    """Reports changed files of a directory by means of inotify.
+    """
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO | self.IN_DELETE
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, "inotify_add_watch failed for '{}'".format(path))
+        self.overflow = False
+
+    def read(self, timeout):
+        """Returns the list of (filename, removed) events occurring within
+        <timeout> seconds.
+        """
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return []
+        buf = os.read(self._fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset < len(buf):
+            _, mask, _, length = self._EVENT.unpack_from(buf, offset)
+            offset += self._EVENT.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                self.overflow = True
+            elif not mask & self.IN_ISDIR:
+                events.append((name, bool(mask & (self.IN_MOVED_FROM | self.IN_DELETE))))
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingBackend(object):
+    """Reports changed files of a directory by comparing the modification
+    times and sizes of its files every <interval> seconds.
+    """
+
+    def __init__(self, path, interval):
+        self._path = path
+        self._interval = interval
+        self._snapshot = self._scan()
+        self._next_poll = time.time() + interval
+        self.overflow = False
+
+    def _scan(self):
+        snapshot = {}
+        try:
+            for entry in os.scandir(self._path):
+                if entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        except OSError as ex:
+            logging.error("Could not scan data directory '%s': %s %s", self._path, type(ex), ex)
+            return self._snapshot
+        return snapshot
+
+    def read(self, timeout):
+        time.sleep(max(0, min(timeout, self._next_poll - time.time())))
+        if time.time() < self._next_poll:
+            return []
+        self._next_poll = time.time() + self._interval
+        snapshot = self._scan()
+        events = [(_name, False) for _name, _value in snapshot.items() if self._snapshot.get(_name) != _value]
+        events.extend((_name, True) for _name in self._snapshot if _name not in snapshot)
+        self._snapshot = snapshot
+        return events
+
+    def close(self):
+        pass
+
+
+class DirectoryWatcher(object):
+    """Calls <callback>(modified, removed) in a background thread with the
+    names of the files in directory <path> that were created or modified and
+    that were removed, respectively.
+
+    Changes are collected until no further change occurred for <settle_time>
+    seconds (but at most for ten times as long), so that files written in
+    quick succession are reported together.
+    If the kernel dropped inotify events, callback(None, None) is called to
+    request a full rescan. Polling every <poll_interval> seconds is used if
+    inotify is not available or <use_inotify> is False.
+    """
+
+    def __init__(self, path, callback, poll_interval=10, settle_time=2, use_inotify=True):
+        self.path = path
+        self._callback = callback
+        self._settle_time = settle_time
+        self._backend = None
+        if use_inotify:
+            try:
+                self._backend = _InotifyBackend(path)
+                logging.info("watching '%s' with inotify", path)
+            except (OSError, AttributeError, TypeError) as ex:
+                logging.info("inotify not available for '%s' (%s: %s), polling instead", path, type(ex), ex)
+        if self._backend is None:
+            self._backend = _PollingBackend(path, poll_interval)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="watcher-{}".format(path), daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._backend.close()
+
+    def _run(self):
+        modified, removed = set(), set()
+        first_event = last_event = None
+        while not self._stop.is_set():
+            try:
+                events = self._backend.read(self._settle_time if last_event is not None else 1)
+            except OSError as ex:
+                logging.error("Watching '%s' failed: %s %s", self.path, type(ex), ex)
+                self._stop.wait(1)
+                continue
+            for name, is_removed in events:
+                if is_removed:
+                    modified.discard(name)
+                    removed.add(name)
+                else:
+                    removed.discard(name)
+                    modified.add(name)
+                last_event = time.time()
+                if first_event is None:
+                    first_event = last_event
+            if self._backend.overflow:
+                self._backend.overflow = False
+                modified, removed, first_event, last_event = set(), set(), None, None
+                self._notify(None, None)
+            elif last_event is not None and (time.time() - last_event >= self._settle_time or
+                                             time.time() - first_event >= 10 * self._settle_time):
+                self._notify(sorted(modified), sorted(removed))
+                modified, removed, first_event, last_event = set(), set(), None, None
+
+    def _notify(self, modified, removed):
+        try:
+            self._callback(modified, removed)
+        except Exception as ex:
+            logging.error("Processing changes of '%s' failed: %s %s", self.path, type(ex), ex)
@@ -45,8 +45,12 @@ from future import standard_library
 
 standard_library.install_aliases()
 
+import concurrent.futures
+import concurrent.futures.process
 import os
 import logging
+import multiprocessing
+import threading
 import traceback
 import urllib.parse
 from chameleon import PageTemplateLoader
@@ -123,7 +127,11 @@ if mss_wms_settings.__dict__.get('enable_basic_http_authentication', False):
             password = auth.password
         return authfunc(username, password)
 
-from mslib.mswms import mss_plot_driver
+from mslib.mswms import encoder, mss_plot_driver
+from mslib.mswms.cache import CapabilitiesCache, ImageCache, SharedArrayCache, SingleFlight
+from mslib.mswms.renderpool import RenderPool, RenderPoolBusy
+from mslib.mswms import tiles
+from mslib.mswms.watcher import DirectoryWatcher
 from mslib.utils import get_projection_params
 
 # Logging the Standard Output, which will be added to the Apache Log Files
@@ -145,8 +153,12 @@ class WMSServer(object):
         """
         data_access_dict = mss_wms_settings.data
 
+        self._inventory_fingerprints = {}
         for key in data_access_dict:
+            self._inventory_fingerprints[key] = data_access_dict[key].get_inventory_fingerprint()
             data_access_dict[key].setup()
+        for key, statistics in self._compute_statistics(data_access_dict).items():
+            data_access_dict[key].add_statistics(statistics)
 
         self.hsec_drivers = {}
         for key in data_access_dict:
@@ -156,7 +168,8 @@ class WMSServer(object):
         self.vsec_drivers = {}
         for key in data_access_dict:
             self.vsec_drivers[key] = mss_plot_driver.VerticalSectionDriver(
-                data_access_dict[key])
+                data_access_dict[key],
+                restrict_vertical_range=getattr(mss_wms_settings, "vsec_restrict_vertical_range", False))
 
         self.hsec_layer_registry = {}
         for layer, datasets in mss_wms_settings.register_horizontal_layers:
@@ -166,6 +179,120 @@ class WMSServer(object):
         for layer, datasets in mss_wms_settings.register_vertical_layers:
             self.register_vsec_layer(datasets, layer)
 
+        mss_plot_driver.DATASET_POOL.max_open_files = getattr(mss_wms_settings, "dataset_pool_max_open_files", 64)
+        mss_plot_driver.SLAB_CACHE.max_bytes = getattr(mss_wms_settings, "slab_cache_size", 128 * 1024 ** 2)
+        if getattr(mss_wms_settings, "slab_cache_shared_dir", None) is not None:
+            mss_plot_driver.SHARED_SLAB_CACHE = SharedArrayCache(
+                mss_wms_settings.slab_cache_shared_dir,
+                max_bytes=getattr(mss_wms_settings, "slab_cache_shared_size", 4 * 1024 ** 3))
+
+        self.image_cache = None
+        if getattr(mss_wms_settings, "image_cache_use", False):
+            self.image_cache = ImageCache(
+                memory_size=getattr(mss_wms_settings, "image_cache_memory_size", 128 * 1024 ** 2),
+                directory=getattr(mss_wms_settings, "image_cache_dir", None),
+                disk_size=getattr(mss_wms_settings, "image_cache_disk_size", 1024 ** 3),
+                max_age=getattr(mss_wms_settings, "image_cache_max_age", None))
+
+        # Tiles are always cached, as each meta tile rendered yields many tiles.
+        self.tile_cache = ImageCache(
+            memory_size=getattr(mss_wms_settings, "tile_cache_memory_size", 128 * 1024 ** 2),
+            directory=getattr(mss_wms_settings, "tile_cache_dir", None),
+            disk_size=getattr(mss_wms_settings, "tile_cache_disk_size", 1024 ** 3),
+            max_age=getattr(mss_wms_settings, "tile_cache_max_age", None))
+        self.tile_size = getattr(mss_wms_settings, "tile_size", 256)
+        self.tile_metatile_size = getattr(mss_wms_settings, "tile_metatile_size", 8)
+        self.tile_metatile_buffer = getattr(mss_wms_settings, "tile_metatile_buffer", 64)
+        self.tile_max_zoom = getattr(mss_wms_settings, "tile_max_zoom", 12)
+        # concurrent requests for tiles of the same meta tile wait for a single rendering
+        self._tile_locks = [threading.Lock() for _ in range(64)]
+
+        self.capabilities_cache = CapabilitiesCache(
+            self._build_capabilities_inventory, self._render_capabilities, self._get_inventory_fingerprint,
+            check_interval=getattr(mss_wms_settings, "capabilities_check_interval", 10))
+
+        # The plot drivers are modified by each request, so that only one
+        # request at a time may be rendered by this process. Optionally,
+        # requests are passed on to a pool of worker processes.
+        self._render_lock = threading.Lock()
+        self.render_pool = None
+        render_processes = getattr(mss_wms_settings, "render_processes", 0)
+        if render_processes:
+            self.render_pool = RenderPool(
+                _render_worker, render_processes,
+                timeout=getattr(mss_wms_settings, "render_timeout", None),
+                queue_size=getattr(mss_wms_settings, "render_queue_size", None))
+        # concurrent identical requests wait for a single rendering
+        self.single_flight = None
+        if getattr(mss_wms_settings, "render_coalesce", True):
+            self.single_flight = SingleFlight(timeout=getattr(
+                mss_wms_settings, "render_coalesce_timeout", getattr(mss_wms_settings, "render_timeout", None)))
+
+        self.watchers = []
+        if getattr(mss_wms_settings, "data_watcher_use", False):
+            self.start_watchers()
+
+    def start_watchers(self):
+        """Starts a watcher for each data directory, which keeps the file
+        trees of the data sets in this directory up to date.
+        """
+        directories = {}
+        for key, data_access in mss_wms_settings.data.items():
+            directories.setdefault(os.path.abspath(data_access.get_datapath()), []).append(key)
+        for directory, keys in sorted(directories.items()):
+            self.watchers.append(DirectoryWatcher(
+                directory, lambda modified, removed, keys=keys: self.update_data_files(keys, modified, removed),
+                poll_interval=getattr(mss_wms_settings, "data_watcher_poll_interval", 10),
+                settle_time=getattr(mss_wms_settings, "data_watcher_settle_time", 2)).start())
+
+    def update_data_files(self, keys, modified, removed):
+        """Updates the data sets <keys> with the <modified> and <removed>
+        files and invalidates the caches depending on them. If modified
+        is None, the data sets are set up anew.
+        """
+        data_access_dict = mss_wms_settings.data
+        logging.info("updating data sets %s: modified files %s, removed files %s", keys, modified, removed)
+        # reading the data fields takes long, so this is done before taking the lock
+        statistics = self._compute_statistics(keys, modified)
+        # do not modify the data access while a plot is being rendered
+        with self._render_lock:
+            for key in keys:
+                if modified is None:
+                    data_access_dict[key].setup()
+                else:
+                    data_access_dict[key].update_files(modified, removed)
+                data_access_dict[key].add_statistics(statistics.get(key, {}))
+                self._inventory_fingerprints[key] = data_access_dict[key].get_inventory_fingerprint()
+        self.capabilities_cache.invalidate()
+        for cache in (self.image_cache, self.tile_cache):
+            if cache is None:
+                continue
+            if modified is None:
+                cache.clear()
+            else:
+                filenames = set(modified) | set(removed)
+                cache.invalidate(
+                    lambda key: any(repr(os.path.join(data_access_dict[_x].get_datapath(), _y)) in key
+                                    for _x in keys for _y in filenames))
+        if modified is None:
+            mss_plot_driver.SLAB_CACHE.clear()
+            if mss_plot_driver.SHARED_SLAB_CACHE is not None:
+                mss_plot_driver.SHARED_SLAB_CACHE.clear()
+        else:
+            paths = set(os.path.join(data_access_dict[_x].get_datapath(), _y)
+                        for _x in keys for _y in set(modified) | set(removed))
+            mss_plot_driver.SLAB_CACHE.remove_if(lambda key, _: any(repr(_x) in key for _x in paths))
+
+    def _compute_statistics(self, keys, filenames=None):
+        """Computes the field statistics of the data files <filenames>
+        (default: all) of the data sets <keys>, to be added to the data sets
+        by add_statistics(). Render pool workers leave this to the main
+        process, which shares the statistics by the inventory, if given.
+        """
+        if multiprocessing.parent_process() is not None:
+            return {}
+        return {key: mss_wms_settings.data[key].compute_statistics(filenames) for key in keys}
+
     def register_hsec_layer(self, datasets, layer_class):
         """Register horizontal section layer in internal dict of layers.
 
@@ -231,16 +358,28 @@ class WMSServer(object):
         template = templates['service_exception.pt']
         return template(code=code, text=text).encode("utf-8"), "text/xml"
 
-    def get_capabilities(self, server_url=None):
-        # ToDo find a more elegant method to do the same
-        # Preferable we don't want a seperate data_access module to be configured
+    def _get_inventory_fingerprint(self):
+        """Returns the inventory fingerprints of all data sets.
+        """
+        return {key: data_access.get_inventory_fingerprint()
+                for key, data_access in mss_wms_settings.data.items()}
+
+    def _build_capabilities_inventory(self, fingerprints):
+        """Re-reads the data sets whose <fingerprints> (as returned by
+        _get_inventory_fingerprint()) changed and returns the horizontal and
+        vertical layers to be offered in the capabilities.
+        """
         data_access_dict = mss_wms_settings.data
 
         for key in data_access_dict:
-            data_access_dict[key].setup()
-
-        template = templates['get_capabilities.pt']
-        logging.debug("server-url '%s'", server_url)
+            fingerprint = fingerprints.get(key)
+            if fingerprint is None or fingerprint != self._inventory_fingerprints.get(key):
+                statistics = self._compute_statistics([key])
+                # do not modify the data access while a plot is being rendered
+                with self._render_lock:
+                    data_access_dict[key].setup()
+                    data_access_dict[key].add_statistics(statistics.get(key, {}))
+                self._inventory_fingerprints[key] = fingerprint
 
         # Horizontal Layers
         hsec_layers = []
@@ -266,8 +405,25 @@ class WMSServer(object):
                     continue
                 vsec_layers.append((dataset, layer))
 
+        return hsec_layers, vsec_layers
+
+    def get_capabilities(self, server_url=None):
+        return_data, return_format, _ = self.get_capabilities_document(server_url)
+        return return_data, return_format
+
+    def get_capabilities_document(self, server_url=None):
+        """Returns the (cached) capabilities document, its format and its entity tag.
+        """
+        logging.debug("server-url '%s'", server_url)
+        document, etag = self.capabilities_cache.get(server_url)
+        return document, "text/xml", etag
+
+    def _render_capabilities(self, inventory, server_url):
+        hsec_layers, vsec_layers = inventory
+        template = templates['get_capabilities.pt']
         settings = mss_wms_settings.__dict__
         return_data = template(hsec_layers=hsec_layers, vsec_layers=vsec_layers, server_url=server_url,
+                               image_formats=encoder.image_formats(),
                                service_name=settings.get("service_name", "OGC:WMS"),
                                service_title=settings.get("service_title", "Mission Support System Web Map Service"),
                                service_abstract=settings.get("service_abstract", ""),
@@ -285,16 +441,92 @@ class WMSServer(object):
                                service_access_constraints=settings.get(
                                    "service_access_constraints",
                                    "This service is intended for research purposes only."))
-        return return_data.encode("utf-8"), "text/xml"
+        return return_data.encode("utf-8")
+
+    def get_image_cache_key(self, mode, dataset, plot_object, init_time, valid_time, overlays=(), **params):
+        """Returns the key identifying a produced image in the image cache.
+
+        The key is built from the normalized request parameters and the
+        modification times of all data files required by the layer (and the
+        layers of <overlays> drawn on top of it), so that updated data files
+        never return outdated images. Returns None, if the data files cannot
+        be determined (the plot driver reports the error).
+        """
+        data_access = mss_wms_settings.data[dataset]
+        required_datafields = list(plot_object.required_datafields)
+        for overlay, _ in overlays:
+            required_datafields.extend(self.hsec_layer_registry[dataset][overlay].required_datafields)
+        if overlays:
+            params["overlays"] = list(overlays)
+        files = []
+        for vartype, var, _ in required_datafields:
+            try:
+                filename = data_access.get_filename(var, vartype, init_time, valid_time, fullpath=True)
+                files.append((filename, os.path.getmtime(filename)))
+            except (IOError, OSError, ValueError) as ex:
+                logging.debug("no image cache key for missing data: %s %s", type(ex), ex)
+                return None
+        if "bbox" in params:
+            params["bbox"] = [round(_x, 6) for _x in params["bbox"]]
+        return repr((mode, dataset, plot_object.name, init_time, valid_time, sorted(params.items()),
+                     sorted(set(files))))
+
+    def render(self, mode, dataset, layer, plot_parameters):
+        """Produces the image of an already validated GetMap/GetVSec request.
+
+        The image is rendered by the render pool, if configured, or else
+        by the plot drivers of this process. Concurrent requests with the
+        same (normalized) parameters share a single rendering.
+        """
+        if self.single_flight is not None:
+            key = repr((mode, dataset, layer, sorted(plot_parameters.items())))
+            return self.single_flight.call(key, self._render, mode, dataset, layer, plot_parameters)
+        return self._render(mode, dataset, layer, plot_parameters)
+
+    def _render_request(self, mode, dataset, layer, plot_parameters):
+        """Produces the image like render(), but answers requests the render
+        pool cannot take with a service exception.
+
+        Returns the image and None, or None and the service exception.
+        """
+        try:
+            return self.render(mode, dataset, layer, plot_parameters), None
+        except (RenderPoolBusy, concurrent.futures.TimeoutError,
+                concurrent.futures.process.BrokenProcessPool) as ex:
+            logging.error("ERROR: %s %s", type(ex), ex)
+            return None, self.create_service_exception(
+                text="The server is too busy to process your request. Please try again later.")
+
+    def _render(self, mode, dataset, layer, plot_parameters):
+        if self.render_pool is not None:
+            return self.render_pool.render(mode, dataset, layer, plot_parameters)
+        return self.render_local(mode, dataset, layer, plot_parameters)
+
+    def render_local(self, mode, dataset, layer, plot_parameters):
+        """Produces the image of an already validated GetMap/GetVSec request
+        with the plot drivers of this process.
+        """
+        if mode == "getmap":
+            plot_driver = self.hsec_drivers[dataset]
+            plot_object = self.hsec_layer_registry[dataset][layer]
+            if plot_parameters.get("overlays"):
+                plot_parameters = dict(plot_parameters, overlays=[
+                    (self.hsec_layer_registry[dataset][_x], _y) for _x, _y in plot_parameters["overlays"]])
+        else:
+            plot_driver = self.vsec_drivers[dataset]
+            plot_object = self.vsec_layer_registry[dataset][layer]
+        with self._render_lock:
+            plot_driver.set_plot_parameters(plot_object=plot_object, **plot_parameters)
+            return plot_driver.plot()
 
     def produce_plot(self, query, mode):
         """
         Handler for a GetMap and GetVSec requests. Produces a plot with
         the parameters specified in the URL.
 
-        # TODO: Handle multiple layers. (mr, 2010-06-09)
-        # TODO: Cache the produced images: Check whether an image with the given
-        #      parameters has already been produced. (mr, 2010-08-18)
+        GetMap requests may name several LAYERS (and STYLES) of the same data
+        set, which are drawn on top of each other into a single map, loading
+        their data fields only once. GetVSec requests use the first layer.
         """
         logging.debug("GetMap/GetVSec request. Interpreting parameters..")
 
@@ -321,6 +553,10 @@ class WMSServer(object):
         styles = [style for style in query.get('STYLES', 'default').strip().split(',') if style]
         style = styles[0] if len(styles) > 0 else None
         logging.debug("  requested style = '%s'", style)
+        # Styles of the further layers (empty or missing ones select the default).
+        all_styles = query.get('STYLES', '').strip().split(',')
+        overlay_styles = [all_styles[_i] if _i < len(all_styles) and all_styles[_i] else None
+                          for _i in range(1, len(layers))]
 
         # Forecast initialisation time.
         init_time = query.get('DIM_INIT_TIME')
@@ -367,10 +603,14 @@ class WMSServer(object):
         if transparent:
             logging.debug("  requested transparent image")
 
-        # Return format (image/png, text/xml, etc.).
+        # Return format (image/png, image/webp, text/xml, etc.). The data of
+        # vertical sections may also be returned as XML or binary arrays.
         return_format = query.get('FORMAT', 'image/png').lower()
         logging.debug("  requested return format = '%s'", return_format)
-        if return_format not in ["image/png", "text/xml"]:
+        return_formats = encoder.image_formats()
+        if mode == "getvsec":
+            return_formats += ["text/xml", encoder.ARRAYS_FORMAT]
+        if return_format not in return_formats:
             return self.create_service_exception(
                 code="InvalidFORMAT",
                 text="unsupported FORMAT: '{}'".format(return_format))
@@ -384,17 +624,27 @@ class WMSServer(object):
                 return self.create_service_exception(
                     code="LayerNotDefined",
                     text="Invalid LAYER '{}.{}' requested".format(dataset, layer))
-
-            # Check if the layer requires time information and if they are given.
-            if self.hsec_layer_registry[dataset][layer].uses_inittime_dimension() and init_time is None:
+            overlays = []
+            for overlay_layer, overlay_style in zip(layers[1:], overlay_styles):
+                overlay_dataset, _, overlay_layer = overlay_layer.partition(".")
+                if overlay_dataset != dataset or overlay_layer not in self.hsec_layer_registry[dataset]:
+                    return self.create_service_exception(
+                        code="LayerNotDefined",
+                        text="Invalid LAYER '{}.{}' requested (all layers need to be of data set '{}')".format(
+                            overlay_dataset, overlay_layer, dataset))
+                overlays.append((overlay_layer, overlay_style))
+            plot_objects = [self.hsec_layer_registry[dataset][_x] for _x in [layer] + [_name for _name, _ in overlays]]
+
+            # Check if the layers require time information and if they are given.
+            if any(_x.uses_inittime_dimension() for _x in plot_objects) and init_time is None:
                 return self.create_service_exception(
                     code="MissingDimensionValue",
                     text="INIT_TIME not specified (use the DIM_INIT_TIME keyword)")
-            if self.hsec_layer_registry[dataset][layer].uses_validtime_dimension() and valid_time is None:
+            if any(_x.uses_validtime_dimension() for _x in plot_objects) and valid_time is None:
                 return self.create_service_exception(code="MissingDimensionValue", text="TIME not specified")
 
             # Check if the requested coordinate system is supported.
-            if not self.hsec_layer_registry[dataset][layer].support_epsg_code(crs):
+            if not all(_x.support_epsg_code(crs) for _x in plot_objects):
                 return self.create_service_exception(
                     code="InvalidSRS",
                     text="The requested CRS '{}' is not supported.".format(crs))
@@ -407,8 +657,12 @@ class WMSServer(object):
 
             # Vertical level, if applicable.
             level = query.get('ELEVATION')
-            level = float(level) if level is not None else None
-            layer_datatypes = self.hsec_layer_registry[dataset][layer].required_datatypes()
+            try:
+                level = float(level) if level is not None else None
+            except ValueError:
+                return self.create_service_exception(
+                    code="InvalidDimensionValue", text="Invalid ELEVATION: {}".format(level))
+            layer_datatypes = set().union(*[_x.required_datatypes() for _x in plot_objects])
             if any(_x in layer_datatypes for _x in ["pl", "al", "ml", "tl", "pv"]) and level is None:
                 # Use the default value.
                 level = -1
@@ -418,13 +672,21 @@ class WMSServer(object):
                 return self.create_service_exception(
                     text="ELEVATION argument not applicable for layer '{}'. Please omit this argument.".format(layer))
 
-            plot_driver = self.hsec_drivers[dataset]
+            cache_key = None
+            if self.image_cache is not None:
+                cache_key = self.get_image_cache_key(
+                    mode, dataset, self.hsec_layer_registry[dataset][layer], init_time, valid_time,
+                    overlays=overlays, bbox=bbox, level=level, crs=crs, style=style, figsize=figsize, noframe=noframe,
+                    transparent=transparent, return_format=return_format)
+                image = self.image_cache.get(cache_key) if cache_key is not None else None
+                if image is not None:
+                    return image, return_format
+
             try:
-                plot_driver.set_plot_parameters(self.hsec_layer_registry[dataset][layer], bbox=bbox, level=level,
-                                                crs=crs, init_time=init_time, valid_time=valid_time, style=style,
-                                                figsize=figsize, noframe=noframe, transparent=transparent,
-                                                return_format=return_format)
-                image = plot_driver.plot()
+                image, busy = self._render_request(mode, dataset, layer, dict(
+                    bbox=bbox, level=level, crs=crs, init_time=init_time, valid_time=valid_time, style=style,
+                    figsize=figsize, noframe=noframe, transparent=transparent, return_format=return_format,
+                    overlays=overlays))
             except (IOError, ValueError) as ex:
                 logging.error("ERROR: %s %s", type(ex), ex)
                 logging.debug("%s", traceback.format_exc())
@@ -432,6 +694,8 @@ class WMSServer(object):
                       "times and/or levels you have specified.\n\n" \
                       "Error message: '{}'".format(ex)
                 return self.create_service_exception(text=msg)
+            if busy is not None:
+                return busy
 
         elif mode == "getvsec":
             # Vertical secton path.
@@ -466,33 +730,149 @@ class WMSServer(object):
             except ValueError:
                 return self.create_service_exception(text="Invalid BBOX: {}".format(query.get("BBOX")))
 
-            plot_driver = self.vsec_drivers[dataset]
+            cache_key = None
+            if self.image_cache is not None:
+                cache_key = self.get_image_cache_key(
+                    mode, dataset, self.vsec_layer_registry[dataset][layer], init_time, valid_time,
+                    path=path, bbox=bbox, style=style, figsize=figsize, noframe=noframe,
+                    transparent=transparent, return_format=return_format)
+                image = self.image_cache.get(cache_key) if cache_key is not None else None
+                if image is not None:
+                    return image, return_format
+
             try:
-                plot_driver.set_plot_parameters(plot_object=self.vsec_layer_registry[dataset][layer],
-                                                vsec_path=path,
-                                                vsec_numpoints=bbox[0],
-                                                vsec_path_connection="greatcircle",
-                                                vsec_numlabels=bbox[2],
-                                                init_time=init_time,
-                                                valid_time=valid_time,
-                                                style=style,
-                                                bbox=bbox,
-                                                figsize=figsize,
-                                                noframe=noframe,
-                                                transparent=transparent,
-                                                return_format=return_format)
-                image = plot_driver.plot()
+                image, busy = self._render_request(mode, dataset, layer, dict(
+                    vsec_path=path,
+                    vsec_numpoints=bbox[0],
+                    vsec_path_connection="greatcircle",
+                    vsec_numlabels=bbox[2],
+                    init_time=init_time,
+                    valid_time=valid_time,
+                    style=style,
+                    bbox=bbox,
+                    figsize=figsize,
+                    noframe=noframe,
+                    transparent=transparent,
+                    return_format=return_format))
             except (IOError, ValueError) as ex:
                 logging.error("ERROR: %s %s", type(ex), ex)
                 msg = "The data corresponding to your request is not available. Please check the " \
                       "times and/or path you have specified.\n\n" \
                       "Error message: {}".format(ex)
                 return self.create_service_exception(text=msg)
+            if busy is not None:
+                return busy
 
         # 4) Return the produced image.
         # =============================
+        if cache_key is not None:
+            self.image_cache.put(cache_key, image)
         return image, return_format
 
+    def produce_tile(self, query, layer, tile_matrix_set, z, x, y):
+        """
+        Handler for tile requests. Produces the tile x, y (counted from the
+        upper left corner) of zoom level z of <tile_matrix_set> for the layer
+        "dataset.layer" and the STYLE, TIME, DIM_INIT_TIME, ELEVATION and
+        TRANSPARENT parameters of <query>.
+
+        Tiles are rendered in meta tiles of tile_metatile_size times
+        tile_metatile_size tiles, all of which are stored in the tile cache.
+        Meta tiles are rendered with a buffer of tile_metatile_buffer pixels,
+        which is cut off; labels crossing the cut are not drawn, so that the
+        neighbouring meta tiles fit seamlessly.
+        """
+        query = CIMultiDict(query)
+        if layer.find(".") > 0:
+            dataset, layer = layer.split(".", 1)
+        else:
+            dataset = None
+        if (dataset not in self.hsec_layer_registry) or (layer not in self.hsec_layer_registry[dataset]):
+            return self.create_service_exception(
+                code="LayerNotDefined", text="Invalid LAYER '{}.{}' requested".format(dataset, layer))
+        plot_object = self.hsec_layer_registry[dataset][layer]
+
+        try:
+            tms = tiles.get_tile_matrix_set(tile_matrix_set)
+            tiles.check_tile(tms, z, x, y, max_zoom=self.tile_max_zoom)
+        except ValueError as ex:
+            return self.create_service_exception(code="TileOutOfRange", text=str(ex))
+        if not plot_object.support_epsg_code(tms.crs):
+            return self.create_service_exception(
+                code="InvalidSRS", text="The requested CRS '{}' is not supported.".format(tms.crs))
+
+        style = query.get('STYLE', query.get('STYLES', 'default')) or 'default'
+        init_time, valid_time = query.get('DIM_INIT_TIME'), query.get('TIME')
+        try:
+            init_time = parse_iso_datetime(init_time) if init_time is not None else None
+            valid_time = parse_iso_datetime(valid_time) if valid_time is not None else None
+        except ValueError:
+            return self.create_service_exception(
+                code="InvalidDimensionValue",
+                text="TIME and DIM_INIT_TIME need to have the format 2005-08-29T13:00:00Z")
+        if plot_object.uses_inittime_dimension() and init_time is None:
+            return self.create_service_exception(
+                code="MissingDimensionValue", text="INIT_TIME not specified (use the DIM_INIT_TIME keyword)")
+        if plot_object.uses_validtime_dimension() and valid_time is None:
+            return self.create_service_exception(code="MissingDimensionValue", text="TIME not specified")
+
+        level = query.get('ELEVATION')
+        try:
+            level = float(level) if level is not None else None
+        except ValueError:
+            return self.create_service_exception(
+                code="InvalidDimensionValue", text="Invalid ELEVATION: {}".format(level))
+        if any(_x in plot_object.required_datatypes() for _x in ["pl", "al", "ml", "tl", "pv"]):
+            if level is None:
+                level = -1
+        elif level is not None:
+            return self.create_service_exception(
+                text="ELEVATION argument not applicable for layer '{}'. Please omit this argument.".format(layer))
+        transparent = query.get('TRANSPARENT', 'false').lower() == 'true'
+
+        # the key of the tile set, to which the tile position is added
+        base_key = self.get_image_cache_key(
+            "gettile", dataset, plot_object, init_time, valid_time, crs=tms.crs, z=z, level=level, style=style,
+            transparent=transparent, tile_size=self.tile_size)
+        image = self.tile_cache.get(repr((base_key, x, y))) if base_key is not None else None
+        if image is not None:
+            return image, "image/png"
+
+        x0, y0, nx, ny = tiles.meta_tile(tms, z, x, y, self.tile_metatile_size)
+        with self._tile_locks[hash((base_key, x0, y0)) % len(self._tile_locks)]:
+            # another request may have rendered the meta tile meanwhile
+            image = self.tile_cache.get(repr((base_key, x, y))) if base_key is not None else None
+            if image is not None:
+                return image, "image/png"
+            bbox, margin = tiles.buffered_block(
+                tms, z, x0, y0, nx, ny, self.tile_size, self.tile_metatile_buffer)
+            try:
+                meta_image, busy = self._render_request("getmap", dataset, layer, dict(
+                    bbox=bbox, level=level, crs=tms.crs, init_time=init_time, valid_time=valid_time, style=style,
+                    figsize=(nx * self.tile_size + margin[0] + margin[2], ny * self.tile_size + margin[1] + margin[3]),
+                    noframe=True, transparent=transparent, return_format="image/png", crop_margin=margin))
+            except (IOError, ValueError) as ex:
+                logging.error("ERROR: %s %s", type(ex), ex)
+                logging.debug("%s", traceback.format_exc())
+                msg = "The data corresponding to your request is not available. Please check the " \
+                      "times and/or levels you have specified.\n\n" \
+                      "Error message: '{}'".format(ex)
+                return self.create_service_exception(text=msg)
+            if busy is not None:
+                return busy
+            meta_tiles = tiles.split_image(meta_image, nx, ny, self.tile_size, offset=margin[:2])
+            if base_key is not None:
+                for (i, j), tile in meta_tiles.items():
+                    self.tile_cache.put(repr((base_key, x0 + i, y0 + j)), tile)
+        return meta_tiles[(x - x0, y - y0)], "image/png"
+
+
+def _render_worker(mode, dataset, layer, plot_parameters):
+    """Renders a request within a worker process of the render pool, using
+    the WMS server instance of that process.
+    """
+    return server.render_local(mode, dataset, layer, plot_parameters)
+
 
 server = WMSServer()
 
@@ -512,13 +892,18 @@ def application():
         request_service = query.get('service', '')
         request_service = request_service.lower()
         request_version = query.get('version', '')
+        etag = None
 
         url = request.url
         server_url = urllib.parse.urljoin(url, urllib.parse.urlparse(url).path)
 
         if (request_type in ('getcapabilities', 'capabilities') and
                 request_service == 'wms' and request_version in ('1.1.1', '')):
-            return_data, return_format = server.get_capabilities(server_url)
+            return_data, return_format, etag = server.get_capabilities_document(server_url)
+            if request.if_none_match.contains(etag):
+                res = make_response(b"", 304)
+                res.set_etag(etag)
+                return res
         elif request_type in ('getmap', 'getvsec') and request_version in ('1.1.1', ''):
             return_data, return_format = server.produce_plot(query, request_type)
         else:
@@ -529,6 +914,8 @@ def application():
         response_headers = [('Content-type', return_format), ('Content-Length', str(len(return_data)))]
         for response_header in response_headers:
             res.headers[response_header[0]] = response_header[1]
+        if etag is not None:
+            res.set_etag(etag)
 
         return res
 
@@ -536,3 +923,16 @@ def application():
         error_message = "{}: {}\n".format(type(ex), ex)
         logging.error("Unexpected error: %s", error_message)
         return redirect('/index', 307)
+
+
+@app.route('/tiles/<layer>/<tile_matrix_set>/<int:z>/<int:x>/<int:y>.png')
+@conditional_decorator(auth.login_required, mss_wms_settings.__dict__.get('enable_basic_http_authentication', False))
+def tile(layer, tile_matrix_set, z, x, y):
+    """Serves map tiles of <layer> ("dataset.layer") in the XYZ scheme, e.g.
+    /tiles/ecmwf_EUR_LL015.PLDiv01/EPSG:3857/3/4/2.png?time=...&dim_init_time=...&elevation=200
+    """
+    return_data, return_format = server.produce_tile(request.args, layer, tile_matrix_set, z, x, y)
+    res = make_response(return_data, 200)
+    res.headers['Content-type'] = return_format
+    res.headers['Content-Length'] = str(len(return_data))
+    return res
@@ -26,7 +26,11 @@
     limitations under the License.
 """
 
+import collections
 import glob
+import logging
+import os
+import threading
 import numpy as np
 import netCDF4
 
@@ -324,3 +328,101 @@ class MFDatasetCommonDims(netCDF4.MFDataset):
            contains <varname>.
         """
         return self._cdfOrigin[varname]
+
+
+class MFDatasetPool(object):
+    """Pool of open MFDatasetCommonDims instances shared between their users.
+
+    Datasets are identified by their (sorted) files together with the
+    modification times of the files and the keyword arguments used for
+    opening, so that a modified file leads to a freshly opened dataset.
+
+    A dataset obtained by acquire() must be given back by release(). Datasets
+    that are not in use are kept open and closed in least recently used order
+    as soon as more than <max_open_files> files are open in total. Datasets in
+    use are never closed, so the limit may be exceeded temporarily.
+    """
+
+    def __init__(self, max_open_files=64):
+        self.max_open_files = max_open_files
+        # key -> [dataset, reference count, number of files]
+        self._entries = collections.OrderedDict()
+        self._keys = {}
+        self._lock = threading.Lock()
+        self.open_files = 0
+
+    @staticmethod
+    def _key(filenames, kwargs):
+        filenames = sorted(set(filenames))
+        return (tuple(filenames), tuple(os.path.getmtime(_x) for _x in filenames),
+                repr(sorted(kwargs.items())))
+
+    def acquire(self, filenames, **kwargs):
+        """Returns an open MFDatasetCommonDims of <filenames>, opened with
+        <kwargs> if not yet in the pool.
+        """
+        key = self._key(filenames, kwargs)
+        with self._lock:
+            if key in self._entries:
+                entry = self._entries[key]
+                entry[1] += 1
+                self._entries.move_to_end(key)
+                logging.debug("reusing pooled dataset of %s files", entry[2])
+                return entry[0]
+            # Outdated versions of the same files are not needed anymore.
+            for old_key in [_k for _k, _v in self._entries.items() if _k[0] == key[0] and _v[1] == 0]:
+                self._close(old_key)
+            dataset = MFDatasetCommonDims(list(key[0]), **kwargs)
+            self._entries[key] = [dataset, 1, len(key[0])]
+            self._keys[id(dataset)] = key
+            self.open_files += len(key[0])
+            self._evict()
+            return dataset
+
+    def get_mtimes(self, dataset):
+        """Returns a dictionary mapping the files of a dataset obtained by
+        acquire() to their modification times when it was opened.
+        """
+        with self._lock:
+            key = self._keys.get(id(dataset))
+        if key is None:
+            return {}
+        return dict(zip(key[0], key[1]))
+
+    def release(self, dataset):
+        """Gives back a dataset obtained by acquire().
+        """
+        with self._lock:
+            key = self._keys.get(id(dataset))
+            if key is None:
+                # not part of the pool (anymore)
+                dataset.close()
+                return
+            self._entries[key][1] -= 1
+            self._evict()
+
+    def _close(self, key):
+        dataset, _, num_files = self._entries.pop(key)
+        del self._keys[id(dataset)]
+        self.open_files -= num_files
+        try:
+            dataset.close()
+        except (IOError, RuntimeError) as ex:
+            logging.error("Could not close dataset: %s %s", type(ex), ex)
+
+    def _evict(self):
+        """Closes unused datasets until the limit of open files is kept.
+        Requires self._lock to be held.
+        """
+        for key in [_k for _k, _v in self._entries.items() if _v[1] == 0]:
+            if self.open_files <= self.max_open_files:
+                break
+            logging.debug("closing pooled dataset of %s files", self._entries[key][2])
+            self._close(key)
+
+    def clear(self):
+        """Closes all datasets not in use.
+        """
+        with self._lock:
+            for key in [_k for _k, _v in self._entries.items() if _v[1] == 0]:
+                self._close(key)
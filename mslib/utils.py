@@ -27,6 +27,7 @@
 """
 
 import datetime
+import functools
 import isodate
 from fs import open_fs, errors
 import json
@@ -35,8 +36,6 @@ import netCDF4 as nc
 import numpy as np
 import os
 import pint
-from scipy.interpolate import interp1d
-from scipy.ndimage import map_coordinates
 
 try:
     import mpl_toolkits.basemap.pyproj as pyproj
@@ -392,35 +391,73 @@ def get_projection_params(proj):
     return proj_params
 
 
-def interpolate_vertsec(data3D, data3D_lats, data3D_lons, lats, lons):
+def _fractional_indices(grid, values):
+    """
+    Transform values into the (fractional) index space of the coordinates in grid.
+    Values outside of the grid are returned as NaN.
+    """
+    grid = np.asarray(grid, dtype=float)
+    values = np.asarray(values, dtype=float)
+    delta = np.diff(grid)
+    if len(grid) > 1 and delta[0] > 0 and np.allclose(delta, delta[0], rtol=1e-6, atol=0):
+        # regular grid; direct computation
+        indices = (values - grid[0]) / delta[0]
+        indices[(values < grid[0]) | (values > grid[-1])] = np.nan
+        indices = np.clip(indices, 0, len(grid) - 1)
+        return indices
+    order = grid.argsort()
+    return np.interp(values, grid[order], order.astype(float), left=np.nan, right=np.nan)
+
+
+def vertsec_interpolation_weights(data3D_lats, data3D_lons, lats, lons):
+    """
+    Compute the grid indices and weights required to bilinearly interpolate
+    fields given on the data3D_lats/data3D_lons grid to the points lats/lons.
+
+    The result only depends on the grid and the path, so that it may be
+    computed once and passed to interpolate_vertsec() for every field.
+    """
+    ind_lats = _fractional_indices(data3D_lats, lats)
+    ind_lons = _fractional_indices(data3D_lons, lons)
+    invalid = np.isnan(ind_lats) | np.isnan(ind_lons)
+    ind_lats[invalid] = 0
+    ind_lons[invalid] = 0
+
+    # Lower corner of the grid cell containing the point; points on the
+    # last grid line belong to the last cell.
+    lat0 = np.clip(np.floor(ind_lats).astype(int), 0, max(len(data3D_lats) - 2, 0))
+    lon0 = np.clip(np.floor(ind_lons).astype(int), 0, max(len(data3D_lons) - 2, 0))
+    lat1 = np.minimum(lat0 + 1, len(data3D_lats) - 1)
+    lon1 = np.minimum(lon0 + 1, len(data3D_lons) - 1)
+    wlat = ind_lats - lat0
+    wlon = ind_lons - lon0
+    indices = ((lat0, lon0), (lat0, lon1), (lat1, lon0), (lat1, lon1))
+    weights = ((1 - wlat) * (1 - wlon), (1 - wlat) * wlon, wlat * (1 - wlon), wlat * wlon)
+    return indices, weights, invalid
+
+
+def interpolate_vertsec(data3D, data3D_lats, data3D_lons, lats, lons, weights=None):
     """
     Interpolate curtain[z,pos] (curtain[level,pos]) from data3D[z,y,x]
     (data3D[level,lat,lon]).
 
-    This method is based on scipy.ndimage.map_coordinates().
+    All levels are bilinearly interpolated at once. The interpolation weights
+    may be precomputed by vertsec_interpolation_weights() and passed as
+    <weights> to interpolate several fields on the same grid and path.
 
     data3D can be on an IRREGULAR lat/lon grid, coordinates given by lats, lons.
     The lats, lons arrays can have arbitrary order, they do not have to be uniform.
     """
-    # Create an empty field to accommodate the curtain.
-    curtain = np.zeros([data3D.shape[0], len(lats)])
-
-    # Transform lat/lon values to array index space. This is necessary to use
-    # scipy.ndimage.map_coordinates().
-    interp_lat = interp1d(data3D_lats, np.arange(len(data3D_lats)), bounds_error=False)
-    ind_lats = interp_lat(lats)
-    interp_lon = interp1d(data3D_lons, np.arange(len(data3D_lons)), bounds_error=False)
-    ind_lons = interp_lon(lons)
-    ind_coords = np.array([ind_lats, ind_lons])
-
-    # One horizontal interpolation for each model level. The order
-    # parameter controls the degree of the splines used, i.e. order=1
-    # stands for linear interpolation.
-    for ml in range(data3D.shape[0]):
-        data = data3D[ml, :, :]
-        curtain[ml, :] = map_coordinates(data, ind_coords, order=1)
-
-    curtain[:, np.isnan(ind_lats) | np.isnan(ind_lons)] = np.nan
+    if weights is None:
+        weights = vertsec_interpolation_weights(data3D_lats, data3D_lons, lats, lons)
+    indices, weights, invalid = weights
+    data3D = np.asarray(data3D)
+
+    curtain = np.zeros([data3D.shape[0], len(invalid)])
+    for (ind_lat, ind_lon), weight in zip(indices, weights):
+        curtain += data3D[:, ind_lat, ind_lon] * weight
+
+    curtain[:, invalid] = np.nan
     return np.ma.masked_invalid(curtain)
 
 
@@ -547,23 +584,65 @@ def convert_pressure_to_vertical_axis_measure(vertical_axis, pressure):
         return pressure
 
 
-def convert_to(value, from_unit, to_unit, default=1.):
+def _convert_pint(value, from_unit, to_unit):
+    """Converts <value> from <from_unit> to <to_unit> using pint. Geopotential
+    is converted to geopotential height, if to_unit is a length.
+    """
+    value_unit = UR.Quantity(value, UR(from_unit))
     try:
-        value_unit = UR.Quantity(value, UR(from_unit))
-        result = value_unit.to(to_unit).magnitude
+        return value_unit.to(to_unit).magnitude
+    except pint.DimensionalityError:
+        if UR(to_unit).to_base_units().units == UR.m:
+            return (value_unit / UR.Quantity(9.81, "m s^-2")).to(to_unit).magnitude
+        raise
+
+
+@functools.lru_cache(maxsize=None)
+def _conversion_factors(from_unit, to_unit):
+    """Returns scale and offset converting a value from <from_unit> to
+    <to_unit> by value * scale + offset, or None if the conversion is not
+    affine. Raises the pint errors of impossible conversions (which are
+    not cached).
+    """
+    zero, one, ten = [_convert_pint(_x, from_unit, to_unit) for _x in (0., 1., 10.)]
+    scale, offset = one - zero, zero
+    if not np.isclose(ten, 10. * scale + offset, rtol=1e-12, atol=0.):
+        return None
+    return scale, offset
+
+
+def convert_to(value, from_unit, to_unit, default=1., copy=True):
+    """Converts <value> from <from_unit> to <to_unit>. If the conversion is
+    not possible, <value> multiplied by <default> is returned.
+
+    Affine conversions are resolved once per pair of units and applied
+    directly to the value. Float arrays are converted in place, if <copy> is
+    False and the array is writeable.
+    """
+    try:
+        factors = _conversion_factors(from_unit, to_unit)
+        if factors is None:
+            return _convert_pint(value, from_unit, to_unit)
     except pint.UndefinedUnitError:
         logging.error("Error in unit conversion (undefined) %s/%s", from_unit, to_unit)
-        result = value * default
+        return value * default
     except pint.DimensionalityError:
-        if UR(to_unit).to_base_units().units == UR.m:
-            try:
-                result = (value_unit / UR.Quantity(9.81, "m s^-2")).to(to_unit).magnitude
-            except pint.DimensionalityError:
-                logging.error("Error in unit conversion (dimensionality) %s/%s", from_unit, to_unit)
-                result = value * default
-        else:
-            logging.error("Error in unit conversion (dimensionality) %s/%s", from_unit, to_unit)
-            result = value * default
+        logging.error("Error in unit conversion (dimensionality) %s/%s", from_unit, to_unit)
+        return value * default
+
+    scale, offset = factors
+    if isinstance(value, (list, tuple)):
+        value = np.asarray(value)
+    if not isinstance(value, np.ndarray):
+        return value * scale + offset
+    if value.dtype.kind == "f" and not copy and value.flags.writeable:
+        result = value
+        if scale != 1:
+            result *= scale
+    else:
+        result = np.multiply(value, scale)
+    if offset != 0:
+        result += offset
     return result
 
 